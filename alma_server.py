@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#   Copyright (C) 2024  Andrew Bauer
+
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This is a long-running local almanac service (command line option '-srv').
+#
+# init_sf() is executed once, so the timescale, ephemeris and star data stay loaded
+#   between requests. Computed daily data is held in a least-recently-used cache.
+# Requests are HTTP GET on 127.0.0.1 (never a public interface) and are served
+#   concurrently by a bounded pool of config.srvWorkers threads. Replies are JSON:
+#
+#   /status                                 cache and request statistics
+#   /position?body=moon&t=2027-03-14T17:30  GHA and Dec (UT1) of a body
+#   /event?event=sunrise&date=2027-03-14&lat=52.5
+#                                           event time (UT1) at a latitude
+#   /job?product=1&date=14032027&days=3&style=t
+#                                           create a .tex file (1 = Nautical Almanac,
+#                                           2 = Sun tables, 3 = Event Time tables) or
+#                                           an almanac data store (7); days = 0 for the
+#                                           year, -1 for the month
+#   /shutdown                               stop the service
+#
+# A local client may call query(), e.g. query("/position?body=sun&t=2027-03-14T12:00")
+#
+# The calculations use module globals (the Time objects of timegrid.py, the event
+#   store, the counters of runstats.py, the persistent cache): they are made by one
+#   thread at a time (joblock). Only replies found in the cache are made concurrently.
+
+###### Standard library imports ######
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from http.server import HTTPServer, BaseHTTPRequestHandler
+import json
+import threading
+import time
+from urllib.parse import urlparse, parse_qs
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+###### Third party imports ######
+import numpy as np
+
+###### Local application imports ######
+import config
+from alma_skyfield import init_sf, storebodies, storeevents, store_positions, store_events
+from alma_store import interpolate, interp_lat, makeStore
+import runstats
+
+#---------------------------
+#   Module initialization
+#---------------------------
+
+ts = None                   # timescale returned by init_sf()
+f_prefix = ''               # folder for files created by /job
+cache = OrderedDict()       # ('pos' or 'evt', date ordinal) -> NumPy array; least recently used first
+cachelock = threading.Lock()
+joblock = threading.Lock()  # the calculations use module globals: one thread at a time
+stats = {'requests': 0, 'hits': 0, 'misses': 0, 'jobs': 0, 'started': 0.0}
+statlock = threading.Lock()
+server = None
+
+#------------------------
+#   internal functions
+#------------------------
+
+def count(key, n = 1):
+    with statlock:
+        stats[key] += n
+
+def cached(kind, d):
+    # hourly positions ('pos') or events per latitude ('evt') for date 'd'
+    key = (kind, d.toordinal())
+    with cachelock:
+        if key in cache:
+            cache.move_to_end(key)
+            count('hits')
+            return cache[key]
+    count('misses')
+    with joblock:
+        data = store_positions(d) if kind == 'pos' else store_events(d)
+    with cachelock:
+        cache[key] = data
+        while len(cache) > config.srvCache:
+            cache.popitem(last=False)
+    return data
+
+def parse_time(txt):
+    # ISO format date or datetime (UT1), e.g. '2027-03-14' or '2027-03-14T17:30'
+    dt = datetime.fromisoformat(txt)
+    if dt.tzinfo is not None:
+        dt = dt.replace(tzinfo=None) - dt.utcoffset()
+    return dt
+
+def parse_dmy(txt):
+    # 'DDMMYYYY' as entered in sfalmanac.py
+    if len(txt) != 8 or not txt.isnumeric():
+        raise ValueError("date '{}' is not in the format 'DDMMYYYY'".format(txt))
+    return date(int(txt[4:]), int(txt[2:4]), int(txt[0:2]))
+
+def check_year(y):
+    yrmin = config.ephemeris[config.ephndx][1]
+    yrmax = config.ephemeris[config.ephndx][2]
+    if not yrmin <= y <= yrmax:
+        raise ValueError("please pick a year between {} and {}".format(yrmin, yrmax))
+
+def status(q):
+    with cachelock:
+        days = len(cache)
+    with statlock:
+        reply = dict(stats)
+    reply['uptime'] = round(time.time() - reply.pop('started'), 1)
+    reply['cached'] = days
+    reply['workers'] = config.srvWorkers
+    reply['ephemeris'] = config.ephemeris[config.ephndx][0]
+    return reply
+
+def position(q):
+    body = q.get('body', '').lower()
+    if body not in storebodies:
+        raise ValueError("unknown body '{}' - choose from: {}".format(body, ", ".join(storebodies)))
+    dt = parse_time(q['t'])
+    check_year(dt.year)
+    d = dt.date()
+    h = dt.hour + dt.minute/60.0 + (dt.second + dt.microsecond/1e6)/3600.0
+    i = int(h)
+    b = storebodies.index(body)
+    rows = cached('pos', d)
+    gha, dec = interpolate(rows[i,b].tolist(), rows[i+1,b].tolist(), h - i)
+    return {'body': body, 't': dt.isoformat(), 'gha': round(gha, 6), 'dec': round(dec, 6)}
+
+def event(q):
+    ev = q.get('event', '')
+    if ev not in storeevents:
+        raise ValueError("unknown event '{}' - choose from: {}".format(ev, ", ".join(storeevents)))
+    d = parse_time(q['date']).date()
+    check_year(d.year)
+    lat = float(q['lat'])
+    if not config.lat[-1] <= lat <= config.lat[0]:
+        raise ValueError("latitude {} is outside the tabulated range {} to {}".format(lat, config.lat[-1], config.lat[0]))
+    hrs = interp_lat(cached('evt', d), config.lat, storeevents.index(ev), lat)
+    if np.isnan(hrs):
+        return {'event': ev, 'date': d.isoformat(), 'lat': lat, 't': None}
+    t = datetime(d.year, d.month, d.day) + timedelta(hours=hrs)
+    return {'event': ev, 'date': d.isoformat(), 'lat': lat, 't': t.isoformat(timespec='seconds')}
+
+def job(q):
+    # NOTE: modules are imported here, i.e. after sfalmanac.py has set config.MULTIpr
+    from nautical import almanac
+    from suntables import sunalmanac
+    from eventtables import makeEVtables
+
+    product = q.get('product', '1')
+    if product not in set(['1', '2', '3', '7']):
+        raise ValueError("product must be 1, 2, 3 or 7")
+    first_day = parse_dmy(q.get('date', ''))
+    check_year(first_day.year)
+    dtp = int(q.get('days', '1'))   # 0 = entire year; -1 = entire month; else days
+    if dtp == 0:
+        first_day = date(first_day.year, 1, 1)
+        txt = "{}".format(first_day.year)
+    elif dtp == -1:
+        first_day = first_day.replace(day = 1)
+        txt = first_day.strftime("%Y-%m")
+    elif 1 <= dtp <= 50:
+        txt = first_day.strftime("%Y%m%d")
+    else:
+        raise ValueError("'days' must be 0 (year), -1 (month) or 1 to 50")
+    style = q.get('style', 't')
+
+    with joblock:
+        start = time.time()
+        config.tbls = 'm' if style[0:1] == 'm' else ''
+        config.decf = '+' if style[1:2] == '+' else ''
+        DecFmt = '[old]' if config.decf == '+' else ''
+        runstats.reset()
+        if product == '7':
+            fn = "SFstore_{}.dat".format(txt)
+            makeStore(f_prefix + fn, first_day, dtp)
+        else:
+            if product == '1':
+                ff = "NAtrad" if config.tbls != 'm' else "NAmod"
+                fn = "{}({})_{}.tex".format(ff, config.pgsz, txt + DecFmt)
+                out = almanac(first_day, dtp, ts)
+            elif product == '2':
+                ff = "STtrad" if config.tbls != 'm' else "STmod"
+                fn = "{}({})_{}.tex".format(ff, config.pgsz, txt + DecFmt)
+                out = sunalmanac(first_day, dtp)
+            else:
+                fn = "Event-Times({})_{}.tex".format(config.pgsz, txt)
+                out = makeEVtables(first_day, dtp, ts)
+            outfile = open(f_prefix + fn, mode="w", encoding="utf8")
+            outfile.write(out)
+            outfile.close()
+        count('jobs')
+        return {'product': product, 'file': fn, 'seconds': round(time.time() - start, 3)}
+
+def stop(q):
+    threading.Thread(target=server.shutdown).start()
+    return {'stopping': True}
+
+endpoints = {'/status': status, '/position': position, '/event': event, '/job': job, '/shutdown': stop}
+
+class Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        count('requests')
+        url = urlparse(self.path)
+        q = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        code = 200
+        try:
+            if url.path not in endpoints:
+                code = 404
+                reply = {'error': "unknown request '{}' - choose from: {}".format(url.path, ", ".join(endpoints))}
+            else:
+                reply = endpoints[url.path](q)
+        except KeyError as e:
+            code = 400
+            reply = {'error': "missing parameter {}".format(e)}
+        except ValueError as e:
+            code = 400
+            reply = {'error': str(e)}
+        except Exception as e:
+            code = 500
+            reply = {'error': "{}: {}".format(type(e).__name__, e)}
+        data = json.dumps(reply).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        return      # keep the terminal quiet
+
+class PoolServer(HTTPServer):
+    # an HTTP server that hands each request to a bounded pool of worker threads
+
+    def __init__(self, address, handler, workers):
+        HTTPServer.__init__(self, address, handler)
+        self.executor = ThreadPoolExecutor(max_workers = workers)
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self.process_request_thread, request, client_address)
+
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        HTTPServer.server_close(self)
+        self.executor.shutdown(wait = True)
+
+#--------------------------
+#   external entry points
+#--------------------------
+
+def serve(spad, prefix = '', port = None):
+    # initialize Skyfield once and serve requests until '/shutdown' or Ctrl-C
+    global ts, f_prefix, server
+    ts = init_sf(spad)
+    f_prefix = prefix
+    if port is None: port = config.srvPort
+    server = PoolServer(('127.0.0.1', port), Handler, config.srvWorkers)
+    stats['started'] = time.time()
+    print("Almanac service listening on http://127.0.0.1:{} ({} workers) - Ctrl-C to stop".format(port, config.srvWorkers))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+    print("Almanac service stopped")
+
+def query(path, port = None, timeout = 600):
+    # client: send a request to the local service and return the decoded JSON reply
+    if port is None: port = config.srvPort
+    try:
+        with urlopen("http://127.0.0.1:{}{}".format(port, path), timeout = timeout) as f:
+            return json.loads(f.read().decode('utf-8'))
+    except HTTPError as e:
+        return json.loads(e.read().decode('utf-8'))     # {'error': ...}
@@ -21,30 +21,33 @@
 ###### Standard library imports ######
 # don't confuse the 'date' method with the 'Date' variable!
 #   the following line includes 'datetime.combine' class method:
-from datetime import date, time, datetime, timedelta, timezone
+from datetime import time, datetime, timedelta, timezone
 # don't confuse the 'time' instance method in the 'datetime' object with the 'Time' module:
 import time as Time # 00000 - stopwatch elements
 from math import pi, cos, tan, atan, degrees, copysign
 import os
-import errno
-import socket
 import sys			# required for .stdout.write()
-import urllib.error # used in 'download_EOP' function
-from urllib.request import urlopen
-from collections import deque
 
 ###### Third party imports ######
 from skyfield import VERSION
 from skyfield.api import Loader
-from skyfield.api import Topos, Star, wgs84, N, S, E, W     # Topos is deprecated in Skyfield v1.35!
+from skyfield.api import Star, S, W
 from skyfield import almanac
 from skyfield.nutationlib import iau2000b
-from skyfield.data import hipparcos
 from skyfield.magnitudelib import planetary_magnitude
 import numpy as np
 
 ###### Local application imports ######
 import config
+from observers import site
+from eopcache import eop_timescale, eop_dates
+from eopfetch import fetch, refresh, swap_new
+from ephtrim import kernel
+from timegrid import ut1
+import eventstore
+import runstats
+from hipcatalog import HipCatalog
+from sfcache import cached, open_cache
 
 #---------------------------
 #   Module initialization
@@ -67,6 +70,9 @@ def SkyfieldVersion(version2):      # compare Skyfield version to version2
         elif v1 < v2: return -1
     return 0
 
+# Skyfield feature gates (resolved once rather than in every search)
+SF148 = SkyfieldVersion("1.48") >= 0
+
 # def compareVersion(version1, version2):     # compare two versions
     # versions1 = [int(v) for v in version1.split(".")]
     # versions2 = [int(v) for v in version2.split(".")]
@@ -77,97 +83,6 @@ def SkyfieldVersion(version2):      # compare Skyfield version to version2
         # elif v1 < v2: return -1
     # return 0
 
-def isConnected():
-    try:
-        # connect to the host -- tells us if the host is actually reachable
-        sock = socket.create_connection(("www.iers.org", 80))
-        if sock is not None: sock.close
-        return True
-    except OSError:
-        pass
-    # try alternate source if above server is down ...
-    try:
-        # connect to the host -- tells us if the host is actually reachable
-        sock = socket.create_connection(("maia.usno.navy.mil", 80))
-        if sock is not None: sock.close
-        return True
-    except OSError:
-        pass
-    return False    # if neither is reachable
-
-# NOTE: the IERS server is unavailable (due to maintenance work in the first 3 weeks, at least, of April 2022)
-#       however, although the USNO server currently works, it was previously down for 2.5 years!
-#       So it is still best to try using the IERS server as first oprion, and USNO as second.
-
-def testServer(filename, url):
-    url += filename
-    try:
-        connection2 = urlopen(url)
-    except Exception as e:
-        e2 = IOError('cannot download {0} because {1}'.format(url, e))
-        e2.__cause__ = None
-#        raise e2
-        return False
-    return True     # server works
-
-def download_EOP(path, filename, url, loc):
-    # NOTE: the following 'print' statement does not print immediately in Linux!
-    #print("Downloading EOP data from USNO...", end ="")
-    sys.stdout.write("Downloading EOP data from {}...".format(loc))
-    sys.stdout.flush()
-    filepath = os.path.join(path, filename)
-    url += filename
-    try:
-        connection = urlopen(url)
-    except urllib.error.URLError as e:
-        #raise IOError('error getting {0} - {1}'.format(url, e))
-        print('\nError getting {0} - {1}'.format(url, e))
-        sys.exit(0)
-    blocksize = 128*1024
-
-    # Claim our own unique download filename.
-
-    tempbase = tempname = path + filename + '.download'
-    flags = getattr(os, 'O_BINARY', 0) | os.O_CREAT | os.O_EXCL | os.O_RDWR
-    i = 1
-    while True:
-        try:
-            fd = os.open(tempname, flags, 0o666)
-        except OSError as e:  # "FileExistsError" is not supported by Python 2
-            if e.errno != errno.EEXIST:
-                raise
-            i += 1
-            tempname = '{0}{1}'.format(tempbase, i)
-        else:
-            break
-
-    # Download to the temporary filename.
-
-    with os.fdopen(fd, 'wb') as w:
-        try:
-            length = 0
-            while True:
-                data = connection.read(blocksize)
-                if not data:
-                    break
-                w.write(data)
-                length += len(data)
-            w.flush()
-        except Exception as e:
-            raise IOError('error getting {0} - {1}'.format(url, e))
-
-    # Rename the temporary file to the destination name.
-
-    if os.path.exists(filepath):
-        os.remove(filepath)
-    try:
-        os.rename(tempname, filepath)
-    except Exception as e:
-        raise IOError('error renaming {0} to {1} - {2}'.format(tempname, filepath, e))
-
-    sys.stdout.write("done.\n")
-    sys.stdout.flush()
-
 def init_sf(spad):
     global ts, eph, earth, moon, sun, venus, mars, jupiter, saturn, df
     load = Loader(spad)         # spad = folder to store the downloaded files
@@ -178,27 +93,18 @@ def init_sf(spad):
 
     if config.useIERS:
         if SkyfieldVersion("1.31") >= 0:
+            swap_new(spad, EOPdf)   # a newer file downloaded during the previous run
             if os.path.isfile(dfIERS):
                 if load.days_old(EOPdf) > float(config.ageIERS):
-                    if isConnected():
-                        if testServer(EOPdf, urlIERS):  # first try downloading via FTP
-                            load.download(EOPdf)
-                        elif testServer(EOPdf, urlUSNO):# then try the USNO server
-                            download_EOP(spad,EOPdf,urlUSNO,"USNO")
-                        else:   # finally try the IERS datacenter (available in more countries)
-                            download_EOP(spad,EOPdf,urlDCIERS,"IERS datacenter")
-                    else: print("NOTE: no Internet connection... using existing '{}'".format(EOPdf))
-                ts = load.timescale(builtin=False)	# timescale object
+                    refresh(spad, EOPdf, [urlIERS, urlUSNO, urlDCIERS])
+                ts = eop_timescale(load, dfIERS)	# timescale object
                 config.useIERSEOP = True
             else:
-                if isConnected():
-                    if testServer(EOPdf, urlIERS):  # first try downloading via FTP
-                        load.download(EOPdf)
-                    elif testServer(EOPdf, urlUSNO):# then try the USNO server
-                        download_EOP(spad,EOPdf,urlUSNO,"USNO")
-                    else:   # finally try the IERS datacenter (available in more countries)
-                        download_EOP(spad,EOPdf,urlDCIERS,"IERS datacenter")
-                    ts = load.timescale(builtin=False)	# timescale object
+                # first try downloading via FTP, then the USNO server,
+                # finally the IERS datacenter (available in more countries)
+                if fetch(spad, EOPdf, [urlIERS, urlUSNO, urlDCIERS], True):
+                    os.replace(dfIERS + ".new", dfIERS)
+                    ts = eop_timescale(load, dfIERS)	# timescale object
                     config.useIERSEOP = True
                 else:
                     print("NOTE: no Internet connection... using built-in UT1-tables")
@@ -209,74 +115,22 @@ def init_sf(spad):
         ts = load.timescale()	# timescale object with built-in UT1-tables
 
     if config.useIERSEOP and os.path.isfile(dfIERS):
-# get the IERS EOP data "release date" according to these rules:
-#   - begin searching within this millenium (ignoring data from 02 Jan 1973 to 31 Dec 1999)
-#   - halt when the following value is "P", i.e. predicted as opposed to measured:
-#       - flag for Bull. A UT1-UTC values
-#   - step back one day to the record that has "I", i.e. measured data.
-#
-# the date of this record is the last date with IERS measured data.
-#   [the more recent the date, the more accurate/reliable are both the past IERS
-#   Earth Orientation Parameters as well as the future (predicted) EOP data values.]
-
-# IERS EOP data format definition:
-# https://maia.usno.navy.mil/ser7/readme.finals2000A
-
-        queue = deque(["a", "b", "c", "d"])
-        PredData = False    # True when Prediction data flagged
-        PredEnd  = False    # True when Prediction data no longer flagged
-
-        iers = ""
-        with open(dfIERS) as file:
-            for line in file:
-                mjd = int(line[7:12])
-
-                if not PredData and mjd >= 51544:    # skip data in previous  millenium
-                    queue.append(line)
-                    queue.popleft()
-                    c1 = line[16:17]    # IERS (I) or Prediction (P) flag for Bull. A polar motion values
-                    c2 = line[57:58]    # IERS (I) or Prediction (P) flag for Bull. A UT1-UTC values
-                    c3 = line[95:96]    # IERS (I) or Prediction (P) flag for Bull. A nutation values
-                    if not PredData and c2 == "P":
-                        PredData = True
-                        iers = ""
-                        while queue:
-                            iersdata = queue.pop()
-                            if iersdata[57:58] == "I":
-                                iers = iersdata
-                                break
-                        if iers == "": iers = iersdata
-                        year = int(iers[0:2]) + 2000
-                        mth  = int(iers[2:4])
-                        day  = int(iers[4:6])
-                        dt = date(year, mth, day)
-                        config.txtIERSEOP = "IERS Earth Orientation data as of " + dt.strftime("%d-%b-%Y")
-                elif PredData:    # search for end of Prediction data
-                    c2 = line[57:58]    # IERS (I) or Prediction (P) flag for Bull. A UT1-UTC values
-                    if c2 == "P":
-                        iers = line
-                    else:
-                        PredEnd = True
-                        break
-
-        if iers == "":
+        # the last dates with measured and predicted IERS EOP data (see eopcache.scan_finals)
+        dt, dt2 = eop_dates(dfIERS)
+        if dt2 is None:
             print("Error: IERS Earth Orientation Parameters data file is incomplete...")
             print("       most likely the download did not finish properly.")
             print("       Please delete the 'finals2000A.all' data file and")
             print("       rerun this program - it will be downloaded anew.")
             sys.exit(0)
-
-        # detect end of Prediction data even if file ends with c2 == "P" ...
-        year = int(iers[0:2]) + 2000
-        mth  = int(iers[2:4])
-        day  = int(iers[4:6])
-        dt2 = date(year, mth, day)
+        if dt is not None:
+            config.txtIERSEOP = "IERS Earth Orientation data as of " + dt.strftime("%d-%b-%Y")
         config.endIERSEOP = "IERS Earth Orientation predictions end " + dt2.strftime("%d-%b-%Y")
         config.dt_IERSEOP = dt2
 
     if config.ephndx in set([0, 1, 2, 3, 4]):
     
-        eph = load(config.ephemeris[config.ephndx][0])	# load chosen ephemeris
+        eph = kernel(load)	# chosen ephemeris (or an excerpt for config.ephspan)
         earth   = eph['earth']
         moon    = eph['moon']
         sun     = eph['sun']
@@ -288,11 +142,11 @@ def init_sf(spad):
         else:
             mars    = eph['mars']
 
-    # load the Hipparcos catalog as a 118,218 row Pandas dataframe.
-    with load.open(hipparcos.URL) as f:
-        #hipparcos_epoch = ts.tt(1991.25)
-        df = hipparcos.load_dataframe(f)
+    # the Hipparcos catalog (118,218 stars) is read when the first star is looked up
+    df = HipCatalog(load)
 
+    # persistent cache of calculated values (valid only for this ephemeris & EOP data)
+    open_cache(spad, dfIERS if config.useIERSEOP else "", VERSION)
     return ts
 
 #------------------------
@@ -568,17 +422,23 @@ def rise_set_error(y, txt, t0):
 
 def getDUT1(d):         # used in nautical.doublepage
     # obtain calculation parameters
-    t = ts.ut1(d.year, d.month, d.day, 0, 0, 0)
+    t = ut1(ts, d.year, d.month, d.day, 0, 0, 0)
     return t.dut1, t.delta_t
 
+def getDUT1s(d, n0, n1):    # used in pagestore.ut1window
+    # UT1-UTC (seconds) at 00:00 UT1 on each day from d+n0 to d+n1
+    t = ts.ut1(d.year, d.month, d.day + np.arange(n0, n1+1), 0, 0, 0)
+    return t.dut1
+
 #-------------------------------
 #   Sun and Moon calculations
 #-------------------------------
 
+@cached
 def sunGHA(d):              # used in nautical.sunmoontab(m)
     # compute sun's GHA and DEC per hour of day
 
-    t = ts.ut1(d.year, d.month, d.day, hour_of_day, 0, 0)
+    t = ut1(ts, d.year, d.month, d.day, hour_of_day, 0, 0)
     position = earth.at(t).observe(sun)
     #ra = position.apparent().radec(epoch='date')[0]
     #dec = position.apparent().radec(epoch='date')[1]
@@ -599,8 +459,8 @@ def sunGHA(d):              # used in nautical.sunmoontab(m)
 
 def sunSD(d):               # used in nautical.sunmoontab(m)
     # compute semi-diameter of sun and sun's declination change per hour (in minutes)
-    t00 = ts.ut1(d.year, d.month, d.day, 0, 0, 0)
-    #t12 = ts.ut1(d.year, d.month, d.day, 12, 0, 0)
+    t00 = ut1(ts, d.year, d.month, d.day, 0, 0, 0)
+    #t12 = ut1(ts, d.year, d.month, d.day, 12, 0, 0)
     position = earth.at(t00).observe(sun)
     distance = position.apparent().radec(epoch='date')[2]
     dist_km = distance.km
@@ -608,11 +468,11 @@ def sunSD(d):               # used in nautical.sunmoontab(m)
     svmr  = degrees(atan(695700.0 / dist_km))   # volumetric mean radius of sun = 695700 km
     sunVMRm = "{:0.1f}".format(svmr * 60)   # convert to minutes of arc
 
-    t0 = ts.ut1(d.year, d.month, d.day, 0, 0, 0)
+    t0 = ut1(ts, d.year, d.month, d.day, 0, 0, 0)
     position0 = earth.at(t0).observe(sun)
     dec0 = position0.apparent().radec(epoch='date')[1]
     D0 = dec0.degrees * 60.0    # convert to minutes of arc
-    t1= ts.ut1(d.year, d.month, d.day, 1, 0, 0)
+    t1= ut1(ts, d.year, d.month, d.day, 1, 0, 0)
     position1 = earth.at(t1).observe(sun)
     dec1 = position1.apparent().radec(epoch='date')[1]
     D1 = dec1.degrees * 60.0    # convert to minutes of arc
@@ -625,10 +485,11 @@ def sunSD(d):               # used in nautical.sunmoontab(m)
     sunDm = "{:0.1f}".format(Dvalue)
     return sunVMRm, sunDm
 
+@cached
 def moonSD(d):              # used in nautical.sunmoontab(m)
     # compute semi-diameter of moon (in minutes)
-    t00 = ts.ut1(d.year, d.month, d.day, 0, 0, 0)
-    #t12 = ts.ut1(d.year, d.month, d.day, 12, 0, 0)
+    t00 = ut1(ts, d.year, d.month, d.day, 0, 0, 0)
+    #t12 = ut1(ts, d.year, d.month, d.day, 12, 0, 0)
     position = earth.at(t00).observe(moon)
     distance = position.apparent().radec(epoch='date')[2]
     dist_km = distance.km
@@ -637,9 +498,10 @@ def moonSD(d):              # used in nautical.sunmoontab(m)
     sdmm = "{:0.1f}".format(sdm * 60)  # convert to minutes of arc
     return sdmm
 
+@cached
 def moonGHA(d, with_seconds = False):  # used in nautical.sunmoontab(m) & eventtables.equationtab
     # compute moon's GHA, DEC and HP per hour of day
-    t = ts.ut1(d.year, d.month, d.day, hour_of_day, 0, 0)
+    t = ut1(ts, d.year, d.month, d.day, hour_of_day, 0, 0)
     position = earth.at(t).observe(moon)
     #ra = position.apparent().radec(epoch='date')[0]
     #dec = position.apparent().radec(epoch='date')[1]
@@ -648,12 +510,12 @@ def moonGHA(d, with_seconds = False):  # used in nautical.sunmoontab(m) & eventt
 
     if with_seconds:
         # also compute moon's GHA at End of Day (23:59:59.5) and Start of Day (24 hours earlier)
-        tSoD = ts.ut1(d.year, d.month, d.day-1, 23, 59, 59.5)
-        tEoD = ts.ut1(d.year, d.month, d.day, 23, 59, 59.5)
+        tSoD = ut1(ts, d.year, d.month, d.day-1, 23, 59, 59.5)
+        tEoD = ut1(ts, d.year, d.month, d.day, 23, 59, 59.5)
     else:   # round to minutes of time
         # also compute moon's GHA at End of Day (23:59:30) and Start of Day (24 hours earlier)
-        tSoD = ts.ut1(d.year, d.month, d.day-1, 23, 59, 30)
-        tEoD = ts.ut1(d.year, d.month, d.day, 23, 59, 30)
+        tSoD = ut1(ts, d.year, d.month, d.day-1, 23, 59, 30)
+        tEoD = ut1(ts, d.year, d.month, d.day, 23, 59, 30)
 
     posSoD = earth.at(tSoD).observe(moon)
     raSoD = posSoD.apparent().radec(epoch='date')[0]
@@ -690,9 +552,9 @@ def moonGHA(d, with_seconds = False):  # used in nautical.sunmoontab(m) & eventt
 
 def moonVD(d00, d):           # used in nautical.sunmoontab(m)
 # OLD:  # first value required is from 23:30 on the previous day...
-# OLD:  t0 = ts.ut1(d00.year, d00.month, d00.day, 23, 30, 0)
+# OLD:  t0 = ut1(ts, d00.year, d00.month, d00.day, 23, 30, 0)
     # first value required is at 00:00 on the current day...
-    t0 = ts.ut1(d.year, d.month, d.day, 0, 0, 0)
+    t0 = ut1(ts, d.year, d.month, d.day, 0, 0, 0)
     pos0 = earth.at(t0).observe(moon)
     #ra0 = pos0.apparent().radec(epoch='date')[0]
     #dec0 = pos0.apparent().radec(epoch='date')[1]
@@ -703,9 +565,9 @@ def moonVD(d00, d):           # used in nautical.sunmoontab(m)
         D0 = round(D0, 1)
 
 # OLD:  # ...then 24 values at hourly intervals from 23:30 onwards
-# OLD:  t = ts.ut1(d.year, d.month, d.day, hour_of_day, 30, 0)
+# OLD:  t = ut1(ts, d.year, d.month, d.day, hour_of_day, 30, 0)
     # ...then 24 values at hourly intervals from 00:00 onwards
-    t = ts.ut1(d.year, d.month, d.day, next_hour_of_day, 0, 0)
+    t = ut1(ts, d.year, d.month, d.day, next_hour_of_day, 0, 0)
     position = earth.at(t).observe(moon)
     #ra = position.apparent().radec(epoch='date')[0]
     #dec = position.apparent().radec(epoch='date')[1]
@@ -736,8 +598,9 @@ def moonVD(d00, d):           # used in nautical.sunmoontab(m)
 #   Venus, Mars, Jupiter & Saturn calculations
 #------------------------------------------------
 
+@cached
 def venusGHA(d):            # used in nautical.planetstab(m)
-    t = ts.ut1(d.year, d.month, d.day, hour_of_day, 0, 0)
+    t = ut1(ts, d.year, d.month, d.day, hour_of_day, 0, 0)
     position = earth.at(t).observe(venus)
     #ra = position.apparent().radec(epoch='date')[0]
     #dec = position.apparent().radec(epoch='date')[1]
@@ -754,8 +617,9 @@ def venusGHA(d):            # used in nautical.planetstab(m)
     #    print(i, ghas[i])
     return ghas, decs, degs
 
+@cached
 def marsGHA(d):             # used in nautical.planetstab(m)
-    t = ts.ut1(d.year, d.month, d.day, hour_of_day, 0, 0)
+    t = ut1(ts, d.year, d.month, d.day, hour_of_day, 0, 0)
     position = earth.at(t).observe(mars)
     #ra = position.apparent().radec(epoch='date')[0]
     #dec = position.apparent().radec(epoch='date')[1]
@@ -772,8 +636,9 @@ def marsGHA(d):             # used in nautical.planetstab(m)
     #    print(i, ghas[i])
     return ghas, decs, degs
 
+@cached
 def jupiterGHA(d):          # used in nautical.planetstab(m)
-    t = ts.ut1(d.year, d.month, d.day, hour_of_day, 0, 0)
+    t = ut1(ts, d.year, d.month, d.day, hour_of_day, 0, 0)
     position = earth.at(t).observe(jupiter)
     #ra = position.apparent().radec(epoch='date')[0]
     #dec = position.apparent().radec(epoch='date')[1]
@@ -790,8 +655,9 @@ def jupiterGHA(d):          # used in nautical.planetstab(m)
     #    print(i, ghas[i])
     return ghas, decs, degs
 
+@cached
 def saturnGHA(d):           # used in nautical.planetstab(m)
-    t = ts.ut1(d.year, d.month, d.day, hour_of_day, 0, 0)
+    t = ut1(ts, d.year, d.month, d.day, hour_of_day, 0, 0)
     position = earth.at(t).observe(saturn)
     #ra = position.apparent().radec(epoch='date')[0]
     #dec = position.apparent().radec(epoch='date')[1]
@@ -810,7 +676,7 @@ def saturnGHA(d):           # used in nautical.planetstab(m)
 
 def vdm_Venus(d):           # used in nautical.planetstab(m)
     # compute v (GHA correction), d (Declination correction), m (magnitude of planet)
-    t0 = ts.ut1(d.year, d.month, d.day, 0, 0, 0)
+    t0 = ut1(ts, d.year, d.month, d.day, 0, 0, 0)
     position0 = earth.at(t0).observe(venus)
     #ra0 = position0.apparent().radec(epoch='date')[0]	# RA
     #dec0 = position0.apparent().radec(epoch='date')[1]	# declination
@@ -818,7 +684,7 @@ def vdm_Venus(d):           # used in nautical.planetstab(m)
     D0 = dec0.degrees * 60.0    # convert to minutes of arc
     mag = "{:0.2f}".format(planetary_magnitude(position0))  # planetary magnitude
 
-    t1 = ts.ut1(d.year, d.month, d.day, 1, 0, 0)
+    t1 = ut1(ts, d.year, d.month, d.day, 1, 0, 0)
     position1 = earth.at(t1).observe(venus)
     #ra1 = position1.apparent().radec(epoch='date')[0]	# RA
     #dec1 = position1.apparent().radec(epoch='date')[1]	# declination
@@ -841,7 +707,7 @@ def vdm_Venus(d):           # used in nautical.planetstab(m)
 def vdm_Mars(d):            # used in nautical.planetstab(m)
     # compute v (GHA correction), d (Declination correction)
     # NOTE: m (magnitude of planet) comes from alma_ephem.py
-    t0 = ts.ut1(d.year, d.month, d.day, 0, 0, 0)
+    t0 = ut1(ts, d.year, d.month, d.day, 0, 0, 0)
     position0 = earth.at(t0).observe(mars)
     #ra0 = position0.apparent().radec(epoch='date')[0]	# RA
     #dec0 = position0.apparent().radec(epoch='date')[1]	# declination
@@ -849,7 +715,7 @@ def vdm_Mars(d):            # used in nautical.planetstab(m)
     D0 = dec0.degrees * 60.0    # convert to minutes of arc
     mag = "{:0.2f}".format(planetary_magnitude(position0))  # planetary magnitude
 
-    t1 = ts.ut1(d.year, d.month, d.day, 1, 0, 0)
+    t1 = ut1(ts, d.year, d.month, d.day, 1, 0, 0)
     position1 = earth.at(t1).observe(mars)
     #ra1 = position1.apparent().radec(epoch='date')[0]	# RA
     #dec1 = position1.apparent().radec(epoch='date')[1]	# declination
@@ -871,7 +737,7 @@ def vdm_Mars(d):            # used in nautical.planetstab(m)
 
 def vdm_Jupiter(d):         # used in nautical.planetstab(m)
     # compute v (GHA correction), d (Declination correction), m (magnitude of planet)
-    t0 = ts.ut1(d.year, d.month, d.day, 0, 0, 0)
+    t0 = ut1(ts, d.year, d.month, d.day, 0, 0, 0)
     position0 = earth.at(t0).observe(jupiter)
     #ra0 = position0.apparent().radec(epoch='date')[0]	# RA
     #dec0 = position0.apparent().radec(epoch='date')[1]	# declination
@@ -879,7 +745,7 @@ def vdm_Jupiter(d):         # used in nautical.planetstab(m)
     D0 = dec0.degrees * 60.0    # convert to minutes of arc
     mag = "{:0.2f}".format(planetary_magnitude(position0))  # planetary magnitude
 
-    t1 = ts.ut1(d.year, d.month, d.day, 1, 0, 0)
+    t1 = ut1(ts, d.year, d.month, d.day, 1, 0, 0)
     position1 = earth.at(t1).observe(jupiter)
     #ra1 = position1.apparent().radec(epoch='date')[0]	# RA
     #dec1 = position1.apparent().radec(epoch='date')[1]	# declination
@@ -902,7 +768,7 @@ def vdm_Jupiter(d):         # used in nautical.planetstab(m)
 def vdm_Saturn(d):          # used in nautical.planetstab(m)
     # compute v (GHA correction), d (Declination correction)
     # NOTE: m (magnitude of planet) comes from alma_ephem.py
-    t0 = ts.ut1(d.year, d.month, d.day, 0, 0, 0)
+    t0 = ut1(ts, d.year, d.month, d.day, 0, 0, 0)
     position0 = earth.at(t0).observe(saturn)
     #ra0 = position0.apparent().radec(epoch='date')[0]	# RA
     #dec0 = position0.apparent().radec(epoch='date')[1]	# declination
@@ -910,7 +776,7 @@ def vdm_Saturn(d):          # used in nautical.planetstab(m)
     D0 = dec0.degrees * 60.0    # convert to minutes of arc
     mag = "{:0.2f}".format(planetary_magnitude(position0))  # planetary magnitude
 
-    t1 = ts.ut1(d.year, d.month, d.day, 1, 0, 0)
+    t1 = ut1(ts, d.year, d.month, d.day, 1, 0, 0)
     position1 = earth.at(t1).observe(saturn)
     #ra1 = position1.apparent().radec(epoch='date')[0]	# RA
     #dec1 = position1.apparent().radec(epoch='date')[1]	# declination
@@ -934,18 +800,20 @@ def vdm_Saturn(d):          # used in nautical.planetstab(m)
 #   Aries & planet transit calculations
 #-----------------------------------------
 
+@cached
 def ariesGHA(d):            # used in nautical.planetstab(m)
-    t = ts.ut1(d.year, d.month, d.day, hour_of_day, 0, 0)
+    t = ut1(ts, d.year, d.month, d.day, hour_of_day, 0, 0)
 
     ghas = ['' for x in range(24)]
     for i in range(24):
         ghas[i] = fmtgha(t[i].gast, 0)
     return ghas
 
+@cached
 def ariestransit(d):        # used in nautical.planetstab(m)
     # returns transit time of aries for the *PREVIOUS* date
 
-    t = ts.ut1(d.year, d.month, d.day, 0, 0, 0)
+    t = ut1(ts, d.year, d.month, d.day, 0, 0, 0)
     trans = 24 - (t.gast / 1.00273790935)
     hr = int(trans)
     # round >=30 seconds to next minute
@@ -959,15 +827,15 @@ def ariestransit(d):        # used in nautical.planetstab(m)
     ttime = '{:02d}:{:02d}'.format(hr,min)
     return ttime
 
+@cached
 def planetstransit(d, with_seconds = False):        # used in nautical.starstab & eventtables.meridiantab
     # returns SHA and Meridian Passage for the navigational planets
     d1 = d + timedelta(days=1)
-    t0 = ts.ut1(d.year, d.month, d.day, 0, 0, 0)
-    t1 = ts.ut1(d1.year, d1.month, d1.day, 0, 0, 0)
+    t0 = ut1(ts, d.year, d.month, d.day, 0, 0, 0)
+    t1 = ut1(ts, d1.year, d1.month, d1.day, 0, 0, 0)
 
-    if SkyfieldVersion("1.48") >= 0:
-        topos = wgs84.latlon(0.0 * N, 0.0 * E, elevation_m=0.0) # default latitude 0°N (any will do)
-        observer = earth + topos
+    if SF148:
+        topos, observer, latNS = site(earth, 0.0)   # default latitude 0°N (any will do)
 
 # Venus
     position0 = earth.at(t0).observe(venus)
@@ -983,13 +851,13 @@ def planetstransit(d, with_seconds = False):        # used in nautical.starstab
 
     # calculate planet transit
     start00 = Time.time()                       # 00000
-    if SkyfieldVersion("1.48") < 0:
+    if not SF148:
         transit_time, y = almanac.find_discrete(t0, t1, planet_transit(venus))
-        config.stopwatch += Time.time()-start00 # 00000
+        runstats.add('events.transit', Time.time()-start00)  # 00000
         vtrans = rise_set(transit_time,y,u'Venus   0{} E transit'.format(degree_sign),with_seconds)[0]
     else:
-        transit_time = almanac.find_transits(observer, venus, t0, t1)
-        config.stopwatch += Time.time()-start00 # 00000
+        transit_time = transits(observer, 'venus', venus, t0, t1)
+        runstats.add('events.transit', Time.time()-start00)  # 00000
         vtrans = fmt_transits(transit_time,u'Venus   0{} E transit'.format(degree_sign),with_seconds)[0]
     #if len(transit_time) != 1:
     #    print('Venus returned %s transit values' %len(transit_time))
@@ -1004,13 +872,13 @@ def planetstransit(d, with_seconds = False):        # used in nautical.starstab
 
     # calculate planet transit
     start00 = Time.time()                       # 00000
-    if SkyfieldVersion("1.48") < 0:
+    if not SF148:
         transit_time, y = almanac.find_discrete(t0, t1, planet_transit(mars))
-        config.stopwatch += Time.time()-start00 # 00000
+        runstats.add('events.transit', Time.time()-start00)  # 00000
         marstrans = rise_set(transit_time,y,u'Mars    0{} E transit'.format(degree_sign),with_seconds)[0]
     else:
-        transit_time = almanac.find_transits(observer, mars, t0, t1)
-        config.stopwatch += Time.time()-start00 # 00000
+        transit_time = transits(observer, 'mars', mars, t0, t1)
+        runstats.add('events.transit', Time.time()-start00)  # 00000
         marstrans = fmt_transits(transit_time,u'Mars    0{} E transit'.format(degree_sign),with_seconds)[0]
     #if len(transit_time) != 1:
     #    print('Mars returned %s transit values' %len(transit_time))
@@ -1022,13 +890,13 @@ def planetstransit(d, with_seconds = False):        # used in nautical.starstab
 
     # calculate planet transit
     start00 = Time.time()                       # 00000
-    if SkyfieldVersion("1.48") < 0:
+    if not SF148:
         transit_time, y = almanac.find_discrete(t0, t1, planet_transit(jupiter))
-        config.stopwatch += Time.time()-start00 # 00000
+        runstats.add('events.transit', Time.time()-start00)  # 00000
         jtrans = rise_set(transit_time,y,u'Jupiter 0{} E transit'.format(degree_sign),with_seconds)[0]
     else:
-        transit_time = almanac.find_transits(observer, jupiter, t0, t1)
-        config.stopwatch += Time.time()-start00 # 00000
+        transit_time = transits(observer, 'jupiter', jupiter, t0, t1)
+        runstats.add('events.transit', Time.time()-start00)  # 00000
         jtrans = fmt_transits(transit_time,u'Jupiter 0{} E transit'.format(degree_sign),with_seconds)[0]
     #if len(transit_time) != 1:
     #    print('Jupiter returned %s transit values' %len(transit_time))
@@ -1040,19 +908,24 @@ def planetstransit(d, with_seconds = False):        # used in nautical.starstab
 
     # calculate planet transit
     start00 = Time.time()                       # 00000
-    if SkyfieldVersion("1.48") < 0:
+    if not SF148:
         transit_time, y = almanac.find_discrete(t0, t1, planet_transit(saturn))
-        config.stopwatch += Time.time()-start00 # 00000
+        runstats.add('events.transit', Time.time()-start00)  # 00000
         sattrans = rise_set(transit_time,y,u'Saturn  0{} E transit'.format(degree_sign),with_seconds)[0]
     else:
-        transit_time = almanac.find_transits(observer, saturn, t0, t1)
-        config.stopwatch += Time.time()-start00 # 00000
+        transit_time = transits(observer, 'saturn', saturn, t0, t1)
+        runstats.add('events.transit', Time.time()-start00)  # 00000
         sattrans = fmt_transits(transit_time,u'Saturn  0{} E transit'.format(degree_sign),with_seconds)[0]
     #if len(transit_time) != 1:
     #    print('Saturn returned %s transit values' %len(transit_time))
 
     return [vsha,vtrans,marssha,marstrans,jsha,jtrans,satsha,sattrans,hpmars,hpvenus]
 
+def transits(observer, name, planet, t0, t1):
+    # meridian transits between t0 and t1 (from the transient store)
+    return eventstore.day_events(ts, ('transit', name), t0, t1,
+        lambda a, b, noon: [(almanac.find_transits(observer, planet, a, b), None)])[0][0]
+
 def planet_transit(planet_name):
     # Build a function of time that returns a planet's upper transit time.
 
@@ -1074,11 +947,12 @@ def planet_transit(planet_name):
 #   star calculations
 #-----------------------
 
+@cached
 def stellar_info(d):        # used in starstab
     # returns a list of lists with name, SHA and Dec all navigational stars for epoch of date.
 
-    t00 = ts.ut1(d.year, d.month, d.day, 0, 0, 0)   #calculate at midnight
-    #t12 = ts.ut1(d.year, d.month, d.day, 12, 0, 0)  #calculate at noon
+    t00 = ut1(ts, d.year, d.month, d.day, 0, 0, 0)   #calculate at midnight
+    #t12 = ut1(ts, d.year, d.month, d.day, 12, 0, 0)  #calculate at noon
     out = []
 
     for line in db.strip().split('\n'):
@@ -1167,6 +1041,7 @@ Markab,113963
 #   SUN TWILIGHT table
 #------------------------
 
+@cached
 def twilight(d, lat, with_seconds = False):     # used in nautical.twilighttab (section 1)
     # Returns for given date and latitude(in full degrees):
     # naut. and civil twilight (before sunrise), sunrise, meridian passage, sunset, civil and nautical twilight (after sunset).
@@ -1175,33 +1050,27 @@ def twilight(d, lat, with_seconds = False):     # used in nautical.twilighttab (
 
     out = [0,0,0,0,0,0]
     hemisph = 'N' if lat >= 0 else 'S'
-    latNS = "{:3.1f} {}".format(abs(lat), hemisph)
     dt = datetime(d.year, d.month, d.day, 0, 0, 0)
-    if SkyfieldVersion("1.35") >= 0:
-        topos = wgs84.latlon(lat, 0.0 * E, elevation_m=0.0)
-        observer = earth + topos
-    else:
-        topos = Topos(latNS, "0.0 E")   # Topos is deprecated in Skyfield v1.35!
+    topos, observer, latNS = site(earth, lat)
 
     if with_seconds:
         dt -= timedelta(seconds=0.5)    # search from 0.5 seconds before midnight
     else:
         dt -= timedelta(seconds=30)     # search from 30 seconds before midnight
 
-    t0 = ts.ut1(dt.year, dt.month, dt.day,   dt.hour, dt.minute, dt.second)
-    t1 = ts.ut1(dt.year, dt.month, dt.day+1, dt.hour, dt.minute, dt.second)
+    t0 = ut1(ts, dt.year, dt.month, dt.day,   dt.hour, dt.minute, dt.second)
+    t1 = ut1(ts, dt.year, dt.month, dt.day+1, dt.hour, dt.minute, dt.second)
     abhd = False                                # above/below horizon display NOT enabled
 
     # Sunrise/Sunset...
     start00 = Time.time()                       # 00000
-    if SkyfieldVersion("1.48") < 0:
-        actual, y = almanac.find_discrete(t0, t1, f_sun(topos, 0.8333))
-        config.stopwatch += Time.time()-start00 # 00000
+    if not SF148:
+        actual, y = almanac.find_discrete(t0, t1, f_sun(observer, 0.8333))
+        runstats.add('events.sun', Time.time()-start00)  # 00000
         out[2], out[3], r2, s2, fs = rise_set(actual,y,latNS,with_seconds)
     else:
-        sunrise, yR = almanac.find_risings(observer, sun, t0, t1, -0.8333)
-        sunset,  yS = almanac.find_settings(observer, sun, t0, t1, -0.8333)
-        config.stopwatch += Time.time()-start00 # 00000
+        (sunrise, yR), (sunset, yS) = sun_events(observer, lat, t0, t1, 0.8333)
+        runstats.add('events.sun', Time.time()-start00)  # 00000
         out[2], out[3], r2, s2, fs = fmt_rise_set(sunrise,sunset,yR,yS,latNS,with_seconds)
 
     if out[2] == '--:--' and out[3] == '--:--':	# if neither sunrise nor sunset...
@@ -1212,14 +1081,13 @@ def twilight(d, lat, with_seconds = False):     # used in nautical.twilighttab (
 
     # Civil Twilight...
     start00 = Time.time()                       # 00000
-    if SkyfieldVersion("1.48") < 0:
-        civil, y = almanac.find_discrete(t0, t1, f_sun(topos, 6.0))
-        config.stopwatch += Time.time()-start00 # 00000
+    if not SF148:
+        civil, y = almanac.find_discrete(t0, t1, f_sun(observer, 6.0))
+        runstats.add('events.sun', Time.time()-start00)  # 00000
         out[1], out[4], r2, s2, fs = rise_set(civil,y,latNS,with_seconds)
     else:
-        sunrise, yR = almanac.find_risings(observer, sun, t0, t1, -6.0)
-        sunset,  yS = almanac.find_settings(observer, sun, t0, t1, -6.0)
-        config.stopwatch += Time.time()-start00 # 00000
+        (sunrise, yR), (sunset, yS) = sun_events(observer, lat, t0, t1, 6.0)
+        runstats.add('events.sun', Time.time()-start00)  # 00000
         out[1], out[4], r2, s2, fs = fmt_rise_set(sunrise,sunset,yR,yS,latNS,with_seconds)
 
     if abhd and out[1] == '--:--' and out[4] == '--:--':	# if neither begin nor end...
@@ -1229,14 +1097,13 @@ def twilight(d, lat, with_seconds = False):     # used in nautical.twilighttab (
 
     # Nautical Twilight...
     start00 = Time.time()                       # 00000
-    if SkyfieldVersion("1.48") < 0:
-        naut, y = almanac.find_discrete(t0, t1, f_sun(topos, 12.0))
-        config.stopwatch += Time.time()-start00 # 00000
+    if not SF148:
+        naut, y = almanac.find_discrete(t0, t1, f_sun(observer, 12.0))
+        runstats.add('events.sun', Time.time()-start00)  # 00000
         out[0], out[5], r2, s2, fs = rise_set(naut,y,latNS,with_seconds)
     else:
-        sunrise, yR = almanac.find_risings(observer, sun, t0, t1, -12.0)
-        sunset,  yS = almanac.find_settings(observer, sun, t0, t1, -12.0)
-        config.stopwatch += Time.time()-start00 # 00000
+        (sunrise, yR), (sunset, yS) = sun_events(observer, lat, t0, t1, 12.0)
+        runstats.add('events.sun', Time.time()-start00)  # 00000
         out[0], out[5], r2, s2, fs = fmt_rise_set(sunrise,sunset,yR,yS,latNS,with_seconds)
 
     if abhd and out[0] == '--:--' and out[5] == '--:--':	# if neither begin nor end...
@@ -1262,9 +1129,14 @@ def midnightsun(d, hemisph):
         out = r'''\rule{12Pt}{4Pt}'''
     return out
 
-def f_sun(topos, degBelowHorizon):
+def sun_events(observer, lat, t0, t1, horizon):
+    # [(sunrise, yR), (sunset, yS)] between t0 and t1 (from the transient store)
+    return eventstore.day_events(ts, ('sun', lat, horizon), t0, t1,
+        lambda a, b, noon: [almanac.find_risings(observer, sun, a, b, -horizon), almanac.find_settings(observer, sun, a, b, -horizon)])
+
+def f_sun(observer, degBelowHorizon):
     # Build a function of time that returns the sun above/below horizon state.
-    topos_at = (earth + topos).at
+    topos_at = observer.at
 
     def is_sun_up_at(t):
         """The function that this returns will expect a single argument that is a 
@@ -1287,25 +1159,6 @@ def f_sun(topos, degBelowHorizon):
 #    moonvisible[0] is not linked to a latitude but a manual override
 moonvisible = [None] * 32       # moonvisible[0] up to moonvisible[31]
 
-# create a list of dates with pre-calculated moonrise/moonset data in 'np_array'
-#    MoonDate[0 to MDlen-1] = a date, the index of which corresponds to the first index in 'np_array'
-# note: this is only used for hh:mm rise/set times (rounded to the minute)
-# note: MDlen > 5 has no advantage - it only wastes array memory space
-MDlen = 5                   # number of days in transient MoonData store (np_array)
-MoonDate = [None] * MDlen   # MoonDate[0] up to MoonDate[MDlen-1]
-MDndx = MDlen - 1           # index to latest added date (initially 0 will be chosen)
-
-# create a homogeneous NumPy array of 2 Moon Rise/Set data values per 31 latitudes, up to 'MDlen' adjacent days
-#    This increases performance when creating a Nautical Almanac by about 12% 
-#       by avoiding data re-calculation in special cases.
-#    MoonData[date][lat][item]
-#       date[0 to 9] = a date index 'i' corresponding to MoonDate[i]
-#       lat[0 to 31] = index 'i' to config.lat[i]
-#       item[0] = rise time (hh:mm) or '--:--'
-#       item[1] = set  time (hh:mm) or '--:--'
-#       item[1][2:3] ... the middle character is 'finalstate' ... 'n' = above horizon; 'v' = below horizon
-np_array = np.ndarray(shape=(MDlen,31,2), dtype=np.dtype('U5'))
-
 def getHorizon(t):
     # calculate the angle of the moon below the horizon at moonrise/set
 
@@ -1318,104 +1171,36 @@ def getHorizon(t):
 
     return horizon
 
-def fetchMoonData(d, tFrom, tNoon, tTo, i, lat, hFlag = False, with_seconds=False):
+def fetchMoonData(tFrom, tNoon, tTo, i, lat, hFlag = False, with_seconds=False):
     # calculate & store moon data (rise/set times) or fetch data if pre-calculated.
     # --- THIS IMPROVES PERFORMANCE BY AVOIDING DUPLICATE COSTLY CALCULATIONS AS ---
     # --- 76% OF THE ALMANAC EXECUTION TIME IS SPENT IN almanac.find_discrete()  ---
-    # The temporary data store 'np_array' continually overwrites itself with fresh data.
-    # note: the transient data store is disabled if time with seconds is required
-    #           d           python date (in an idealized calendar)
-    #   tFrom, tNoon, tTo   The time 00h, 12h, 24h on date 'd' in UT1
+    # The events of each day are kept in the transient store (eventstore.py) for
+    #   the Nautical Almanac and the Event Time tables.
+    #   tFrom, tNoon, tTo   The time 00h, 12h, 24h on the date in UT1
     #                       (almanacs print time as UT1)
 
-    hemisph = 'N' if lat >= 0 else 'S'
-    latNS = "{:3.1f} {}".format(abs(lat), hemisph)
-    if SkyfieldVersion("1.35") >= 0:
-        topos = wgs84.latlon(lat, 0.0 * E, elevation_m=0.0)
-        observer = earth + topos
-    else:
-        topos = Topos(latNS, "0.0 E")   # Topos is deprecated in Skyfield v1.35!
-
-    # obtain the index to the current date 'd' ... or assign a new index
-    global MDndx, MDlen
-    iFnd = False
-    idx = -1            # an invalid value
-    min_d = d
-    for k in range(MDlen):
-        if MoonDate[k] == d:
-            ndx = k
-            iFnd = True
-        if config.moonDaysCount >= 31 * MDlen and MoonDate[k] < min_d:
-            min_d = MoonDate[k]     # find oldest date in 'MoonDate'
-            idx = k
-    if not iFnd:
-        # assigining a new index in a rotary fashion works, however a more intelligent algorithm
-        #   is to re-use the index to the oldest date once all 'MDlen' dates are in use.
-        if config.moonDaysCount >= 31 * MDlen:
-            # assign a new index by re-using the oldest date
-            ndx = idx
-            MoonDate[ndx] = d
-        else:
-            # assign a new index in a rotary fashion
-            MDndx = (MDndx + 1) % MDlen
-            ndx = MDndx
-            MoonDate[ndx] = d
-        for k in range(31):     # IMPORTANT ... and clear all old values!!!
-            np_array[ndx][k][0] = b''
-            np_array[ndx][k][1] = b''
-
-    # check the transient data store...
-    if with_seconds or len(np_array[ndx][i-1][0]) == 0:     # no data stored - calculate new values
+    topos, observer, latNS = site(earth, lat)
+    found = runstats.value('eventstore.hits')
 
+    start00 = Time.time()                   # 00000
+    if True or not SF148:
+        moonrise, y = eventstore.day_events(ts, ('moon', lat), tFrom, tTo,
+            lambda t0, t1, t0noon: [almanac.find_discrete(t0, t1, f_moon(observer, getHorizon(t0noon)))])[0]
+        time00 = Time.time()-start00        # 00000
+        rise, sett, ris2, set2, fs = rise_set(moonrise,y,latNS,with_seconds)
+    else:   # !!! DO NOT USE WITH Skyfield 1.48 !!! (see Skyfield Issue #998)
         horizon = getHorizon(tNoon)         # 0.8307988 on 16-08-2024
-        start00 = Time.time()               # 00000
-        if True or SkyfieldVersion("1.48") < 0:
-            moonrise, y = almanac.find_discrete(tFrom, tTo, f_moon(topos, horizon))
-            time00 = Time.time()-start00    # 00000
-            rise, sett, ris2, set2, fs = rise_set(moonrise,y,latNS,with_seconds)
-        else:   # !!! DO NOT USE WITH Skyfield 1.48 !!! (see Skyfield Issue #998)
-            moonrise, yR = almanac.find_risings(observer, moon, tFrom, tTo, -horizon)
-            moonset,  yS = almanac.find_settings(observer, moon, tFrom, tTo, -horizon)
-            time00 = Time.time()-start00    # 00000
-            rise, sett, ris2, set2, fs = fmt_rise_set(moonrise,moonset,yR,yS,latNS,with_seconds)
-
-        # only store single events (not double events, which are very rare)
-        if ris2 == '--:--' and set2 == '--:--':
-            # save 'sett' with moon's finalstate (above/below horizon or currently unknown)
-            if fs == True:
-                set9 = sett[0:2] + 'n' + sett[3:5]
-            elif fs == False:
-                set9 = sett[0:2] + 'v' + sett[3:5]
-            else:
-                set9 = sett
-
-            np_array[ndx][i-1][0] = rise.encode('utf-8')
-            np_array[ndx][i-1][1] = set9.encode('utf-8')
-        
-        #print("np_array[{}][{}][{}] = {}".format(ndx,i-1,0,np_array[ndx][i-1][0]))
-        #print("np_array[{}][{}][{}] = {}".format(ndx,i-1,1,np_array[ndx][i-1][1]))
-        if hFlag:
-            config.stopwatch2 += time00
-        else:
-            config.stopwatch += time00
-    else:                               # fetch stored data
-        rise = np_array[ndx][i-1][0]
-        sett = np_array[ndx][i-1][1]
-        ris2 = '--:--'
-        set2 = '--:--'
-        fstate = sett[2:3]      # moon final state  (above/below horizon, if known)
-        sett = sett[0:2] + ':' + sett[3:5]  # replace middle character
-        fs = None
-
-        if fstate == "n":
-            fs = True
-        elif fstate == "v":
-            fs = False
-
-        if hFlag:
-            config.moonHorizonFound += 1    # "data found in transient store" count
-        else:
-            config.moonDataFound += 1       # "data found in transient store" count
+        moonrise, yR = almanac.find_risings(observer, moon, tFrom, tTo, -horizon)
+        moonset,  yS = almanac.find_settings(observer, moon, tFrom, tTo, -horizon)
+        time00 = Time.time()-start00        # 00000
+        rise, sett, ris2, set2, fs = fmt_rise_set(moonrise,moonset,yR,yS,latNS,with_seconds)
+
+    search = 'events.horizon' if hFlag else 'events.moon'
+    if runstats.value('eventstore.hits') == found:  # calculated
+        runstats.add(search, time00)
+    else:                                   # found in the transient store
+        runstats.count(search + '.found')   # "data found in transient store" count
 
     return rise, sett, ris2, set2, fs
 
@@ -1433,27 +1218,27 @@ def moonrise_set(d, lat):   # used in nautical.twilighttab (section 2)
     dt -= timedelta(seconds=30)       # search from 30 seconds before midnight (because we are rounding to minutes)
 
     d9 = d + timedelta(days=-1)
-    t9 = ts.ut1(dt.year, dt.month, dt.day-1, dt.hour, dt.minute, dt.second)
+    t9 = ut1(ts, dt.year, dt.month, dt.day-1, dt.hour, dt.minute, dt.second)
 
-    t0 = ts.ut1(dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
+    t0 = ut1(ts, dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
 
     d1 = d + timedelta(days=1)
-    t1 = ts.ut1(dt.year, dt.month, dt.day+1, dt.hour, dt.minute, dt.second)
+    t1 = ut1(ts, dt.year, dt.month, dt.day+1, dt.hour, dt.minute, dt.second)
 
     d2 = d + timedelta(days=2)
-    t2 = ts.ut1(dt.year, dt.month, dt.day+2, dt.hour, dt.minute, dt.second)
+    t2 = ut1(ts, dt.year, dt.month, dt.day+2, dt.hour, dt.minute, dt.second)
 
     d3 = d + timedelta(days=3)
-    t3 = ts.ut1(dt.year, dt.month, dt.day+3, dt.hour, dt.minute, dt.second)
+    t3 = ut1(ts, dt.year, dt.month, dt.day+3, dt.hour, dt.minute, dt.second)
 
-    t4 = ts.ut1(dt.year, dt.month, dt.day+4, dt.hour, dt.minute, dt.second)
+    t4 = ut1(ts, dt.year, dt.month, dt.day+4, dt.hour, dt.minute, dt.second)
 
     # get the angle of the moon below the horizon at noontime (for daily average distance)
-    t9noon = ts.ut1(dt.year, dt.month, dt.day, dt.hour-12, dt.minute, dt.second)
-    t0noon = ts.ut1(dt.year, dt.month, dt.day, dt.hour+12, dt.minute, dt.second)
-    t1noon = ts.ut1(dt.year, dt.month, dt.day+1, dt.hour+12, dt.minute, dt.second)
-    t2noon = ts.ut1(dt.year, dt.month, dt.day+2, dt.hour+12, dt.minute, dt.second)
-    t3noon = ts.ut1(dt.year, dt.month, dt.day+3, dt.hour+12, dt.minute, dt.second)
+    t9noon = ut1(ts, dt.year, dt.month, dt.day, dt.hour-12, dt.minute, dt.second)
+    t0noon = ut1(ts, dt.year, dt.month, dt.day, dt.hour+12, dt.minute, dt.second)
+    t1noon = ut1(ts, dt.year, dt.month, dt.day+1, dt.hour+12, dt.minute, dt.second)
+    t2noon = ut1(ts, dt.year, dt.month, dt.day+2, dt.hour+12, dt.minute, dt.second)
+    t3noon = ut1(ts, dt.year, dt.month, dt.day+3, dt.hour+12, dt.minute, dt.second)
 
     #horizon = 0.8333333        # 16' (semi-diameter) + 34' (atmospheric refraction)
 #-----------------------------------------------------------
@@ -1462,15 +1247,14 @@ def moonrise_set(d, lat):   # used in nautical.twilighttab (section 2)
     # first compute semi-diameter of moon (in degrees)
     horizon = getHorizon(t0noon)
 
-    config.moonDaysCount += 1
-    config.moonDataSeeks += 1
-    out[0], out[3], out2[0], out2[3], fs = fetchMoonData(d, t0, t0noon, t1, i, lat)
+    runstats.count('events.moon.seeks')
+    out[0], out[3], out2[0], out2[3], fs = fetchMoonData(t0, t0noon, t1, i, lat)
 
     if fs != None:
         moonvisible[i] = fs
 
     if out[0] == '--:--' and out[3] == '--:--':	# if neither moonrise nor moonset...
-        config.moonDataSeeks -= 1
+        runstats.count('events.moon.seeks', -1)
         if moonvisible[i] == None:
             getmoonstate(dt, lat, horizon)	    # ...get moon state if unknown
         out[0] = moonstate(i)
@@ -1488,15 +1272,14 @@ def moonrise_set(d, lat):   # used in nautical.twilighttab (section 2)
     # first compute semi-diameter of moon (in degrees)
     horizon = getHorizon(t1noon)
 
-    config.moonDaysCount += 1
-    config.moonDataSeeks += 1
-    out[1], out[4], out2[1], out2[4], fs = fetchMoonData(d1, t1, t1noon, t2, i, lat)
+    runstats.count('events.moon.seeks')
+    out[1], out[4], out2[1], out2[4], fs = fetchMoonData(t1, t1noon, t2, i, lat)
 
     if fs != None:
         moonvisible[i] = fs
 
     if out[1] == '--:--' and out[4] == '--:--':	# if neither moonrise nor moonset...
-        config.moonDataSeeks -= 1
+        runstats.count('events.moon.seeks', -1)
         if moonvisible[i] == None:
             getmoonstate(dt+timedelta(days=1), lat, horizon)    # ...get moon state if unknown
         out[1] = moonstate(i)
@@ -1514,15 +1297,14 @@ def moonrise_set(d, lat):   # used in nautical.twilighttab (section 2)
     # first compute semi-diameter of moon (in degrees)
     horizon = getHorizon(t2noon)
 
-    config.moonDaysCount += 1
-    config.moonDataSeeks += 1
-    out[2], out[5], out2[2], out2[5], fs = fetchMoonData(d2, t2, t2noon, t3, i, lat)
+    runstats.count('events.moon.seeks')
+    out[2], out[5], out2[2], out2[5], fs = fetchMoonData(t2, t2noon, t3, i, lat)
 
     if fs != None:
         moonvisible[i] = fs
 
     if out[2] == '--:--' and out[5] == '--:--':	# if neither moonrise nor moonset...
-        config.moonDataSeeks -= 1
+        runstats.count('events.moon.seeks', -1)
         if moonvisible[i] == None:
             getmoonstate(dt+timedelta(days=2), lat, horizon)    # ...get moon state if unknown
         out[2] = moonstate(i)
@@ -1536,9 +1318,9 @@ def moonrise_set(d, lat):   # used in nautical.twilighttab (section 2)
 
     return out, out2
 
-def f_moon(topos, degBelowHorizon):
+def f_moon(observer, degBelowHorizon):
     # Build a function of time that returns the moon above/below horizon state.
-    topos_at = (earth + topos).at
+    topos_at = observer.at
 
     def is_moon_up_at(t):
         """The function that this returns will expect a single argument that is a 
@@ -1552,9 +1334,9 @@ def f_moon(topos, degBelowHorizon):
     is_moon_up_at.step_days = 0.000694444   # = 1.0 / 24.0 / 60.0 (once per minute)
     return is_moon_up_at
 
-def initial_moonstate(t, topos, degBelowHorizon):
+def initial_moonstate(t, observer, degBelowHorizon):
     # calculate the moonstate at time 't'
-    topos_at = (earth + topos).at   # position of this Earth location at time 't'
+    topos_at = observer.at   # position of this Earth location at time 't'
     t._nutation_angles = iau2000b(t.tt)
     # Return `True` if the moon has risen by time `t`.
     return topos_at(t).observe(moon).apparent().altaz()[0].degrees > -degBelowHorizon
@@ -1582,26 +1364,20 @@ def getmoonstate(dt, lat, horizon):
     # note: getmoonstate is called when there is neither a moonrise nor a moonset on the day following 'dt'
 
     i = 1 + config.lat.index(lat)   # index 0 is reserved to enable an explicit setting
-    hemisph = 'N' if lat >= 0 else 'S'
-    latNS = '{:3.1f} {}'.format(abs(lat), hemisph)
-    if SkyfieldVersion("1.35") >= 0:
-        topos = wgs84.latlon(lat, 0.0 * E, elevation_m=0.0)     # at elevation zero
-        observer = earth + topos
-    else:
-        topos = Topos(latNS, "0.0 E")   # Topos is deprecated in Skyfield v1.35!
+    topos, observer, latNS = site(earth, lat)
 
-    t0 = ts.ut1(dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
+    t0 = ut1(ts, dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
     # horizon = 0.8333        # degrees below horizon
 
     # search for the next moonrise or moonset (returned in moonrise[0] and y[0])
     while moonvisible[i] == None:
-        t0 = ts.ut1(dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
+        t0 = ut1(ts, dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
         dt += timedelta(days=1)
-        t9 = ts.ut1(dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
+        t9 = ut1(ts, dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
         start00 = Time.time()               # 00000
-        if True or SkyfieldVersion("1.48") < 0:
-            moonrise, y = almanac.find_discrete(t0, t9, f_moon(topos, horizon))
-            config.stopwatch2 += Time.time()-start00 # 00000
+        if True or not SF148:
+            moonrise, y = almanac.find_discrete(t0, t9, f_moon(observer, horizon))
+            runstats.add('events.horizon', Time.time()-start00)  # 00000
     #        for n in range(len(moonrise)):
     #            print(y[n], moonrise[n].utc_datetime())
             if len(moonrise) > 0:
@@ -1655,16 +1431,16 @@ def seek_moonset(prday, t9, t9noon, t0, nxday, t1, t1noon, t2, i, lat, with_seco
     # return  0 if there was a moonset yesterday and will be a moonset tomorrow
     # note: this is called when there is only a moonrise on the specified date+latitude
 
-    config.moonHorizonSeeks += 1
+    runstats.count('events.horizon.seeks')
     m_set_t = 0     # normal case: assume moonsets yesterday & tomorrow
 
-    rise, sett, ris2, set2, fs = fetchMoonData(nxday, t1, t1noon, t2, i, lat, True, with_seconds)
+    rise, sett, ris2, set2, fs = fetchMoonData(t1, t1noon, t2, i, lat, True, with_seconds)
 
     if sett == '--:--':
         m_set_t = +1    # if no moonset detected - it is after tomorrow
     else:
-        config.moonHorizonSeeks += 1
-        rise, sett, ris2, set2, fs = fetchMoonData(prday, t9, t9noon, t0, i, lat, True, with_seconds)
+        runstats.count('events.horizon.seeks')
+        rise, sett, ris2, set2, fs = fetchMoonData(t9, t9noon, t0, i, lat, True, with_seconds)
 
         if sett == '--:--':
             m_set_t = -1    # if no moonset detected - it is before yesterday
@@ -1677,16 +1453,16 @@ def seek_moonrise(prday, t9, t9noon, t0, nxday, t1, t1noon, t2, i, lat, with_sec
     # return  0 if there was a moonrise yesterday and will be a moonrise tomorrow
     # note: this is called when there is only a moonset on the specified date+latitude
 
-    config.moonHorizonSeeks += 1
+    runstats.count('events.horizon.seeks')
     m_rise_t = 0    # normal case: assume moonrise yesterday & tomorrow
 
-    rise, sett, ris2, set2, fs = fetchMoonData(nxday, t1, t1noon, t2, i, lat, True)
+    rise, sett, ris2, set2, fs = fetchMoonData(t1, t1noon, t2, i, lat, True)
 
     if rise == '--:--':
         m_rise_t = +1    # if no moonrise detected - it is after tomorrow
     else:
-        config.moonHorizonSeeks += 1
-        rise, sett, ris2, set2, fs = fetchMoonData(prday, t9, t9noon, t0, i, lat, True)
+        runstats.count('events.horizon.seeks')
+        rise, sett, ris2, set2, fs = fetchMoonData(t9, t9noon, t0, i, lat, True)
 
         if rise == '--:--':
             m_rise_t = -1    # if no moonrise detected - it is before yesterday
@@ -1711,18 +1487,18 @@ def moonrise_set2(d, lat):      # used in eventtables.twilighttab
     dt -= timedelta(seconds=0.5)   # search from 0.5 seconds before midnight
 
     d9 = d + timedelta(days=-1)
-    t9 = ts.ut1(dt.year, dt.month, dt.day-1, dt.hour, dt.minute, dt.second)
+    t9 = ut1(ts, dt.year, dt.month, dt.day-1, dt.hour, dt.minute, dt.second)
 
-    t0 = ts.ut1(dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
+    t0 = ut1(ts, dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
 
     d1 = d + timedelta(days=1)
-    t1 = ts.ut1(dt.year, dt.month, dt.day+1, dt.hour, dt.minute, dt.second)
+    t1 = ut1(ts, dt.year, dt.month, dt.day+1, dt.hour, dt.minute, dt.second)
 
-    t2 = ts.ut1(dt.year, dt.month, dt.day+2, dt.hour, dt.minute, dt.second)
+    t2 = ut1(ts, dt.year, dt.month, dt.day+2, dt.hour, dt.minute, dt.second)
 
-    t9noon = ts.ut1(dt.year, dt.month, dt.day, dt.hour-12, dt.minute, dt.second)
-    t0noon = ts.ut1(dt.year, dt.month, dt.day, dt.hour+12, dt.minute, dt.second)
-    t1noon = ts.ut1(dt.year, dt.month, dt.day+1, dt.hour+12, dt.minute, dt.second)
+    t9noon = ut1(ts, dt.year, dt.month, dt.day, dt.hour-12, dt.minute, dt.second)
+    t0noon = ut1(ts, dt.year, dt.month, dt.day, dt.hour+12, dt.minute, dt.second)
+    t1noon = ut1(ts, dt.year, dt.month, dt.day+1, dt.hour+12, dt.minute, dt.second)
 
     #horizon = 0.8333           # 16' (semi-diameter) + 34' (atmospheric refraction)
 #-----------------------------------------------------------
@@ -1731,7 +1507,7 @@ def moonrise_set2(d, lat):      # used in eventtables.twilighttab
     # first compute semi-diameter of moon (in degrees)
     horizon = getHorizon(t0noon)
 
-    out[0], out[1], out2[0], out2[1], fs = fetchMoonData(d, t0, t0noon, t1, i, lat, False, True)
+    out[0], out[1], out2[0], out2[1], fs = fetchMoonData(t0, t0noon, t1, i, lat, False, True)
 
     if fs != None:
         moonvisible[i] = fs
@@ -1756,7 +1532,7 @@ def moonrise_set2(d, lat):      # used in eventtables.twilighttab
 
 def getGHA(d, hh, mm, ss):
     # calculate the Moon's GHA on date d at hh:mm:ss (ss can be a float)
-    t1 = ts.ut1(d.year, d.month, d.day, hh, mm, ss)
+    t1 = ut1(ts, d.year, d.month, d.day, hh, mm, ss)
     pos = earth.at(t1).observe(moon)
     ra = pos.apparent().radec(epoch='date')[0]
     gha = gha2deg(t1.gast, ra.hours)
@@ -2028,8 +1804,8 @@ def moonphase(d):           # used in nautical.twilighttab (section 3)
     # phase is calculated at noon
     dt += timedelta(hours=12)
 
-    t00 = ts.ut1(d.year, d.month, d.day, 0, 0, 0)
-    #t12 = ts.ut1(d.year, d.month, d.day, 12, 0, 0)
+    t00 = ut1(ts, d.year, d.month, d.day, 0, 0, 0)
+    #t12 = ut1(ts, d.year, d.month, d.day, 12, 0, 0)
     phase_angle = almanac.phase_angle(eph, 'moon', t00)     # OLD: t12
     elong = phase_angle.radians
 
@@ -2052,8 +1828,8 @@ def moonage(d, d1):         # used in nautical.twilighttab (section 3)
     # return the moon's 'age' and percent illuminated
 
     # percent illumination is calculated at midnight
-    t00 = ts.ut1(d.year, d.month, d.day, 0, 0, 0)
-    #t12 = ts.ut1(d.year, d.month, d.day, 12, 0, 0)
+    t00 = ut1(ts, d.year, d.month, d.day, 0, 0, 0)
+    #t12 = ut1(ts, d.year, d.month, d.day, 12, 0, 0)
     phase_angle = almanac.phase_angle(eph, 'moon', t00)     # OLD: t12
     pctrad = 50 * (1.0 + cos(phase_angle.radians))
     pct = "{:.0f}".format(pctrad)
@@ -2081,7 +1857,7 @@ def equation_of_time(d, d1, UpperList, LowerList, extras, with_seconds = False):
     # the moon's transit-, antitransit-time, age and percent illumination.
     # (Equation of Time = Mean solar time - Apparent solar time)
 
-    t00 = ts.ut1(d.year, d.month, d.day, 0, 0, 0)       # EoT at 00h
+    t00 = ut1(ts, d.year, d.month, d.day, 0, 0, 0)       # EoT at 00h
     position = earth.at(t00).observe(sun)
     ra = position.apparent().radec(epoch='date')[0]
     gha00 = gha2deg(t00.gast, ra.hours)
@@ -2089,7 +1865,7 @@ def equation_of_time(d, d1, UpperList, LowerList, extras, with_seconds = False):
     if gha00 <= 180:
         eqt00 = r"\colorbox{{lightgray!60}}{{{}}}".format(eqt00)
 
-    t12 = ts.ut1(d.year, d.month, d.day, 12, 0, 0)      # EoT at 12h
+    t12 = ut1(ts, d.year, d.month, d.day, 12, 0, 0)      # EoT at 12h
     position = earth.at(t12).observe(sun)
     ra = position.apparent().radec(epoch='date')[0]
     gha12 = gha2deg(t12.gast, ra.hours)
@@ -2228,7 +2004,7 @@ def find_new_moon(d):       # used in nautical.doublepage
     t1 = ts.utc(d.year, d.month, d.day, 12, 0, 0)
     start00 = Time.time()                   # 00000
     t, y = almanac.find_discrete(t0, t1, almanac.moon_phases(eph))
-    config.stopwatch += Time.time()-start00 # 00000
+    runstats.add('events.phase', Time.time()-start00)  # 00000
     for i in range(len(t)):
         if y[i] == 0:       # 0=New Moon, 1=First Quarter, 2=Full Moon, 3=Last Quarter
             PreviousNewMoon = t[i].utc_datetime()
@@ -2243,7 +2019,7 @@ def find_new_moon(d):       # used in nautical.doublepage
         t3 = ts.utc(PreviousNewMoon + timedelta(days=30))
         start00 = Time.time()                   # 00000
         t, y = almanac.find_discrete(t2, t3, almanac.moon_phases(eph))
-        config.stopwatch += Time.time()-start00 # 00000
+        runstats.add('events.phase', Time.time()-start00)  # 00000
         for i in range(len(t)):
             if y[i] == 0:       # 0 = New Moon
                 NextNewMoon = t[i].utc_datetime()
@@ -2251,4 +2027,55 @@ def find_new_moon(d):       # used in nautical.doublepage
         WaxingMoon = True
         if PreviousFullMoon > PreviousNewMoon:
             WaxingMoon = False
-    return
\ No newline at end of file
+    return
+#------------------------------------
+#   Almanac data store (alma_store.py)
+#------------------------------------
+
+# celestial bodies stored per hourly row (Aries has no Declination)
+storebodies = ['sun', 'moon', 'venus', 'mars', 'jupiter', 'saturn', 'aries']
+# events stored per latitude and day (in hours after 00:00 UT1)
+storeevents = ['naut_begin', 'civil_begin', 'sunrise', 'sunset', 'civil_end', 'naut_end', 'moonrise', 'moonset']
+
+def store_positions(d):     # used in alma_store.makeStore
+    # returns GHA and Dec (both in degrees) of each body in 'storebodies'
+    #   for 25 hourly rows from 00:00 to 24:00 UT1 on date 'd'
+    out = np.zeros((25, len(storebodies), 2))
+    t = ut1(ts, d.year, d.month, d.day, list(range(25)), 0, 0)
+    gast = t.gast
+    for n, body in enumerate([sun, moon, venus, mars, jupiter, saturn]):
+        ra, dec, _ = earth.at(t).observe(body).apparent().radec(epoch='date')
+        out[:,n,0] = ((gast - ra.hours) * 15.0) % 360.0
+        out[:,n,1] = dec.degrees
+    out[:,6,0] = (gast * 15.0) % 360.0      # GHA Aries
+    return out
+
+def first_events(t, y, t00):
+    # return the first rising and first setting event (in hours after 't00') or NaN
+    rise = sett = np.nan
+    for k in range(len(t)):
+        hrs = (t[k].ut1 - t00.ut1) * 24.0
+        if y[k] and np.isnan(rise): rise = hrs
+        if not y[k] and np.isnan(sett): sett = hrs
+    return rise, sett
+
+def store_events(d):        # used in alma_store.makeStore
+    # returns the time of each event in 'storeevents' per latitude in config.lat
+    #   in hours after 00:00 UT1 on date 'd' (NaN if no event occurs on that day)
+    out = np.full((len(config.lat), len(storeevents)), np.nan)
+    t0 = ut1(ts, d.year, d.month, d.day, 0, 0, 0)
+    t1 = ut1(ts, d.year, d.month, d.day+1, 0, 0, 0)
+    tNoon = ut1(ts, d.year, d.month, d.day, 12, 0, 0)
+    horizon = getHorizon(tNoon)
+
+    for n, lat in enumerate(config.lat):
+        topos, observer, latNS = site(earth, lat)
+
+        start00 = Time.time()                       # 00000
+        for k, deg in enumerate([12.0, 6.0, 0.8333]):
+            tt, y = almanac.find_discrete(t0, t1, f_sun(observer, deg))
+            out[n,k], out[n,5-k] = first_events(tt, y, t0)
+        tt, y = almanac.find_discrete(t0, t1, f_moon(observer, horizon))
+        out[n,6], out[n,7] = first_events(tt, y, t0)
+        runstats.add('events.store', Time.time()-start00)  # 00000
+    return out
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#   Copyright (C) 2024  Andrew Bauer
+
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This creates and reads a binary almanac data store for a range of dates.
+#
+# The file has a fixed-size header followed by two fixed-stride blocks of
+#   little-endian float64 values, so it can be memory-mapped and indexed directly:
+#   positions:  [ndays*24+1 hourly rows][7 bodies][GHA, Dec]    (degrees)
+#   events:     [ndays][31 latitudes][8 events]                  (hours after 00:00 UT1)
+# Times are UT1 as printed in the almanac. Events that do not occur are stored as NaN.
+
+###### Standard library imports ######
+from datetime import date, datetime, timedelta
+import struct
+import sys			# required for .stdout.write()
+
+###### Third party imports ######
+import numpy as np
+
+###### Local application imports ######
+import config
+from alma_skyfield import storebodies, storeevents, store_positions, store_events
+
+#---------------------------
+#   Module initialization
+#---------------------------
+
+MAGIC = b'SFALMDB1'
+HDRLEN = 512                # header size (bytes) - positions block begins here
+HDRFMT = '<8s6i'            # magic, version, first day (ordinal), days, bodies, latitudes, events
+VERSION = 1
+
+#------------------------
+#   internal functions
+#------------------------
+
+def hours_after(store, dt):
+    # hours between 00:00 UT1 on the first day in the store and datetime 'dt'
+    if isinstance(dt, datetime):
+        if dt.tzinfo is not None:
+            dt = dt.replace(tzinfo=None) - dt.utcoffset()
+        h = (dt.toordinal() - store['first']) * 24.0
+        return h + dt.hour + dt.minute/60.0 + (dt.second + dt.microsecond/1e6)/3600.0
+    return (dt.toordinal() - store['first']) * 24.0     # a date (at 00:00)
+
+def body_index(body):
+    body = body.lower()
+    if body not in storebodies:
+        raise ValueError("unknown body '{}' - choose from: {}".format(body, ", ".join(storebodies)))
+    return storebodies.index(body)
+
+def interpolate(row0, row1, frac):
+    # interpolate between two hourly rows as a navigator would:
+    #   GHA increases by (GHA1 - GHA0) modulo 360; Dec changes linearly
+    incr = (row1[0] - row0[0]) % 360.0
+    gha = (row0[0] + frac * incr) % 360.0
+    dec = row0[1] + frac * (row1[1] - row0[1])
+    return gha, dec
+
+def interp_lat(row, lats, e, lat):
+    # event 'e' (hours) at latitude 'lat' from one day of events per tabulated latitude
+    # config.lat is in descending order: find the tabulated latitudes either side
+    k = 0
+    while k < len(lats) - 1 and lats[k+1] >= lat:
+        k += 1
+    if lats[k] == lat or k == len(lats) - 1:
+        return float(row[k,e])
+    h0 = float(row[k,e])
+    h1 = float(row[k+1,e])
+    return h0 + (lat - lats[k]) / (lats[k+1] - lats[k]) * (h1 - h0)
+
+#--------------------------
+#   external entry points
+#--------------------------
+
+def makeStore(filename, first_day, dtp):
+    # compute and write the data store for the requested range
+    # dtp = 0 if for entire year; = -1 if for entire month; else days to store
+
+    if dtp == 0:
+        days = (date(first_day.year+1, 1, 1) - first_day).days
+    elif dtp == -1:
+        days = (first_day.replace(month = first_day.month%12 + 1, day = 1) - timedelta(days=1)).day
+    else:
+        days = dtp
+
+    pos = np.zeros((days*24+1, len(storebodies), 2), dtype='<f8')
+    evt = np.zeros((days, len(config.lat), len(storeevents)), dtype='<f8')
+
+    pmth = ''
+    d = first_day
+    for n in range(days):
+        cmth = d.strftime("%b ")
+        if cmth != pmth:
+            print() # progress indicator - next month
+            sys.stdout.write(cmth)	# next month
+            sys.stdout.flush()
+            pmth = cmth
+        else:
+            sys.stdout.write('.')	# progress indicator
+            sys.stdout.flush()
+        rows = store_positions(d)
+        pos[n*24:n*24+25] = rows
+        evt[n] = store_events(d)
+        d += timedelta(days=1)
+    print("\n")		# 2 x newline to terminate progress indicator
+
+    hdr = struct.pack(HDRFMT, MAGIC, VERSION, first_day.toordinal(), days, len(storebodies), len(config.lat), len(storeevents))
+    hdr += struct.pack('<{}d'.format(len(config.lat)), *config.lat)
+    with open(filename, mode="wb") as f:
+        f.write(hdr.ljust(HDRLEN, b'\0'))
+        f.write(pos.tobytes())
+        f.write(evt.tobytes())
+    return days
+
+def openStore(filename):
+    # memory-map a data store; the returned dictionary is passed to the lookup functions
+    with open(filename, mode="rb") as f:
+        hdr = f.read(HDRLEN)
+    magic, version, first, days, nbodies, nlat, nevents = struct.unpack_from(HDRFMT, hdr)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("'{}' is not an almanac data store (version {})".format(filename, VERSION))
+    lats = struct.unpack_from('<{}d'.format(nlat), hdr, struct.calcsize(HDRFMT))
+    rows = days*24 + 1
+    pos = np.memmap(filename, dtype='<f8', mode='r', offset=HDRLEN, shape=(rows, nbodies, 2))
+    evt = np.memmap(filename, dtype='<f8', mode='r', offset=HDRLEN + pos.nbytes, shape=(days, nlat, nevents))
+    return {'first': first, 'days': days, 'rows': rows, 'lats': list(lats), 'pos': pos, 'evt': evt,
+            'first_day': date.fromordinal(first), 'last_day': date.fromordinal(first + days - 1)}
+
+def gha_dec(store, body, dt):
+    # GHA and Dec (degrees) of 'body' at datetime 'dt' (UT1), e.g.
+    #   gha_dec(store, 'venus', datetime(2027, 3, 14, 17, 0))
+    h = hours_after(store, dt)
+    i = int(h)
+    if h < 0 or i >= store['rows']:
+        raise ValueError("{} is outside the data store range {} to {}".format(dt, store['first_day'], store['last_day']))
+    b = body_index(body)
+    pos = store['pos']
+    if i == store['rows'] - 1:      # exactly 24:00 on the last day
+        return float(pos[i,b,0]), float(pos[i,b,1])
+    gha, dec = interpolate(pos[i,b].tolist(), pos[i+1,b].tolist(), h - i)
+    return gha, dec
+
+def gha_dec_range(store, body, dt_from, dt_to, step=timedelta(hours=1)):
+    # GHA and Dec (degrees) of 'body' from 'dt_from' to 'dt_to' (inclusive) at intervals of 'step'
+    # returns three NumPy arrays: hours after 'dt_from', GHA, Dec
+    h0 = hours_after(store, dt_from)
+    h1 = hours_after(store, dt_to)
+    if h0 < 0 or h1 > store['rows'] - 1 or h1 < h0:
+        raise ValueError("{} to {} is outside the data store range {} to {}".format(dt_from, dt_to, store['first_day'], store['last_day']))
+    b = body_index(body)
+    hrs = np.arange(h0, h1 + 1e-9, step.total_seconds()/3600.0)
+    i = np.minimum(hrs.astype(int), store['rows'] - 2)
+    frac = hrs - i
+    gha0 = store['pos'][i,b,0]
+    gha1 = store['pos'][i+1,b,0]
+    dec0 = store['pos'][i,b,1]
+    dec1 = store['pos'][i+1,b,1]
+    gha = (gha0 + frac * ((gha1 - gha0) % 360.0)) % 360.0
+    dec = dec0 + frac * (dec1 - dec0)
+    return hrs - h0, gha, dec
+
+def event_time(store, event, d, lat):
+    # time (UT1) of 'event' on date 'd' at latitude 'lat' as a datetime, or None if it does not occur.
+    # Between tabulated latitudes the time is interpolated linearly (as in the almanac), e.g.
+    #   event_time(store, 'moonrise', date(2027, 3, 14), 52.0)
+    if event not in storeevents:
+        raise ValueError("unknown event '{}' - choose from: {}".format(event, ", ".join(storeevents)))
+    n = d.toordinal() - store['first']
+    if not 0 <= n < store['days']:
+        raise ValueError("{} is outside the data store range {} to {}".format(d, store['first_day'], store['last_day']))
+    lats = store['lats']
+    if not min(lats) <= lat <= max(lats):
+        raise ValueError("latitude {} is outside the tabulated range {} to {}".format(lat, min(lats), max(lats)))
+    hrs = interp_lat(store['evt'][n], lats, storeevents.index(event), lat)
+    if np.isnan(hrs): return None
+    return datetime(d.year, d.month, d.day) + timedelta(hours=hrs)
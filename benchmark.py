@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#   Copyright (C) 2024  Andrew Bauer
+
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This is the benchmark suite: every case in CASES is created by 'sfalmanac.py -bat'
+#   in a process of its own, in single-processing mode (-sp) and, for the products
+#   that use worker processes (Nautical Almanac and Event Time tables), also in
+#   multiprocessing mode. The other products run identically in both modes.
+#
+#   python benchmark.py [-sp | -mp] [-pdf] [-save] [case ...]
+#     -sp / -mp   only single-processing / only multiprocessing runs
+#     -pdf        include pdflatex (by default only the .tex files are created)
+#     -save       keep the results as the baseline for later comparisons
+#     case ...    only the cases named, e.g. NA-6days ET-month
+#
+# The runs are reproducible and offline: the ephemeris, finals2000A.all and
+#   hip_main.dat are copied once from this folder into 'benchmark/data' and used
+#   from there (their SHA1 is saved with the results). finals2000A.all is never
+#   refreshed, and the persistent cache and the checkpoints are not used.
+# For each run the wall time, the CPU time and the peak RSS of the run and its worker
+#   processes (not available on Windows) and the timers and counts of runstats.py
+#   (the per-stage breakdown, see -sts) are saved in 'benchmark/results_<time>.json'
+#   and compared with 'benchmark/baseline.json'. Every run starts from the same files
+#   (e.g. the ephemeris excerpt of trimEph is created anew).
+
+###### Standard library imports ######
+from datetime import datetime
+from hashlib import sha1
+import json
+import os
+import shutil
+import subprocess
+import sys
+import time
+try:
+    import resource     # Unix only
+except ImportError:
+    resource = None
+
+###### Local application imports ######
+import config
+
+#---------------------------
+#   Module initialization
+#---------------------------
+
+CASES = [
+    ('NA-6days',  {"product": 1, "range": "01032027", "days": 6}),
+    ('NA-month',  {"product": 1, "range": "2027-03"}),
+    ('NA-year',   {"product": 1, "range": "2027"}),
+    ('ET-month',  {"product": 3, "range": "2027-03"}),
+    ('ST-month',  {"product": 2, "range": "2027-03"}),
+    ('LDtab-A',   {"product": 4, "range": "01032027", "days": 6, "strategy": "A"}),
+    ('LDtab-B',   {"product": 4, "range": "01032027", "days": 6, "strategy": "B"}),
+    ('LDtab-C',   {"product": 4, "range": "01032027", "days": 6, "strategy": "C"}),
+    ('LDchart',   {"product": 5, "range": "01032027", "days": 3}),
+    ('Inc',       {"product": 6}),
+]
+MPPRODUCTS = set([1, 3])    # products that use worker processes
+SLOWER = 1.10               # a run is reported as slower if it exceeds the baseline by 10%
+# images included in the PDF files (-pdf)
+IMAGES = ["A4chart0-180_P.pdf", "A4chart180-360_P.pdf", "A4chart0-180_L.pdf", "A4chart180-360_L.pdf",
+          "Ra.jpg", "croppedmoon.png"]
+
+code = os.path.dirname(os.path.abspath(__file__))
+bench = os.path.join(code, "benchmark")
+data = os.path.join(bench, "data")
+baseline = os.path.join(bench, "baseline.json")
+
+# started as 'python -c BOOT manifest option ...' in the data folder: the settings
+#   for reproducible offline runs are made before sfalmanac.py is run as main program
+BOOT = """import sys, runpy
+sys.path.insert(0, {code!r})
+import config
+config.useCache = False
+config.useCKPT = False
+config.useIERS = {useIERS!r}
+config.ageIERS = 1000000
+sys.argv = ['sfalmanac.py'] + sys.argv[1:]
+runpy.run_path({script!r}, run_name='__main__')
+"""
+
+#------------------------
+#   internal functions
+#------------------------
+
+def inputs():
+    # the files read by every run
+    return [config.ephemeris[config.ephndx][0], "finals2000A.all", "hip_main.dat"]
+
+def filehash(filename):
+    h = sha1()
+    with open(filename, mode="rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def prepare():
+    # copy the input files once; returns their SHA1
+    os.makedirs(data, exist_ok=True)
+    for fn in IMAGES:
+        if not os.path.isfile(os.path.join(data, fn)) and os.path.isfile(os.path.join(code, fn)):
+            shutil.copy2(os.path.join(code, fn), os.path.join(data, fn))
+    hashes = {}
+    for fn in inputs():
+        dst = os.path.join(data, fn)
+        if not os.path.isfile(dst):
+            src = os.path.join(code, fn)
+            if not os.path.isfile(src):
+                if fn == "finals2000A.all": continue    # the built-in UT1 tables are used
+                print("ERROR: '{}' is required in {} to run the benchmark suite".format(fn, code))
+                sys.exit(0)
+            shutil.copy2(src, dst)
+        hashes[fn] = filehash(dst)
+    return hashes
+
+def run(name, job, mp, pdf, useIERS):
+    # creates one case; returns its measurements
+    manifest = os.path.join(bench, "job.json")
+    with open(manifest, mode="w", encoding="utf8") as f:
+        json.dump({'jobs': [dict(job, pdf=pdf)]}, f)
+    boot = BOOT.format(code=code, script=os.path.join(code, "sfalmanac.py"), useIERS=useIERS)
+    args = [sys.executable, "-c", boot, "-bat", manifest, "-sts"]
+    if not mp: args.append("-sp")
+    before = set(os.listdir(data))
+
+    start = time.time()
+    p = subprocess.Popen(args, cwd=data, stdout=subprocess.DEVNULL)
+    if resource is not None:
+        # the usage of the run and of its (terminated) worker processes
+        pid, status, usage = os.wait4(p.pid, 0)
+        p.returncode = os.waitstatus_to_exitcode(status) if hasattr(os, 'waitstatus_to_exitcode') else status
+        cpu = usage.ru_utime + usage.ru_stime
+        rss = usage.ru_maxrss / (1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0)   # MB
+    else:
+        p.wait()
+        cpu = rss = None
+    wall = time.time() - start
+
+    # the statistics of -sts are saved next to the product as '<product file>.json'
+    new = set(os.listdir(data)) - before
+    stages = {}
+    for fn in new:
+        stem, ext = os.path.splitext(fn)
+        if ext in (".tex", ".pdf", ".dat") and stem + ".json" in new:
+            with open(os.path.join(data, stem + ".json"), mode="r", encoding="utf8") as f:
+                stages = json.load(f)
+            break
+    # every run starts with the same files: all files created by the run (the product,
+    #   the ephemeris excerpt, the saved UT1 table and catalog columns etc.) are removed
+    for fn in new:
+        fn = os.path.join(data, fn)
+        if os.path.isdir(fn):
+            shutil.rmtree(fn)
+        else:
+            os.remove(fn)
+    os.remove(manifest)
+    status = os.path.splitext(manifest)[0] + ".status.json"     # see progress.py
+    if os.path.isfile(status): os.remove(status)
+    return {'case': name, 'mode': "mp" if mp else "sp", 'ok': p.returncode == 0 and stages != {},
+            'wall': round(wall, 2), 'cpu': None if cpu is None else round(cpu, 2),
+            'rss_mb': None if rss is None else round(rss, 1),
+            'timers': stages.get('timers', {}), 'counts': stages.get('counts', {})}
+
+def compare(results, base):
+    # prints each run with the baseline run of the same case and mode
+    old = {(r['case'], r['mode']): r for r in base['runs']}
+    if base['inputs'] != results['inputs']:
+        print("NOTE: the baseline was created with other input files")
+    print("\n{:<10} {:>4}  {:>9} {:>9} {:>9} {:>8}".format("case", "mode", "wall (s)", "base (s)", "cpu (s)", "RSS (MB)"))
+    for r in results['runs']:
+        b = old.get((r['case'], r['mode']))
+        bwall = "" if b is None else "{:9.2f}".format(b['wall'])
+        cpu = "" if r['cpu'] is None else "{:9.2f}".format(r['cpu'])
+        rss = "" if r['rss_mb'] is None else "{:8.1f}".format(r['rss_mb'])
+        flag = ""
+        if not r['ok']: flag = "  FAILED"
+        elif b is not None and r['wall'] > b['wall'] * SLOWER:
+            flag = "  slower by {:0.0f}%".format(100 * (r['wall'] / b['wall'] - 1))
+        print("{:<10} {:>4}  {:9.2f} {:>9} {:>9} {:>8}{}".format(r['case'], r['mode'], r['wall'], bwall, cpu, rss, flag))
+
+#--------------------------
+#   external entry points
+#--------------------------
+
+def benchmark(names, modes, pdf, save):
+    hashes = prepare()
+    useIERS = config.useIERS and "finals2000A.all" in hashes
+    results = {'created': datetime.now().strftime("%Y-%m-%d %H:%M:%S"), 'python': sys.version.split(" ")[0],
+               'platform': sys.platform, 'cores': os.cpu_count(), 'pdf': pdf, 'inputs': hashes, 'runs': []}
+    for name, job in CASES:
+        if names and name not in names: continue
+        for mp in modes:
+            if mp and job['product'] not in MPPRODUCTS: continue
+            print("{} ({})...".format(name, "multiprocessing" if mp else "single-processing"))
+            results['runs'].append(run(name, job, mp, pdf, useIERS))
+
+    fn = os.path.join(bench, "results_{}.json".format(datetime.now().strftime("%Y%m%d-%H%M%S")))
+    with open(fn, mode="w", encoding="utf8") as f:
+        json.dump(results, f, indent=1)
+    print("results saved in '{}'".format(fn))
+    if os.path.isfile(baseline):
+        with open(baseline, mode="r", encoding="utf8") as f:
+            compare(results, json.load(f))
+    else:
+        compare(results, {'inputs': hashes, 'runs': []})
+    if save:
+        shutil.copyfile(fn, baseline)
+        print("saved as the baseline")
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    names = [a for a in args if not a.startswith('-')]
+    unknown = [n for n in names if n not in [c[0] for c in CASES]]
+    if unknown:
+        print("Unknown case(s): {}\nValid cases are: {}".format(", ".join(unknown), ", ".join(c[0] for c in CASES)))
+        sys.exit(0)
+    modes = [False, True]
+    if "-sp" in args: modes = [False]
+    if "-mp" in args: modes = [True]
+    benchmark(names, modes, "-pdf" in args, "-save" in args)
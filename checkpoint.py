@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#   Copyright (C) 2024  Andrew Bauer
+
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This saves the progress of long runs (an entire month or year) so that an
+#   interrupted run (Ctrl-C, a crash or a preempted computer) resumes where it stopped.
+#
+# Page checkpoints: after each completed page the page text is appended to a
+#   '.part' file and a small JSON file records the next date, the length of valid
+#   text and the moon above/below horizon states carried over to the next page.
+#   The JSON file also records every setting that affects the page content; a
+#   checkpoint is only used if these match.
+# Run checkpoints: in a 'YYYY-YYYY' run every completed file is recorded, so a
+#   restarted run skips the years already created.
+#
+# Checkpoint files are deleted once the page set or run is complete.
+
+###### Standard library imports ######
+from datetime import date
+import json
+import os
+
+###### Local application imports ######
+import config
+
+#------------------------
+#   internal functions
+#------------------------
+
+def pagesettings():
+    # all settings that affect the page content (apart from the IERS EOP footer text)
+    return [config.ephndx, config.pgsz, config.tbls, config.decf, config.d_valNA, str(config.moonimg),
+            str(config.useIERS), config.FANCYhd, config.DPonly]
+
+def settings():
+    return pagesettings() + [config.txtIERSEOP, config.endIERSEOP]
+
+def writeJSON(filename, data):
+    # replace the file in one step so an interruption never leaves it half-written
+    with open(filename + ".new", mode="w", encoding="utf8") as f:
+        json.dump(data, f)
+    os.replace(filename + ".new", filename)
+
+def readJSON(filename):
+    if not os.path.exists(filename): return None
+    try:
+        with open(filename, mode="r", encoding="utf8") as f:
+            return json.load(f)
+    except ValueError:
+        return None     # ignore a damaged checkpoint
+
+#--------------------------
+#   external entry points
+#--------------------------
+
+def resume(kind, first_day, dtp, states):
+    # start or resume the pages for 'kind' ('NA' or 'EV') from 'first_day' (dtp = 0 or -1).
+    # 'states' is a list of module lists (e.g. moonvisible) saved with every page.
+    # Returns a checkpoint: ckpt['day1'] is the date to continue from (None if starting afresh)
+    #   and ckpt['out'] the text of the pages already completed.
+    name = config.docker_prefix + "ckpt_{}_{}_{}".format(kind, first_day.strftime("%Y%m%d"), dtp)
+    ckpt = {'name': name, 'states': states, 'day1': None, 'out': '', 'length': 0, 'pages': 0}
+    data = readJSON(name + ".json")
+    if data is None or data['settings'] != json.loads(json.dumps(settings())) or not os.path.exists(name + ".part"):
+        return ckpt
+    with open(name + ".part", mode="r", encoding="utf8", newline='') as f:
+        out = f.read(data['length'])
+    if len(out) != data['length']:
+        return ckpt     # the page text is incomplete: start afresh
+    with open(name + ".part", mode="r+b") as f:
+        f.truncate(len(out.encode('utf8')))     # discard any part of an unfinished page
+    for i in range(len(states)):
+        states[i][:] = data['states'][i]
+    ckpt['day1'] = date.fromisoformat(data['day1'])
+    ckpt['out'] = out
+    ckpt['length'] = len(out)
+    ckpt['pages'] = data['pages']
+    print("\nresuming from the checkpoint at {} ({} pages completed)".format(ckpt['day1'].strftime("%d %B %Y"), ckpt['pages']))
+    return ckpt
+
+def save(ckpt, day1, page):
+    # record a completed page: 'day1' is the next date to process
+    mode = "a" if ckpt['length'] > 0 else "w"
+    with open(ckpt['name'] + ".part", mode=mode, encoding="utf8", newline='') as f:
+        f.write(page)
+        f.flush()
+        os.fsync(f.fileno())
+    ckpt['length'] += len(page)
+    ckpt['pages'] += 1
+    writeJSON(ckpt['name'] + ".json", {'settings': settings(), 'day1': day1.isoformat(), 'length': ckpt['length'],
+                                       'pages': ckpt['pages'], 'states': [list(s) for s in ckpt['states']]})
+
+def finish(ckpt):
+    # all pages are complete: the checkpoint is no longer required
+    for ext in [".json", ".part"]:
+        if os.path.exists(ckpt['name'] + ext): os.remove(ckpt['name'] + ext)
+
+def runStart(run):
+    # start or resume a run of several files: returns the files completed earlier
+    data = readJSON(config.docker_prefix + "ckpt_{}.json".format(run))
+    return set(data) if data is not None else set()
+
+def runDone(run, fn, done):
+    done.add(fn)
+    writeJSON(config.docker_prefix + "ckpt_{}.json".format(run), sorted(done))
+
+def runEnd(run):
+    filename = config.docker_prefix + "ckpt_{}.json".format(run)
+    if os.path.exists(filename): os.remove(filename)
@@ -30,7 +30,18 @@ pgsz = 'A4'     # page size 'A4' or 'Letter' (global variable)
 moonimg = True  # 'True' to include a moon image; otherwise 'False'
 useIERS = True  # 'True' to download finals2000A.all; 'False' to use built-in UT1 tables
 ageIERS = 30    # download a new finals2000A.all version after 'ageIERS' days if useIERS=True
+netTimeout = 10  # seconds to wait for a server when downloading finals2000A.all
+dlTimeout = 300  # maximum seconds for a finals2000A.all download (abandoned thereafter)
 MULTIpr = True  # 'True' enables multiprocessing; otherwise only 1 logical processor is used
+useCKPT = True  # 'True' saves the progress of an entire month/year so an interrupted run resumes
+eopTol = 0.001  # seconds: with '-inc' a page is recalculated if UT1-UTC changed by more than this
+pageMB = 100    # maximum size (MB) of the '-inc' page store; least recently used pages are deleted
+useCache = True # 'True' keeps calculated values in 'sfcache.db' for reuse in other page styles
+cacheMB = 200   # maximum size (MB) of 'sfcache.db'; least recently used values are deleted
+trimEph = True  # 'True' extracts the years required from the ephemeris into a small file (see ephtrim.py)
+timeCache = 512 # number of Time objects (with their nutation and sidereal time) kept for reuse (see timegrid.py)
+eventCache = 2000 # number of days of sun, moon and transit events kept for reuse in each process (see eventstore.py)
+memBudget = 0   # MB for the main and worker processes: pages are written as created and fewer workers started if required (0 = no budget)
 
 # Calculation mode for Moon's d-value (also applies to Sun and Planets):
 #   'True' to calculate the Moon's d-value as in the HMNAO Nautical Almanac:
@@ -47,6 +58,11 @@ d_valNA = False
 #   C   objects with brightest navigational stars
 defaultLDstrategy = 'B'   # 'A', 'B', 'C', or '' to ask user for desired strategy
 
+# Local almanac query service (command line option '-srv'):
+srvPort = 8765      # TCP port on localhost (127.0.0.1) only
+srvWorkers = 4      # maximum number of requests served concurrently
+srvCache = 400      # maximum number of days held in the computed data cache
+
 # ================ DO NOT EDIT LINES BELOW HERE ================
 
 # Docker-related stuff...
@@ -70,6 +86,7 @@ LINUXpf = False     # system platform
 MACOSpf = False     # system platform
 FANCYhd = False     # 'True' if compatible with 'fancyhdr' package
 DPonly = False      # output data pages only
+incPages = False    # 'True' to reuse pages unaffected by new IERS EOP data ('-inc')
 
 # define global variables
 logfileopen = False
@@ -77,16 +94,14 @@ useIERSEOP = False
 txtIERSEOP = ""     # footer text (using 'fancyhdr')
 endIERSEOP = ""     # footer text (using 'fancyhdr')
 dt_IERSEOP = None
+ephspan = None      # (first year, last year) of the current run for ephtrim.py
 ephemeris = [['de421.bsp',1900,2050],['de405.bsp',1600,2200],['de406.bsp',1000,2750],['de430t.bsp',1550,2650],['de440.bsp',1550,2650]]
 tbls = ''		# table style (global variable)
 decf = ''		# Declination format (global variable)
-stopwatch = 0.0     # time spent in a section of code
-stopwatch2 = 0.0    # time spent in a section of code
-moonDaysCount = 0   # count of days processed by moonrise_set (alma_skyfield.py)
-moonDataSeeks = 0   # count of moon daily data seeks
-moonDataFound = 0   # moon daily data seeks found in transient data store
-moonHorizonSeeks = 0   # count of moon continuously above/below horizon seeks
-moonHorizonFound = 0   # moon continuously above/below horizon seeks found in transient data store
+runStats = False    # save the timers and counts of each run as JSON (command line option -sts)
+pageLog = False     # append a JSON record per page to 'pages.jsonl' (command line option -pgl)
+dryRun = False      # compute only: discard the .tex file and skip pdflatex (command line option -dry)
+profile = 0         # 1 = profile the main process (-prf); 2 = and the worker processes (-prw)
 
 # define global variables for Lunar Distance tables and charts
 # 'True' on 'debug_....' variables expands the terminal/console output
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#   Copyright (C) 2024  Andrew Bauer
+
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This reads finals2000A.all once per version of the file (used by init_sf and ld_init_sf).
+#
+# Both the UT1 table that Skyfield builds from finals2000A.all and the dates for the
+#   IERS EOP footer text are saved in 'finals2000A.all.npz' next to it. This sidecar
+#   file is used as long as the size and modification time of finals2000A.all and
+#   the Skyfield version are unchanged; otherwise the file is parsed again.
+
+###### Standard library imports ######
+from datetime import date
+from collections import deque
+import os
+
+###### Third party imports ######
+from skyfield import VERSION
+from skyfield.data import iers
+from skyfield.timelib import Timescale
+import numpy as np
+
+#---------------------------
+#   Module initialization
+#---------------------------
+
+SFVER = ".".join([str(v) for v in VERSION])
+sidecars = {}       # finals2000A.all path -> sidecar data (read once per process)
+
+#------------------------
+#   internal functions
+#------------------------
+
+def scan_finals(dfIERS):
+# get the IERS EOP data "release date" according to these rules:
+#   - begin searching within this millenium (ignoring data from 02 Jan 1973 to 31 Dec 1999)
+#   - halt when the following value is "P", i.e. predicted as opposed to measured:
+#       - flag for Bull. A UT1-UTC values
+#   - step back one day to the record that has "I", i.e. measured data.
+#
+# the date of this record is the last date with IERS measured data.
+#   [the more recent the date, the more accurate/reliable are both the past IERS
+#   Earth Orientation Parameters as well as the future (predicted) EOP data values.]
+
+# IERS EOP data format definition:
+# https://maia.usno.navy.mil/ser7/readme.finals2000A
+
+    queue = deque(["a", "b", "c", "d"])
+    PredData = False    # True when Prediction data flagged
+    dt = None           # last date with measured data
+    iers = ""
+
+    with open(dfIERS) as file:
+        for line in file:
+            mjd = int(line[7:12])
+
+            if not PredData and mjd >= 51544:    # skip data in previous  millenium
+                queue.append(line)
+                queue.popleft()
+                c2 = line[57:58]    # IERS (I) or Prediction (P) flag for Bull. A UT1-UTC values
+                if not PredData and c2 == "P":
+                    PredData = True
+                    iers = ""
+                    while queue:
+                        iersdata = queue.pop()
+                        if iersdata[57:58] == "I":
+                            iers = iersdata
+                            break
+                    if iers == "": iers = iersdata
+                    dt = date(int(iers[0:2]) + 2000, int(iers[2:4]), int(iers[4:6]))
+            elif PredData:    # search for end of Prediction data
+                c2 = line[57:58]    # IERS (I) or Prediction (P) flag for Bull. A UT1-UTC values
+                if c2 == "P":
+                    iers = line
+                else:
+                    break
+
+    if iers == "":
+        return None, None       # incomplete file
+
+    # detect end of Prediction data even if file ends with c2 == "P" ...
+    dt2 = date(int(iers[0:2]) + 2000, int(iers[2:4]), int(iers[4:6]))
+    return dt, dt2
+
+def sidecar(dfIERS):
+    # the parsed data of finals2000A.all: from the sidecar file if still valid
+    st = os.stat(dfIERS)
+    if dfIERS in sidecars:
+        data = sidecars[dfIERS]
+        if int(data['mtime']) == st.st_mtime_ns and int(data['size']) == st.st_size:
+            return data
+    fn = dfIERS + ".npz"
+    data = None
+    if os.path.isfile(fn):
+        try:
+            with np.load(fn, allow_pickle=False) as npz:
+                data = {k: npz[k] for k in npz.files}
+        except (OSError, ValueError, KeyError):
+            data = None     # ignore a damaged sidecar file
+    if data is None or int(data['mtime']) != st.st_mtime_ns or int(data['size']) != st.st_size or str(data['sfver']) != SFVER:
+        data = parse(dfIERS, st)
+    sidecars[dfIERS] = data
+    return data
+
+def parse(dfIERS, st):
+    with open(dfIERS, mode="rb") as f:
+        utc_mjd, dut1 = iers.parse_dut1_from_finals_all(f)
+    daily_tt, daily_delta_t, leap_dates, leap_offsets = iers.build_timescale_arrays(utc_mjd, dut1)
+    dt, dt2 = scan_finals(dfIERS)
+    data = {'mtime': np.int64(st.st_mtime_ns), 'size': np.int64(st.st_size), 'sfver': np.array(SFVER),
+            'daily_tt': daily_tt, 'daily_delta_t': daily_delta_t,
+            'leap_dates': leap_dates, 'leap_offsets': leap_offsets,
+            'measured': np.int64(dt.toordinal() if dt is not None else 0),
+            'predicted': np.int64(dt2.toordinal() if dt2 is not None else 0)}
+    try:
+        with open(dfIERS + ".npz.new", mode="wb") as f:
+            np.savez(f, **data)
+        os.replace(dfIERS + ".npz.new", dfIERS + ".npz")
+    except OSError:
+        pass        # a read-only folder: parse again next time
+    return data
+
+#--------------------------
+#   external entry points
+#--------------------------
+
+def eop_timescale(load, dfIERS):
+    # equivalent to load.timescale(builtin=False) for finals2000A.all in the Loader folder
+    if not os.path.isfile(dfIERS) or (load.exists('deltat.data') and load.exists('deltat.preds') and load.exists('Leap_Second.dat')):
+        return load.timescale(builtin=False)    # Skyfield downloads or uses legacy files
+    data = sidecar(dfIERS)
+    return Timescale((data['daily_tt'], data['daily_delta_t']), data['leap_dates'], data['leap_offsets'])
+
+def eop_dates(dfIERS):
+    # (last date with measured data, last date with predicted data) or (None, None) if incomplete
+    data = sidecar(dfIERS)
+    dt  = date.fromordinal(int(data['measured'])) if int(data['measured']) > 0 else None
+    dt2 = date.fromordinal(int(data['predicted'])) if int(data['predicted']) > 0 else None
+    return dt, dt2
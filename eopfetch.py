@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#   Copyright (C) 2024  Andrew Bauer
+
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This downloads finals2000A.all (used by init_sf and ld_init_sf).
+#
+# Every network access has a timeout (config.netTimeout) and a download is
+#   abandoned after config.dlTimeout seconds, so an unreachable server never
+#   stalls the program for long.
+# If finals2000A.all exists but is older than config.ageIERS days, a newer
+#   version is downloaded in a background thread while the existing file is used.
+#   It is saved as 'finals2000A.all.new' and only replaces finals2000A.all at the
+#   start of the next run, so all pages of a run use the same EOP data.
+# A download in progress is named 'finals2000A.all.<random>.download'; one left
+#   behind when the program ended during a background download is removed at the
+#   start of a later run.
+
+# NOTE: the IERS server is unavailable (due to maintenance work in the first 3 weeks, at least, of April 2022)
+#       however, although the USNO server currently works, it was previously down for 2.5 years!
+#       So it is still best to try using the IERS server as first oprion, and USNO as second.
+
+###### Standard library imports ######
+import glob
+import os
+import tempfile
+import threading
+import time
+from urllib.request import urlopen
+
+###### Local application imports ######
+import config
+from eopcache import scan_finals
+
+#---------------------------
+#   Module initialization
+#---------------------------
+
+refreshing = None   # the background download thread (one per process)
+swapped = False     # True once swap_new has been called in this process
+
+#------------------------
+#   internal functions
+#------------------------
+
+def download(url, filename):
+    # download 'url' to 'filename' within config.dlTimeout seconds; returns True if successful
+    deadline = time.time() + config.dlTimeout
+    try:
+        connection = urlopen(url, timeout=config.netTimeout)
+    except Exception:
+        return False    # server not reachable
+    try:
+        with connection, open(filename, mode="wb") as w:
+            while True:
+                data = connection.read(128*1024)
+                if not data:
+                    break
+                w.write(data)
+                if time.time() > deadline:
+                    return False
+    except Exception:
+        return False
+    return True
+
+#--------------------------
+#   external entry points
+#--------------------------
+
+def fetch(spad, EOPdf, urls, verbose = False):
+    # download EOPdf as EOPdf + '.new' from the first server in 'urls' that succeeds
+    for url in urls:
+        if verbose:
+            print("Downloading EOP data from {}...".format(url))
+        fd, tempname = tempfile.mkstemp(prefix=EOPdf + ".", suffix=".download", dir=spad)
+        os.close(fd)
+        try:
+            if download(url + EOPdf, tempname) and scan_finals(tempname)[1] is not None:
+                os.replace(tempname, os.path.join(spad, EOPdf + ".new"))
+                return True
+        except (ValueError, OSError):
+            pass    # an incomplete or corrupt file
+        finally:
+            if os.path.isfile(tempname):
+                os.remove(tempname)
+    return False
+
+def swap_new(spad, EOPdf):
+    # use a file downloaded during an earlier run (called before finals2000A.all is read)
+    global swapped
+    if swapped: return      # never within a run (e.g. init_sf then ld_init_sf in a batch)
+    swapped = True
+    # remove downloads abandoned by an earlier run (a download never takes longer)
+    stale = time.time() - config.netTimeout - config.dlTimeout
+    for fn in glob.glob(os.path.join(glob.escape(spad), glob.escape(EOPdf) + ".*.download")):
+        try:
+            if os.path.getmtime(fn) < stale:
+                os.remove(fn)
+        except OSError:
+            pass    # e.g. removed by another process
+    newfile = os.path.join(spad, EOPdf + ".new")
+    if os.path.isfile(newfile):
+        os.replace(newfile, os.path.join(spad, EOPdf))
+
+def refresh(spad, EOPdf, urls):
+    # download a newer file in the background - it is used from the next run onwards
+    global refreshing
+    if refreshing is not None: return
+    print("NOTE: '{}' is older than {} days... downloading in the background for the next run".format(EOPdf, config.ageIERS))
+    refreshing = threading.Thread(target=fetch, args=(spad, EOPdf, urls), daemon=True)
+    refreshing.start()
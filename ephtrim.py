@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#   Copyright (C) 2024  Andrew Bauer
+
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This opens the ephemeris for a run (used by init_sf, ld_init_sf and the worker processes).
+#
+# With config.trimEph = True only the segments of the bodies SFalmanac uses (Sun,
+#   Moon, Earth, Venus, Mars, Jupiter, Saturn) are extracted from the ephemeris for
+#   the years of the run (config.ephspan) plus one year either side, e.g. de440.bsp
+#   (114 MB) for 2027 becomes 'de440_2026-2028.bsp' (about 500 KB). This file is kept
+#   in the Skyfield data folder and used by all later runs within these years.
+#   An ephemeris with several segments for a body (e.g. de406.bsp) is not trimmed:
+#   this is noted in a marker file (e.g. 'de406.untrimmed') so that later runs use
+#   it directly without examining it again.
+# The main process passes the filename to the worker processes in an environment
+#   variable (changes to config.py are lost when spawning processes on Windows/MacOS).
+#   Every process opens the ephemeris only once and creates each body only once.
+
+###### Standard library imports ######
+import os
+
+###### Third party imports ######
+from jplephem.calendar import compute_julian_day
+from jplephem.daf import DAF
+from jplephem.excerpter import write_excerpt
+from jplephem.spk import SPK
+from skyfield.jpllib import SpiceKernel
+
+###### Local application imports ######
+import config
+import runstats
+
+#---------------------------
+#   Module initialization
+#---------------------------
+
+ENVNAME = "SFALMANAC_EPHEMERIS"     # the ephemeris filename for worker processes
+# the segment targets required: Earth-Moon barycenter, Earth, Moon, Sun,
+#   Venus (barycenter), Mars (barycenter) and the Jupiter and Saturn barycenters
+TARGETS = set([3, 399, 301, 10, 2, 299, 4, 499, 5, 6])
+kernels = {}        # filename -> opened ephemeris (once per process)
+
+#------------------------
+#   internal functions
+#------------------------
+
+class Ephemeris(SpiceKernel):
+    # returns the same object for a body every time (e.g. for observers.site)
+    def __init__(self, path):
+        SpiceKernel.__init__(self, path)
+        self.bodies = {}
+
+    def __getitem__(self, target):
+        if target not in self.bodies:
+            self.bodies[target] = SpiceKernel.__getitem__(self, target)
+        return self.bodies[target]
+
+def trim(fullpath, filename, year1, year2):
+    # write the excerpt of 'fullpath' for the years 'year1' to 'year2' to 'filename'
+    # returns False if the ephemeris has several segments for a body (it is not trimmed)
+    with open(fullpath, mode="rb") as f:
+        spk = SPK(DAF(f))
+        pairs = [(s, seg) for s, seg in zip(spk.daf.summaries(), spk.segments) if seg.target in TARGETS]
+        if len(set([(seg.center, seg.target) for s, seg in pairs])) != len(pairs):
+            return False
+        print("Extracting {} to {} from '{}'...".format(year1, year2, os.path.basename(fullpath)))
+        # claim no more than the original segments cover
+        jd1 = max(compute_julian_day(year1, 1, 1) - 0.5, max([seg.start_jd for s, seg in pairs]))
+        jd2 = min(compute_julian_day(year2 + 1, 1, 1) - 0.5, min([seg.end_jd for s, seg in pairs]))
+        with open(filename + ".new", mode="w+b") as w:
+            write_excerpt(spk, w, jd1, jd2, [s for s, seg in pairs])
+    os.replace(filename + ".new", filename)
+    return True
+
+def ephfile(load):
+    # the path of the ephemeris for this run (the excerpt is created if required)
+    full = config.ephemeris[config.ephndx][0]
+    if not config.trimEph or config.ephspan is None:
+        return os.path.abspath(load.path_to(full))
+    year1 = max(config.ephspan[0] - 1, config.ephemeris[config.ephndx][1])
+    year2 = min(config.ephspan[1] + 1, config.ephemeris[config.ephndx][2])
+    filename = os.path.abspath(load.path_to("{}_{}-{}.bsp".format(full[:-4], year1, year2)))
+    if not os.path.isfile(filename):
+        fullpath = os.path.abspath(load.path_to(full))
+        marker = os.path.abspath(load.path_to(full[:-4] + ".untrimmed"))
+        if not load.exists(full):
+            load(full).close()      # download the ephemeris
+        elif os.path.isfile(marker) and os.path.getmtime(marker) >= os.path.getmtime(fullpath):
+            return fullpath         # examined before (and not replaced since)
+        if not trim(fullpath, filename, year1, year2):
+            with open(marker, mode="w", encoding="utf8") as f:
+                f.write("'{}' has several segments for a body: it is used without trimming\n".format(full))
+            return fullpath
+    return filename
+
+#--------------------------
+#   external entry points
+#--------------------------
+
+def kernel(load = None):
+    # the ephemeris for this run: the main process passes its Skyfield Loader;
+    #   worker processes use the file chosen by the main process.
+    if load is not None:
+        with runstats.timer('ephemeris.load'):
+            filename = ephfile(load)
+        os.environ[ENVNAME] = filename
+    else:
+        filename = os.environ.get(ENVNAME, os.path.abspath(config.ephemeris[config.ephndx][0]))
+    if filename not in kernels:
+        with runstats.timer('ephemeris.load'):
+            kernels[filename] = Ephemeris(filename)
+    return kernels[filename]
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#   Copyright (C) 2024  Andrew Bauer
+
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This is the transient store of sunrise/sunset, twilight, moonrise/moonset and
+#   meridian transit events (used in alma_skyfield, mp_nautical and mp_eventtables,
+#   i.e. in the main process and in every worker process).
+#
+# As 76% of the execution time is spent searching for events, each search is done
+#   once per UT1 day at full precision and kept here: the event times (TT Julian
+#   date as whole and fraction) and flags exactly as Skyfield returned them.
+#   The day is searched from 30 seconds before midnight until the following
+#   midnight, which covers the days of both products:
+#     - Nautical Almanac:  from 23:59:30 (times rounded to minutes)
+#     - Event Time tables: from 23:59:59.5 (times rounded to seconds)
+#     - meridian transits: from 00:00:00
+#   The events of the requested search window are taken from the stored day, so
+#   the Nautical Almanac, the Event Time tables and the searches for the next or
+#   previous day's moonrise/moonset all use the same search. The rounding to
+#   minutes or seconds, double events and the final state are derived later.
+# The Moon's horizon depends on its distance at noon (12:00 UT1 of the day).
+# At most config.eventCache days are kept (the least recently used are dropped).
+
+###### Standard library imports ######
+from collections import OrderedDict
+from math import floor
+
+###### Third party imports ######
+import numpy as np
+
+###### Local application imports ######
+import config
+import runstats
+
+#---------------------------
+#   Module initialization
+#---------------------------
+
+PAD = 30.0 / 86400.0    # the day is searched from 30 seconds before midnight
+EPS = 0.001 / 86400.0   # tolerance (1 ms) of the search window
+
+events = OrderedDict()  # (search key, 00h UT1 of the day) -> (start as TT, [(whole, fraction, flags), ...])
+
+#--------------------------
+#   external entry points
+#--------------------------
+
+def day_events(ts, key, tFrom, tTo, search):
+    # returns the events between tFrom and tTo as a list of (event times, flags)
+    #   for the search 'key', e.g. ('moon', latitude), calculated by
+    #   search(t0, t1, tNoon), which returns such a list for the whole day.
+    jd0 = floor(float(tFrom.ut1) + PAD + EPS + 0.5) - 0.5     # 00h UT1 of the day
+    if float(tFrom.ut1) < jd0 - PAD - EPS or float(tTo.ut1) > jd0 + 1.0 + EPS:
+        runstats.count('eventstore.misses')     # not within a day: not stored
+        return search(tFrom, tTo, ts.tt_jd((tFrom.tt + tTo.tt) / 2.0))
+    t0 = ts.ut1(jd=jd0 - PAD)
+    entry = events.get((key, jd0))
+    if entry is not None and entry[0] == float(t0.tt):    # (same Delta T)
+        events.move_to_end((key, jd0))
+        runstats.count('eventstore.hits')
+    else:
+        runstats.count('eventstore.misses')
+        found = search(t0, ts.ut1(jd=jd0 + 1.0), ts.ut1(jd=jd0 + 0.5))
+        entry = (float(t0.tt), [(np.array(t.whole, dtype=np.float64), np.array(t.tt_fraction, dtype=np.float64),
+                                 None if y is None else np.array(y)) for t, y in found])
+        events[(key, jd0)] = entry
+        if len(events) > config.eventCache:
+            events.popitem(last=False)
+    out = []
+    for whole, fraction, y in entry[1]:
+        tt = whole + fraction
+        m = (tt >= float(tFrom.tt) - EPS) & (tt <= float(tTo.tt) + EPS)
+        out.append((ts.tt_jd(whole[m], fraction[m]), None if y is None else y[m]))
+    return out
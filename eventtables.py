@@ -29,6 +29,13 @@ import signal       # for init_worker
 
 ###### Local application imports ######
 import config
+import checkpoint
+import runstats         # timings and counts of the worker processes
+import profiler         # profiles of the worker processes (-prw)
+import progress         # pages per second and ETA
+import memory           # peak RSS and the memory budget
+import pagelog          # a JSON record per page (-pgl)
+import alma_skyfield     # for the moon state (checkpoint)
 if config.MULTIpr:      # in multi-processing mode ...
     # ------------------------------------------------------
     # EITHER comment next 2 lines out to invoke executor.map
@@ -52,6 +59,7 @@ else:
 UpperLists = [[], []]    # moon GHA per hour for 2 days
 LowerLists = [[], []]    # moon colong GHA per hour for 2 days
 msg0 = "\nKeyboardInterrupt detected - multiprocessing aborted."
+sharedpool = None   # a worker pool shared by several jobs (batch mode)
 
 #------------------------
 #   internal functions
@@ -110,17 +118,24 @@ def twilight_symbol(oldtwi):
         else: twi.append(event)
     return twi
 
+sink = None     # the .tex file the pages are written to when created (see memory.py)
+
+def flush(out):
+    # writes the pages created so far to the .tex file
+    sink.write(out)
+    return ''
+
 # >>>>>>>>>>>>>>>>>>>>>>>>
 def mp_twilight_worker(Date, ts, lat):
     #print(" mp_twilight_worker Start {}".format(lat))
     hemisph = 'N' if lat >= 0 else 'S'
-    twi = mp_twilight(Date, lat, ts, True) # ===>>> mp_eventtables.py
+    twi = runstats.task(mp_twilight, Date, lat, ts, True, key = lat) # ===>>> mp_eventtables.py
     #print(" mp_twilight_worker Finish {}".format(lat))
     return twi      # return list for all latitudes
 
 def mp_moonlight_worker(Date, ts, lat):
     #print(" mp_moonlight_worker Start  {}".format(lat))
-    ml = mp_moonrise_set(Date, lat, ts)    # ===>>> mp_eventtables.py
+    ml = runstats.task(mp_moonrise_set, Date, lat, ts, key = lat)    # ===>>> mp_eventtables.py
     #print(" mp_moonlight_worker Finish {}".format(lat))
     return ml       # return list for all latitudes
 
@@ -134,7 +149,8 @@ def twilighttab(Date, ts):
 
             try:
                 # RECOMMENDED: chunksize = 1
-                listoftwi = pool.map(partial_func, config.lat, 1)
+                with runstats.timer('ipc.wait'):
+                    listoftwi = runstats.collect(pool.map(partial_func, config.lat, 1))
             except KeyboardInterrupt:
                 print(msg0)
                 sys.exit(0)
@@ -142,11 +158,9 @@ def twilighttab(Date, ts):
         if MPmode == 1:      # with executor.map
             partial_func = partial(mp_twilight_worker, Date, ts)
             future_value = executor.map(partial_func, config.lat)
-            listoftwi = list(future_value)
+            with runstats.timer('ipc.wait'):
+                listoftwi = runstats.collect(future_value)
 
-        for k in range(len(listoftwi)):
-            config.stopwatch += listoftwi[k][6]     # accumulate multiprocess processing time
-            del listoftwi[k][-1]
         #print("listoftwi = {}".format(listoftwi))
 
         # multiprocess moonrise/moonset values per latitude simultaneously
@@ -155,7 +169,8 @@ def twilighttab(Date, ts):
 
             try:
                 # RECOMMENDED: chunksize = 1
-                listmoon = pool.map(partial_func2, config.lat, 1)
+                with runstats.timer('ipc.wait'):
+                    listmoon = runstats.collect(pool.map(partial_func2, config.lat, 1))
             except KeyboardInterrupt:
                 print(msg0)
                 sys.exit(0)
@@ -163,13 +178,9 @@ def twilighttab(Date, ts):
         if MPmode == 1:      # with executor.map
             partial_func2 = partial(mp_moonlight_worker, Date, ts)
             future_val = executor.map(partial_func2, config.lat)
-            listmoon = list(future_val)
+            with runstats.timer('ipc.wait'):
+                listmoon = runstats.collect(future_val)
 
-        for k in range(len(listmoon)):
-            tuple_times = listmoon[k][-1]
-            config.stopwatch  += tuple_times[0]         # accumulate multiprocess processing time
-            config.stopwatch2 += tuple_times[1]         # accumulate multiprocess processing time
-            del listmoon[k][-1]
         #print("listmoon = {}".format(listmoon))
 
 # Sun Twilight tables ...........................................
@@ -269,7 +280,7 @@ def twilighttab(Date, ts):
 # >>>>>>>>>>>>>>>>>>>>>>>>
 def mp_planets_worker(Date, ts, obj):
     #print(" mp_planets_worker Start  {}".format(obj))
-    sha = mp_planetstransit(Date, ts, obj, True)    # ===>>> mp_eventtables.py
+    sha = runstats.task(mp_planetstransit, Date, ts, obj, True, key = obj)    # ===>>> mp_eventtables.py
     #print(" mp_planets_worker Finish {}".format(obj))
     return sha      # return list for four planets
 
@@ -284,14 +295,12 @@ def meridiantab(Date, ts):
         partial_func2 = partial(mp_planets_worker, Date, ts)
 
         try:
-            listofsha = pool.map(partial_func2, objlist, 1)     # RECOMMENDED: chunksize = 1
+            with runstats.timer('ipc.wait'):
+                listofsha = runstats.collect(pool.map(partial_func2, objlist, 1))     # RECOMMENDED: chunksize = 1
         except KeyboardInterrupt:
             print(msg0)
             sys.exit(0)
 
-        for k in range(len(listofsha)):
-            config.stopwatch += listofsha[k][2]     # accumulate multiprocess processing time
-            del listofsha[k][-1]
         #print("listofsha = {}".format(listofsha))
 
     out = r'''\quad
@@ -418,12 +427,17 @@ def page(Date, ts, dpp):
 '''.format(timeDUT1, str2)
 
     Date2 = Date+timedelta(days=1)
-    page += twilighttab(Date,ts)
-    page += meridiantab(Date,ts)
+    with runstats.timer('table.twilight'):
+        page += twilighttab(Date,ts)
+    with runstats.timer('table.meridian'):
+        page += meridiantab(Date,ts)
     if dpp == 2:
-        page += twilighttab(Date2,ts)
-        page += meridiantab(Date2,ts)
-    page += equationtab(Date,dpp)
+        with runstats.timer('table.twilight'):
+            page += twilighttab(Date2,ts)
+        with runstats.timer('table.meridian'):
+            page += meridiantab(Date2,ts)
+    with runstats.timer('table.equation'):
+        page += equationtab(Date,dpp)
 
     # to avoid "Overfull \hbox" messages, leave a paragraph end before the end of a size change. (This may only apply to tabular* table style) See lines below...
     page = page + r'''
@@ -434,9 +448,10 @@ def page(Date, ts, dpp):
 #   This simple but effective function eliminates endless keyboard interrupts
 #   each time Ctrl-C is issued, while none actually kill the parent process
 #   ... and this causes the Command Prompt window (in Windows, MPmode=0) to hang.
-def init_worker():
+def init_worker(profile = False):
     # Prevent child process from ever receiving a KeyboardInterrupt.
     signal.signal(signal.SIGINT, signal.SIG_IGN)
+    profiler.init_worker(profile)   # (config.py is not maintained in worker processes)
 
 def pages(first_day, dtp, ts):
     # dtp = 0 if for entire year; = -1 if for entire month; else days to print
@@ -449,16 +464,30 @@ def pages(first_day, dtp, ts):
         if (config.WINpf or config.MACOSpf) and n > 8: n = 8   # 8 maximum if Windows or Mac OS
         if MPmode == 0:
             global pool
-            pool = mp.Pool(n, init_worker)   # start 8 max. worker processes
+            if sharedpool is not None:
+                pool = sharedpool   # batch mode: the pool is closed by the caller
+            else:
+                runstats.workers = memory.poolsize(n)   # fewer within the memory budget
+                pool = mp.Pool(runstats.workers, init_worker, (config.profile == 2,))   # start 8 max. worker processes
         if MPmode == 1:
             global executor
-            executor = concurrent.futures.ProcessPoolExecutor(max_workers=config.CPUcores,initializer=init_worker)
+            runstats.workers = memory.poolsize(config.CPUcores)
+            executor = concurrent.futures.ProcessPoolExecutor(max_workers=runstats.workers,initializer=init_worker,initargs=(config.profile == 2,))
 
     out = ''
     pmth = ''
     dpp = 2         # 2 days per page maximum
     day1 = first_day
 
+    ckpt = None
+    if config.useCKPT and dtp <= 0:     # checkpoint an entire month/year
+        ckpt = checkpoint.resume('EV', first_day, dtp, [alma_skyfield.moonvisible])
+        if ckpt['day1'] is not None:
+            out = ckpt['out']
+            day1 = ckpt['day1']
+    progress.begin(first_day, dtp, day1)
+    pagelog.begin('EV')
+
     if dtp == 0:        # if entire year
         year = first_day.year
         yr = year
@@ -467,9 +496,9 @@ def pages(first_day, dtp, ts):
             day2 = day1 + timedelta(days=1)
             if day2.year != yr:
                 dpp -= day2.day
-                if dpp <= 0: return out
+                if dpp <= 0: break
             if cmth != pmth:
-                print() # progress indicator - next month
+                print(progress.month_line()) # progress indicator - next month
                 #print(cmth, end='')
                 sys.stdout.write(cmth)	# next month
                 sys.stdout.flush()
@@ -477,8 +506,13 @@ def pages(first_day, dtp, ts):
             else:
                 sys.stdout.write('.')	# progress indicator
                 sys.stdout.flush()
-            out += page(day1,ts,dpp)
+            pg = page(day1,ts,dpp)
+            out += pg
+            if sink is not None: out = flush(out)
+            pagelog.page(day1, dpp, pg)
             day1 += timedelta(days=2)
+            progress.page(day1)
+            if ckpt is not None: checkpoint.save(ckpt, day1, pg)
             year = day1.year
 
     elif dtp == -1:     # if entire month
@@ -489,9 +523,9 @@ def pages(first_day, dtp, ts):
             day2 = day1 + timedelta(days=1)
             if day2.month != m:
                 dpp -= day2.day
-                if dpp <= 0: return out
+                if dpp <= 0: break
             if cmth != pmth:
-                print() # progress indicator - next month
+                print(progress.month_line()) # progress indicator - next month
                 #print(cmth, end='')
                 sys.stdout.write(cmth)	# next month
                 sys.stdout.flush()
@@ -499,23 +533,33 @@ def pages(first_day, dtp, ts):
             else:
                 sys.stdout.write('.')	# progress indicator
                 sys.stdout.flush()
-            out += page(day1,ts,dpp)
+            pg = page(day1,ts,dpp)
+            out += pg
+            if sink is not None: out = flush(out)
+            pagelog.page(day1, dpp, pg)
             day1 += timedelta(days=2)
+            progress.page(day1)
+            if ckpt is not None: checkpoint.save(ckpt, day1, pg)
             mth = day1.month
 
     else:           # print 'dtp' days beginning with first_day
         i = dtp   # don't decrement dtp
         while i > 0:
             if i < 2: dpp = i
-            out += page(day1,ts,dpp)
+            pg = page(day1,ts,dpp)
+            out += pg
+            if sink is not None: out = flush(out)
+            pagelog.page(day1, dpp, pg)
             i -= 2
             day1 += timedelta(days=2)
+            progress.page(day1)
 
     if dtp <= 0:       # if Event Time Tables for a whole month/year...
-        print("\n")	    # 2 x newline to terminate progress indicator
+        print(progress.summary() + "\n")	# terminate progress indicator
+    if ckpt is not None: checkpoint.finish(ckpt)
 
     if config.MULTIpr:
-        if MPmode == 0:
+        if MPmode == 0 and sharedpool is None:
             pool.close()    # close all worker processes
             pool.join()
         if MPmode == 1:
@@ -527,14 +571,20 @@ def pages(first_day, dtp, ts):
 #   external entry point
 #--------------------------
 
-def makeEVtables(first_day, dtp, ts):
+def makeEVtables(first_day, dtp, ts, outfile = None):
     # make tables starting from first_day
     # dtp = 0 if for entire year; = -1 if for entire month; else days to print
+    # outfile: the pages are written to it as they are created if the memory budget requires it
+    global sink
+    sink = outfile if outfile is not None and memory.streaming(first_day, dtp) else None
 
-    if config.FANCYhd:
-        return makeEVnew(first_day, dtp, ts) # use the 'fancyhdr' package
-    else:
-        return makeEVold(first_day, dtp, ts) # use old formatting
+    try:
+        if config.FANCYhd:
+            return makeEVnew(first_day, dtp, ts) # use the 'fancyhdr' package
+        else:
+            return makeEVold(first_day, dtp, ts) # use old formatting
+    finally:
+        sink = None
 
 #   The following functions are intentionally separate functions.
 #   'makeEVold' is required for TeX Live 2019, which is the standard
@@ -703,6 +753,9 @@ def makeEVnew(first_day, dtp, ts):
     tex += r'''
 \pagestyle{datapage}  % page style for data pages'''
 
+    if sink is not None:
+        sink.write(tex)     # the pages follow as they are created
+        tex = ''
     tex += pages(first_day,dtp,ts)
     tex += r'''
 \end{document}'''
@@ -847,6 +900,9 @@ def makeEVold(first_day, dtp, ts):
     if not config.DPonly:
         tex += hdrEVold(first_day,dtp,tm1,bm1,lm1,rm1,vsep1,vsep2)
 
+    if sink is not None:
+        sink.write(tex)     # the pages follow as they are created
+        tex = ''
     tex += pages(first_day,dtp,ts)
     tex += r'''
 \end{document}'''
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#   Copyright (C) 2024  Andrew Bauer
+
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This compares the LaTeX output for the dates in CASES with the stored 'golden'
+#   files, so that changes for performance can be shown not to change the tables.
+#   The dates include rare cases handled in the code: the Moon's Declination
+#   changing hemisphere at 22h, the Moon (or Sun) continuously above or below the
+#   horizon, double moonrises/moonsets and events on the following day.
+#
+#   python golden.py [-save | -ref commit] [-mp] [-num [units]] [case ...]
+#     -save       keep the output as the new golden files (of a trusted version)
+#     -ref        create the golden files with the code of a git commit, e.g.
+#                 'python golden.py -ref 7826fe0' (the baseline of this suite)
+#     -mp         create the output in multiprocessing mode (default: -sp)
+#     -num        compare numbers (and times hh:mm[:ss]) within 'units' of their
+#                 last digit (default 1) instead of byte for byte
+#     case ...    only the cases named, e.g. NA-20240614 ET-202406
+#
+# Each case is created with 'sfalmanac.py -bat ... -dpo' (data pages only) in the
+#   folder and with the input files of the benchmark suite (see benchmark.py).
+#   The golden files are kept in 'golden/expected', the output in 'golden/output'.
+# The golden files depend on the ephemeris, finals2000A.all and hip_main.dat, so
+#   they are not distributed: they are created on each computer from a pinned
+#   commit with -ref. Its code is extracted with 'git archive' into 'golden/ref'
+#   and its almanac functions are called directly (older versions have no -bat),
+#   with the same settings as -bat (data pages only, fancyhdr, no cache).
+# With -num the lines are aligned first (ignoring the numbers), so that a line
+#   added or dropped is reported as such and the other lines are still compared.
+
+###### Standard library imports ######
+import difflib
+import io
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tarfile
+
+###### Local application imports ######
+import config
+from benchmark import BOOT, bench, code, data, prepare
+
+#---------------------------
+#   Module initialization
+#---------------------------
+
+CASES = [
+    # Moon Declination changes hemisphere at 22h (see README)
+    ('NA-20240614',  {"product": 1, "range": "13062024", "days": 3}),
+    ('NA-20240614m', {"product": 1, "range": "13062024", "days": 3, "style": "m"}),
+    ('NA-20241015',  {"product": 1, "range": "14102024", "days": 3}),
+    ('ET-20240614',  {"product": 3, "range": "14062024", "days": 1}),
+    ('ET-20241015',  {"product": 3, "range": "15102024", "days": 1}),
+    # polar summer and winter: Sun and Moon continuously above/below the horizon
+    ('NA-20240621',  {"product": 1, "range": "20062024", "days": 3}),
+    ('NA-20241221',  {"product": 1, "range": "20122024", "days": 3}),
+    ('NA-20250321',  {"product": 1, "range": "20032025", "days": 3}),
+    # a month at high latitudes: double moonrises/moonsets and next-day events
+    ('ET-202406',    {"product": 3, "range": "2024-06"}),
+    ('ET-202412',    {"product": 3, "range": "2024-12"}),
+    ('NA-202501',    {"product": 1, "range": "2025-01"}),
+]
+
+golden = os.path.join(code, "golden")
+expected = os.path.join(golden, "expected")
+output = os.path.join(golden, "output")
+reftree = os.path.join(golden, "ref")
+
+# started as 'python -c REFBOOT' in the data folder: creates a case with the almanac
+#   functions of the code in 'code' (a commit extracted by -ref)
+REFBOOT = """import sys
+sys.path.insert(0, {code!r})
+from datetime import date
+import config
+config.useCache = False
+config.useCKPT = False
+config.useIERS = {useIERS!r}
+config.ageIERS = 1000000
+config.DPonly = True
+config.FANCYhd = True
+config.MULTIpr = {mp!r}
+config.tbls = {tbls!r}
+config.decf = ''
+from alma_skyfield import init_sf
+from nautical import almanac
+from suntables import sunalmanac
+from eventtables import makeEVtables
+if __name__ == '__main__':
+    ts = init_sf('./')
+    first_day = date{first_day!r}
+    if {product!r} == 1: tex = almanac(first_day, {dtp!r}, ts)
+    elif {product!r} == 2: tex = sunalmanac(first_day, {dtp!r})
+    else: tex = makeEVtables(first_day, {dtp!r}, ts)
+    with open({name!r} + ".tex", mode="w", encoding="utf8") as f:
+        f.write(tex)
+"""
+
+# a time (hh:mm or hh:mm:ss) or a number
+TOKEN = re.compile(r"(\d\d:\d\d(?::\d\d)?|-?\d+(?:\.\d+)?)")
+
+#------------------------
+#   internal functions
+#------------------------
+
+def collect(name, before, folder):
+    # moves the .tex file created in 'data' to 'folder' and removes all other new files
+    fn = None
+    for f in set(os.listdir(data)) - before:
+        if f.endswith(".tex"):
+            fn = os.path.join(folder, name + ".tex")
+            shutil.move(os.path.join(data, f), fn)
+        elif os.path.isdir(os.path.join(data, f)):
+            shutil.rmtree(os.path.join(data, f))
+        else:
+            os.remove(os.path.join(data, f))
+    return fn
+
+def generate(name, job, mp, useIERS):
+    # creates the .tex file of a case in 'output'; returns its filename (or None)
+    manifest = os.path.join(bench, "job.json")
+    with open(manifest, mode="w", encoding="utf8") as f:
+        json.dump({'jobs': [dict(job, pdf=False)]}, f)
+    boot = BOOT.format(code=code, script=os.path.join(code, "sfalmanac.py"), useIERS=useIERS)
+    args = [sys.executable, "-c", boot, "-bat", manifest, "-dpo"]
+    if not mp: args.append("-sp")
+    before = set(os.listdir(data))
+    subprocess.run(args, cwd=data, stdout=subprocess.DEVNULL)
+    fn = collect(name, before, output)
+    os.remove(manifest)
+    status = os.path.splitext(manifest)[0] + ".status.json"     # see progress.py
+    if os.path.isfile(status): os.remove(status)
+    return fn
+
+def extract(commit):
+    # extracts the code of a git commit into 'reftree'
+    if os.path.isdir(reftree): shutil.rmtree(reftree)
+    p = subprocess.run(["git", "archive", commit], cwd=code, stdout=subprocess.PIPE)
+    if p.returncode != 0:
+        print("ERROR: 'git archive {}' failed".format(commit))
+        sys.exit(0)
+    with tarfile.open(fileobj=io.BytesIO(p.stdout)) as tar:
+        tar.extractall(reftree)
+
+def reference(name, job, mp, useIERS):
+    # creates the .tex file of a case with the code in 'reftree' as a golden file
+    r = job['range']
+    if len(r) == 8:         # 'DDMMYYYY' and days
+        first_day, dtp = (int(r[4:]), int(r[2:4]), int(r[:2])), job.get('days', 1)
+    elif len(r) == 7:       # 'YYYY-MM'
+        first_day, dtp = (int(r[:4]), int(r[5:]), 1), -1
+    else:                   # 'YYYY'
+        first_day, dtp = (int(r), 1, 1), 0
+    boot = REFBOOT.format(code=reftree, useIERS=useIERS, mp=mp, tbls='m' if job.get('style', '')[0:1] == 'm' else '',
+                          product=job['product'], first_day=first_day, dtp=dtp, name=name)
+    before = set(os.listdir(data))
+    subprocess.run([sys.executable, "-c", boot], cwd=data, stdout=subprocess.DEVNULL)
+    return collect(name, before, expected)
+
+def value(token):
+    # a time in its smallest unit, or a number, with the size of its last digit
+    if ':' in token:
+        parts = [int(p) for p in token.split(':')]
+        secs = parts[0] * 3600 + parts[1] * 60 + (parts[2] if len(parts) > 2 else 0)
+        unit = 1 if len(parts) > 2 else 60
+        return secs, unit, 86400    # (times wrap around at midnight)
+    decimals = len(token) - token.find('.') - 1 if '.' in token else 0
+    return float(token), 10.0 ** -decimals, None
+
+def same_line(a, b, units):
+    # True if the lines differ only in numbers within 'units' of their last digit
+    ta = TOKEN.split(a)
+    tb = TOKEN.split(b)
+    if len(ta) != len(tb): return False
+    for k in range(len(ta)):
+        if k % 2 == 0:
+            if ta[k] != tb[k]: return False     # text between numbers
+            continue
+        if ta[k] == tb[k]: continue
+        if (':' in ta[k]) != (':' in tb[k]): return False
+        va, unit, wrap = value(ta[k])
+        vb = value(tb[k])[0]
+        diff = abs(va - vb)
+        if wrap is not None: diff = min(diff, wrap - diff)
+        if diff > units * unit * (1 + 1e-9): return False
+    return True
+
+def differences(a, b, units):
+    # the pairs of line numbers (or None if added/dropped) that differ beyond 'units'
+    bad = []
+    na = [TOKEN.sub("#", x) for x in a]
+    nb = [TOKEN.sub("#", x) for x in b]
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, na, nb, autojunk=False).get_opcodes():
+        if tag == 'equal':
+            bad += [(i1+k, j1+k) for k in range(i2-i1) if not same_line(a[i1+k], b[j1+k], units)]
+        else:
+            for k in range(max(i2-i1, j2-j1)):
+                bad.append((i1+k if i1+k < i2 else None, j1+k if j1+k < j2 else None))
+    return bad
+
+def compare(name, fn, units):
+    # prints the result of one case; returns True if it is equivalent
+    gold = os.path.join(expected, name + ".tex")
+    if not os.path.isfile(gold):
+        print("{:<14} no golden file (use -save)".format(name))
+        return False
+    with open(gold, mode="r", encoding="utf8") as f:
+        a = f.read().splitlines()
+    with open(fn, mode="r", encoding="utf8") as f:
+        b = f.read().splitlines()
+    if a == b:
+        print("{:<14} identical".format(name))
+        return True
+    if units is not None:
+        bad = differences(a, b, units)
+        if not bad:
+            print("{:<14} equivalent within {} unit(s) of the last digit".format(name, units))
+            return True
+        print("{:<14} DIFFERENT in {} line(s), e.g.:".format(name, len(bad)))
+        for ia, ib in bad[:5]:
+            if ia is not None: print("  - {:>6}: {}".format(ia+1, a[ia]))
+            if ib is not None: print("  + {:>6}: {}".format(ib+1, b[ib]))
+        return False
+    print("{:<14} DIFFERENT:".format(name))
+    for line in list(difflib.unified_diff(a, b, "expected", "output", n=1, lineterm=""))[:20]:
+        print("  " + line)
+    return False
+
+#--------------------------
+#   external entry points
+#--------------------------
+
+def goldens(names, mp, units, save, ref = None):
+    hashes = prepare()
+    useIERS = config.useIERS and "finals2000A.all" in hashes
+    os.makedirs(output, exist_ok=True)
+    os.makedirs(expected, exist_ok=True)
+    if ref is not None:
+        extract(ref)
+    failed = 0
+    for name, job in CASES:
+        if names and name not in names: continue
+        if ref is not None:
+            if reference(name, job, mp, useIERS) is None:
+                print("{:<14} ERROR: no LaTeX file was created by {}".format(name, ref))
+                failed += 1
+            else:
+                print("{:<14} golden file created by {}".format(name, ref))
+            continue
+        fn = generate(name, job, mp, useIERS)
+        if fn is None:
+            print("{:<14} ERROR: no LaTeX file was created".format(name))
+            failed += 1
+        elif save:
+            shutil.copyfile(fn, os.path.join(expected, name + ".tex"))
+            print("{:<14} saved as the golden file".format(name))
+        elif not compare(name, fn, units):
+            failed += 1
+    if ref is not None:
+        shutil.rmtree(reftree)
+    elif not save:
+        print("\n{} case(s) differ".format(failed) if failed else "\nall cases are equivalent")
+    return failed
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    units = None
+    if "-num" in args:
+        i = args.index("-num")
+        units = 1
+        if i + 1 < len(args) and args[i+1].isnumeric():
+            units = int(args.pop(i+1))
+    ref = None
+    if "-ref" in args:
+        i = args.index("-ref")
+        if i + 1 >= len(args):
+            print("Please name a git commit after -ref, e.g. -ref 7826fe0")
+            sys.exit(0)
+        ref = args.pop(i+1)
+    names = [a for a in args if not a.startswith('-')]
+    unknown = [n for n in names if n not in [c[0] for c in CASES]]
+    if unknown:
+        print("Unknown case(s): {}\nValid cases are: {}".format(", ".join(unknown), ", ".join(c[0] for c in CASES)))
+        sys.exit(0)
+    sys.exit(1 if goldens(names, "-mp" in args, units, "-save" in args, ref) else 0)
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#   Copyright (C) 2024  Andrew Bauer
+
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This reads the Hipparcos catalog (hip_main.dat) without Pandas (used by init_sf and ld_init_sf).
+#
+# Only the columns that Skyfield's hipparcos.load_dataframe() keeps are read, and
+#   only when the first star is looked up, so products without stars never read
+#   the catalog. The columns are saved in 'hip_main.dat.npz' next to it, which is
+#   used as long as the size and modification time of hip_main.dat are unchanged.
+# A row is returned as a dictionary with the same keys as a row of the Pandas
+#   dataframe, so 'Star.from_dataframe(df.loc[hip])' works as before.
+
+###### Standard library imports ######
+import gzip
+import os
+
+###### Third party imports ######
+from skyfield.data import hipparcos
+import numpy as np
+
+#---------------------------
+#   Module initialization
+#---------------------------
+
+# column number in hip_main.dat -> key in a row (as in hipparcos.load_dataframe)
+COLUMNS = [(5, 'magnitude'), (8, 'ra_degrees'), (9, 'dec_degrees'), (11, 'parallax_mas'),
+           (12, 'ra_mas_per_year'), (13, 'dec_mas_per_year')]
+
+#------------------------
+#   internal functions
+#------------------------
+
+def tofloat(txt):
+    txt = txt.strip()
+    return float(txt) if txt != "" else np.nan
+
+def parse(f, st, fn):
+    magic = f.read(2)
+    f.seek(0)
+    lines = gzip.open(f, mode="rt") if magic == b'\x1f\x8b' else (line.decode('ascii') for line in f)
+    hip = []
+    cols = [[] for c in COLUMNS]
+    for line in lines:
+        fields = line.split('|')
+        hip.append(int(fields[1]))
+        for i, (n, name) in enumerate(COLUMNS):
+            cols[i].append(tofloat(fields[n]))
+    hip = np.array(hip, dtype=np.int64)
+    order = np.argsort(hip, kind='stable')     # sorted by HIP number for the lookup
+    data = {'mtime': np.int64(st.st_mtime_ns), 'size': np.int64(st.st_size), 'hip': hip[order]}
+    for i, (n, name) in enumerate(COLUMNS):
+        data[name] = np.array(cols[i], dtype=np.float64)[order]
+    try:
+        with open(fn + ".npz.new", mode="wb") as w:
+            np.savez(w, **data)
+        os.replace(fn + ".npz.new", fn + ".npz")
+    except OSError:
+        pass        # a read-only folder: parse again next time
+    return data
+
+def catalog(load):
+    # the catalog columns: from the sidecar file if still valid
+    fn = load.path_to(os.path.basename(hipparcos.URL))
+    if os.path.isfile(fn) and os.path.isfile(fn + ".npz"):
+        st = os.stat(fn)
+        try:
+            with np.load(fn + ".npz", allow_pickle=False) as npz:
+                data = {k: npz[k] for k in npz.files}
+            if int(data['mtime']) == st.st_mtime_ns and int(data['size']) == st.st_size:
+                return data
+        except (OSError, ValueError, KeyError):
+            pass        # ignore a damaged sidecar file
+    with load.open(hipparcos.URL) as f:     # downloads hip_main.dat if missing
+        return parse(f, os.stat(fn), fn)
+
+#--------------------------
+#   external entry points
+#--------------------------
+
+class HipCatalog:
+    # replaces the Pandas dataframe: 'df.loc[hip]' returns the row of star 'hip'
+    def __init__(self, load):
+        self.load = load
+        self.data = None
+
+    @property
+    def loc(self):
+        if self.data is None:
+            self.data = catalog(self.load)     # read on first use
+        return self
+
+    def __getitem__(self, hip):
+        hips = self.data['hip']
+        i = int(np.searchsorted(hips, hip))
+        if i == len(hips) or hips[i] != hip:
+            raise KeyError(hip)
+        row = {name: float(self.data[name][i]) for n, name in COLUMNS}
+        row['ra_hours'] = row['ra_degrees'] / 15.0
+        row['epoch_year'] = 1991.25
+        return row
@@ -19,15 +19,9 @@
 # Skyfield functions for Lunar Distance tables and charts
 
 ###### Standard library imports ######
-from datetime import date
 from math import atan, degrees, copysign
 import os
-import errno
-import socket
 import sys			# required for .stdout.write()
-import urllib.error # used in 'download_EOP' function
-from urllib.request import urlopen
-from collections import deque
 
 ###### Third party imports ######
 from skyfield import VERSION
@@ -35,10 +29,14 @@ from skyfield.api import Loader
 from skyfield.api import Topos, Star
 from skyfield import almanac
 from skyfield.nutationlib import iau2000b
-from skyfield.data import hipparcos
 
 ###### Local application imports ######
 import config
+from eopcache import eop_timescale, eop_dates
+from eopfetch import fetch, refresh, swap_new
+from ephtrim import kernel
+from timegrid import ut1
+from hipcatalog import HipCatalog
 import ld_stardata
 
 #---------------------------
@@ -77,98 +75,8 @@ def SkyfieldVersion(version2):      # compare Skyfield version to version2
             # return -1
     # return 0
 
-def isConnected():
-    try:
-        # connect to the host -- tells us if the host is actually reachable
-        sock = socket.create_connection(("www.iers.org", 80))
-        if sock is not None: sock.close
-        return True
-    except OSError:
-        pass
-    # try alternate source if above server is down ...
-    try:
-        # connect to the host -- tells us if the host is actually reachable
-        sock = socket.create_connection(("maia.usno.navy.mil", 80))
-        if sock is not None: sock.close
-        return True
-    except OSError:
-        pass
-    return False    # if neither is reachable
-
-# NOTE: the IERS server is unavailable (due to maintenance work in the first 3 weeks, at least, of April 2022)
-#       however, although the USNO server currently works, it was previously down for 2.5 years!
-#       So it is still best to try using the IERS server as first oprion, and USNO as second.
-
-def testServer(filename, url):
-    try:
-        connection2 = urlopen(url)
-    except Exception as e:
-        e2 = IOError('cannot download {0} because {1}'.format(url, e))
-        e2.__cause__ = None
-#        raise e2
-        return False
-    return True     # server works
-
-def download_EOP(path, filename, url, loc):
-    # NOTE: the following 'print' statement does not print immediately in Linux!
-    #print("Downloading EOP data from USNO...", end ="")
-    sys.stdout.write("Downloading EOP data from {}...".format(loc))
-    sys.stdout.flush()
-    filepath = os.path.join(path, filename)
-    url += filename
-    try:
-        connection = urlopen(url)
-    except urllib.error.URLError as e:
-        #raise IOError('error getting {0} - {1}'.format(url, e))
-        print('\nError getting {0} - {1}'.format(url, e))
-        sys.exit(0)
-    blocksize = 128*1024
-
-    # Claim our own unique download filename.
-
-    tempbase = tempname = path + filename + '.download'
-    flags = getattr(os, 'O_BINARY', 0) | os.O_CREAT | os.O_EXCL | os.O_RDWR
-    i = 1
-    while True:
-        try:
-            fd = os.open(tempname, flags, 0o666)
-        except OSError as e:  # "FileExistsError" is not supported by Python 2
-            if e.errno != errno.EEXIST:
-                raise
-            i += 1
-            tempname = '{0}{1}'.format(tempbase, i)
-        else:
-            break
-
-    # Download to the temporary filename.
-
-    with os.fdopen(fd, 'wb') as w:
-        try:
-            length = 0
-            while True:
-                data = connection.read(blocksize)
-                if not data:
-                    break
-                w.write(data)
-                length += len(data)
-            w.flush()
-        except Exception as e:
-            raise IOError('error getting {0} - {1}'.format(url, e))
-
-    # Rename the temporary file to the destination name.
-
-    if os.path.exists(filepath):
-        os.remove(filepath)
-    try:
-        os.rename(tempname, filepath)
-    except Exception as e:
-        raise IOError('error renaming {0} to {1} - {2}'.format(tempname, filepath, e))
-
-    sys.stdout.write("done.\n")
-    sys.stdout.flush()
-
 def ld_init_sf(spad):
-    global ts, pandasDF, eph, earth, moon, sun, venus, mars, jupiter, saturn
+    global ts, hipDF, eph, earth, moon, sun, venus, mars, jupiter, saturn
     load = Loader(spad)         # spad = folder to store the downloaded files
     EOPdf  = "finals2000A.all"  # Earth Orientation Parameters data file
     dfIERS = spad + EOPdf
@@ -177,27 +85,18 @@ def ld_init_sf(spad):
 
     if config.useIERS:
         if SkyfieldVersion("1.31") >= 0:
+            swap_new(spad, EOPdf)   # a newer file downloaded during the previous run
             if os.path.isfile(dfIERS):
                 if load.days_old(EOPdf) > float(config.ageIERS):
-                    if isConnected():
-                        if testServer(EOPdf, urlIERS):  # first try downloading via FTP
-                            load.download(EOPdf)
-                        elif testServer(EOPdf, urlUSNO):# then try the USNO server
-                            download_EOP(spad,EOPdf,urlUSNO,"USNO")
-                        else:   # finally try the IERS datacenter (available in more countries)
-                            download_EOP(spad,EOPdf,urlDCIERS,"IERS datacenter")
-                    else: print("NOTE: no Internet connection... using existing '{}'".format(EOPdf))
-                ts = load.timescale(builtin=False)	# timescale object
+                    refresh(spad, EOPdf, [urlIERS, urlUSNO, urlDCIERS])
+                ts = eop_timescale(load, dfIERS)	# timescale object
                 config.useIERSEOP = True
             else:
-                if isConnected():
-                    if testServer(EOPdf, urlIERS):  # first try downloading via FTP
-                        load.download(EOPdf)
-                    elif testServer(EOPdf, urlUSNO):# then try the USNO server
-                        download_EOP(spad,EOPdf,urlUSNO,"USNO")
-                    else:   # finally try the IERS datacenter (available in more countries)
-                        download_EOP(spad,EOPdf,urlDCIERS,"IERS datacenter")
-                    ts = load.timescale(builtin=False)	# timescale object
+                # first try downloading via FTP, then the USNO server,
+                # finally the IERS datacenter (available in more countries)
+                if fetch(spad, EOPdf, [urlIERS, urlUSNO, urlDCIERS], True):
+                    os.replace(dfIERS + ".new", dfIERS)
+                    ts = eop_timescale(load, dfIERS)	# timescale object
                     config.useIERSEOP = True
                 else:
                     print("NOTE: no Internet connection... using built-in UT1-tables")
@@ -208,66 +107,22 @@ def ld_init_sf(spad):
         ts = load.timescale()	# timescale object with built-in UT1-tables
 
     if config.useIERSEOP and os.path.isfile(dfIERS):
-# get the IERS EOP data "release date" according to these rules:
-#   - begin searching within this millenium (ignoring data from 02 Jan 1973 to 31 Dec 1999)
-#   - halt when the following value is "P", i.e. predicted as opposed to measured:
-#       - flag for Bull. A UT1-UTC values
-#   - step back one day to the record that has "I", i.e. measured data.
-#
-# the date of this record is the last date with IERS measured data.
-#   [the more recent the date, the more accurate/reliable are both the past IERS
-#   Earth Orientation Parameters as well as the future (predicted) EOP data values.]
-
-# IERS EOP data format definition:
-# https://maia.usno.navy.mil/ser7/readme.finals2000A
-
-        queue = deque(["a", "b", "c", "d"])
-        PredData = False    # True when Prediction data flagged
-        PredEnd  = False    # True when Prediction data no longer flagged
-
-        with open(dfIERS) as file:
-            for line in file:
-                mjd = int(line[7:12])
-
-                if not PredData and mjd >= 51544:    # skip data in previous  millenium
-                    queue.append(line)
-                    queue.popleft()
-                    c1 = line[16:17]    # IERS (I) or Prediction (P) flag for Bull. A polar motion values
-                    c2 = line[57:58]    # IERS (I) or Prediction (P) flag for Bull. A UT1-UTC values
-                    c3 = line[95:96]    # IERS (I) or Prediction (P) flag for Bull. A nutation values
-                    if not PredData and c2 == "P":
-                        PredData = True
-                        iers = ""
-                        while queue:
-                            iersdata = queue.pop()
-                            if iersdata[57:58] == "I":
-                                iers = iersdata
-                                break
-                        if iers == "": iers = iersdata
-                        year = int(iers[0:2]) + 2000
-                        mth  = int(iers[2:4])
-                        day  = int(iers[4:6])
-                        dt = date(year, mth, day)
-                        config.txtIERSEOP = "IERS Earth Orientation data as of " + dt.strftime("%d-%b-%Y")
-                elif PredData:    # search for end of Prediction data
-                    c2 = line[57:58]    # IERS (I) or Prediction (P) flag for Bull. A UT1-UTC values
-                    if c2 == "P":
-                        iers = line
-                    else:
-                        PredEnd = True
-                        break
-
-        # detect end of Prediction data even if file ends with c2 == "P" ...
-        year = int(iers[0:2]) + 2000
-        mth  = int(iers[2:4])
-        day  = int(iers[4:6])
-        dt2 = date(year, mth, day)
+        # the last dates with measured and predicted IERS EOP data (see eopcache.scan_finals)
+        dt, dt2 = eop_dates(dfIERS)
+        if dt2 is None:
+            print("Error: IERS Earth Orientation Parameters data file is incomplete...")
+            print("       most likely the download did not finish properly.")
+            print("       Please delete the 'finals2000A.all' data file and")
+            print("       rerun this program - it will be downloaded anew.")
+            sys.exit(0)
+        if dt is not None:
+            config.txtIERSEOP = "IERS Earth Orientation data as of " + dt.strftime("%d-%b-%Y")
         config.endIERSEOP = "IERS Earth Orientation predictions end " + dt2.strftime("%d-%b-%Y")
         config.dt_IERSEOP = dt2
 
     if config.ephndx in set([0, 1, 2, 3, 4]):
     
-        eph = load(config.ephemeris[config.ephndx][0])	# load chosen ephemeris
+        eph = kernel(load)	# chosen ephemeris (or an excerpt for config.ephspan)
         earth   = eph['earth']
         moon    = eph['moon']
         sun     = eph['sun']
@@ -279,10 +134,8 @@ def ld_init_sf(spad):
         else:
             mars    = eph['mars']
 
-    # load the Hipparcos catalog as a 118,218 row Pandas dataframe.
-    with load.open(hipparcos.URL) as f:
-        #hipparcos_epoch = ts.tt(1991.25)
-        pandasDF = hipparcos.load_dataframe(f)
+    # the Hipparcos catalog (118,218 stars) is read when the first star is looked up
+    hipDF = HipCatalog(load)
 
     return ts
 
@@ -351,7 +204,7 @@ def fmtdeg(deg, fixedwidth=1):
 
 def getDUT1(d):       # used in 'page' (Lunar DIstance tables only)
     # obtain calculation parameters
-    t = ts.ut1(d.year, d.month, d.day, 0, 0, 0)
+    t = ut1(ts, d.year, d.month, d.day, 0, 0, 0)
     return t.dut1, t.delta_t
 
 #-----------------------------------------------------
@@ -360,8 +213,8 @@ def getDUT1(d):       # used in 'page' (Lunar DIstance tables only)
 
 def moon_SD(d):         # used in moontab
     # compute semi-diameter of moon (in minutes)
-    t00 = ts.ut1(d.year, d.month, d.day, 0, 0, 0)
-    #t12 = ts.ut1(d.year, d.month, d.day, 12, 0, 0)
+    t00 = ut1(ts, d.year, d.month, d.day, 0, 0, 0)
+    #t12 = ut1(ts, d.year, d.month, d.day, 12, 0, 0)
     position = earth.at(t00).observe(moon)
     distance = position.apparent().radec(epoch='date')[2]
     dist_km = distance.km
@@ -372,7 +225,7 @@ def moon_SD(d):         # used in moontab
 
 def moon_GHA(d):        # used in moontab
     # compute moon's GHA, DEC and HP per hour of day
-    t = ts.ut1(d.year, d.month, d.day, hour_of_day, 0, 0)
+    t = ut1(ts, d.year, d.month, d.day, hour_of_day, 0, 0)
     position = earth.at(t).observe(moon)
     #ra = position.apparent().radec(epoch='date')[0]
     #dec = position.apparent().radec(epoch='date')[1]
@@ -380,11 +233,11 @@ def moon_GHA(d):        # used in moontab
     ra, dec, distance = position.apparent().radec(epoch='date')
 
     # also compute moon's GHA at End of Day (23:59:30) and Start of Day (24 hours earlier)
-    tSoD = ts.ut1(d.year, d.month, d.day-1, 23, 59, 30)
+    tSoD = ut1(ts, d.year, d.month, d.day-1, 23, 59, 30)
     posSoD = earth.at(tSoD).observe(moon)
     raSoD = posSoD.apparent().radec(epoch='date')[0]
     ghaSoD = gha2deg(tSoD.gast, raSoD.hours)   # GHA as float
-    tEoD = ts.ut1(d.year, d.month, d.day, 23, 59, 30)
+    tEoD = ut1(ts, d.year, d.month, d.day, 23, 59, 30)
     posEoD = earth.at(tEoD).observe(moon)
     raEoD = posEoD.apparent().radec(epoch='date')[0]
     ghaEoD = gha2deg(tEoD.gast, raEoD.hours)   # GHA as float
@@ -416,7 +269,7 @@ def moon_GHA(d):        # used in moontab
 
 def moon_VD(d0,d):           # used in moontab
     # first value required is at 00:00 on the current day...
-    t0 = ts.ut1(d.year, d.month, d.day, 0, 0, 0)
+    t0 = ut1(ts, d.year, d.month, d.day, 0, 0, 0)
     pos0 = earth.at(t0).observe(moon)
     #ra0 = pos0.apparent().radec(epoch='date')[0]
     #dec0 = pos0.apparent().radec(epoch='date')[1]
@@ -425,7 +278,7 @@ def moon_VD(d0,d):           # used in moontab
     D0 = dec0.degrees
 
     # ...then 24 values at hourly intervals from 00:00 onwards
-    t = ts.ut1(d.year, d.month, d.day, next_hour_of_day, 0, 0)
+    t = ut1(ts, d.year, d.month, d.day, next_hour_of_day, 0, 0)
     position = earth.at(t).observe(moon)
     #ra  = position.apparent().radec(epoch='date')[0]
     #dec = position.apparent().radec(epoch='date')[1]
@@ -451,7 +304,7 @@ def moon_VD(d0,d):           # used in moontab
 
 def getGHA(d, hh, mm, ss):
     # calculate the Moon's GHA on date d at hh:mm:ss (ss can be a float)
-    t1 = ts.ut1(d.year, d.month, d.day, hh, mm, ss)
+    t1 = ut1(ts, d.year, d.month, d.day, hh, mm, ss)
     pos = earth.at(t1).observe(moon)
     ra = pos.apparent().radec(epoch='date')[0]
     gha = gha2deg(t1.gast, ra.hours)
@@ -592,7 +445,7 @@ def sunSD(d):
     sdsm = [0.0, 0.0]
     i = 0
     for hh in [0, 23]:
-        t00 = ts.ut1(d.year, d.month, d.day, hh, 0, 0)
+        t00 = ut1(ts, d.year, d.month, d.day, hh, 0, 0)
         position = earth.at(t00).observe(sun)
         distance = position.apparent().radec(epoch='date')[2]
         dist_km = distance.km
@@ -609,7 +462,7 @@ def sunSD(d):
 
 def sunGHA(d):              # used in addPLANET and showLD
     # compute sun's GHA and DEC at 0h, 6h, 12h, 18h, 24h
-    t = ts.ut1(d.year, d.month, d.day, hour_of_day5, 0, 0)
+    t = ut1(ts, d.year, d.month, d.day, hour_of_day5, 0, 0)
     position = earth.at(t).observe(sun)
     #ra   = position.apparent().radec(epoch='date')[0]
     #decR = position.apparent().radec(epoch='date')[1]
@@ -627,7 +480,7 @@ def sunGHA(d):              # used in addPLANET and showLD
 
 def moonGHA(d):             # used in getMOON, addMOON and Main
     # compute moon's GHA, DEC and HP at 0h, 12h, 24h
-    t = ts.ut1(d.year, d.month, d.day, hour_of_day3, 0, 0)
+    t = ut1(ts, d.year, d.month, d.day, hour_of_day3, 0, 0)
     position = earth.at(t).observe(moon)
     #ra   = position.apparent().radec(epoch='date')[0]
     #decR = position.apparent().radec(epoch='date')[1]
@@ -649,7 +502,7 @@ def moonGHA(d):             # used in getMOON, addMOON and Main
 
 def venusGHA(d):            # used in addPLANET and showLD
     # compute planet's GHA and DEC at 0h, 6h, 12h, 18h, 24h
-    t = ts.ut1(d.year, d.month, d.day, hour_of_day5, 0, 0)
+    t = ut1(ts, d.year, d.month, d.day, hour_of_day5, 0, 0)
     position = earth.at(t).observe(venus)
     #ra   = position.apparent().radec(epoch='date')[0]
     #decR = position.apparent().radec(epoch='date')[1]
@@ -667,7 +520,7 @@ def venusGHA(d):            # used in addPLANET and showLD
 
 def marsGHA(d):             # used in addPLANET and showLD
     # compute planet's GHA and DEC at 0h, 6h, 12h, 18h, 24h
-    t = ts.ut1(d.year, d.month, d.day, hour_of_day5, 0, 0)
+    t = ut1(ts, d.year, d.month, d.day, hour_of_day5, 0, 0)
     position = earth.at(t).observe(mars)
     #ra   = position.apparent().radec(epoch='date')[0]
     #decR = position.apparent().radec(epoch='date')[1]
@@ -685,7 +538,7 @@ def marsGHA(d):             # used in addPLANET and showLD
 
 def jupiterGHA(d):          # used in addPLANET and showLD
     # compute planet's GHA and DEC at 0h, 6h, 12h, 18h, 24h
-    t = ts.ut1(d.year, d.month, d.day, hour_of_day5, 0, 0)
+    t = ut1(ts, d.year, d.month, d.day, hour_of_day5, 0, 0)
     position = earth.at(t).observe(jupiter)
     #ra   = position.apparent().radec(epoch='date')[0]
     #decR = position.apparent().radec(epoch='date')[1]
@@ -703,7 +556,7 @@ def jupiterGHA(d):          # used in addPLANET and showLD
 
 def saturnGHA(d):           # used in addPLANET and showLD
     # compute planet's GHA and DEC at 0h, 6h, 12h, 18h, 24h
-    t = ts.ut1(d.year, d.month, d.day, hour_of_day5, 0, 0)
+    t = ut1(ts, d.year, d.month, d.day, hour_of_day5, 0, 0)
     position = earth.at(t).observe(saturn)
     #ra   = position.apparent().radec(epoch='date')[0]
     #decR = position.apparent().radec(epoch='date')[1]
@@ -726,10 +579,10 @@ def saturnGHA(d):           # used in addPLANET and showLD
 def getHipparcos(HIPnum, t00):          # used in ld_charts.getc and .getstar
 
     # get star data from Hipparcos (HIgh Precision PARallax COllecting Satellite)
-    star = Star.from_dataframe(pandasDF.loc[int(HIPnum)])
+    star = Star.from_dataframe(hipDF.loc[int(HIPnum)])
     astrometric = earth.at(t00).observe(star)
     ra, dec, distance = astrometric.radec(epoch='date')
-    mag = pandasDF.loc[int(HIPnum)]['magnitude']
+    mag = hipDF.loc[int(HIPnum)]['magnitude']
 
     return ra, dec, mag
 
@@ -778,7 +631,7 @@ def ld_planets(d):          # used in ld_tables.moontab, ld_charts.LDstrategy
     # 26 hours/day need to be calculated: 23h on 'day-1' is needed for hourly LD delta at 0h on 'day'
     #     23h on 'day-1' is needed for hourly LD delta at 0h on 'day'
     #     22h on 'day-1' is needed for rate of change of hourly LD delta at 0h on 'day'
-    t = ts.ut1(d.year, d.month, d.day, hour_of_day26, 0, 0)
+    t = ut1(ts, d.year, d.month, d.day, hour_of_day26, 0, 0)
     e = earth.at(t)
     pos_m = e.observe(moon).apparent()
     ra_m = pos_m.radec(epoch='date')[0]
@@ -1019,9 +872,9 @@ def ld_stars(d, NewMoonHours, ra_sun):      # used in moontab, LDstrategy
     # 26 hours/day need to be calculated:
     #     23h on 'day-1' is needed for hourly LD delta at 0h on 'day'
     #     22h on 'day-1' is needed for rate of change of hourly LD delta at 0h on 'day'
-    t = ts.ut1(d.year, d.month, d.day, hour_of_day26, 0, 0)
-    t00 = ts.ut1(d.year, d.month, d.day, 0, 0, 0)           # observe at midnight
-    #t12 = ts.ut1(d.year, d.month, d.day, 12, 0, 0)          # observe at noon
+    t = ut1(ts, d.year, d.month, d.day, hour_of_day26, 0, 0)
+    t00 = ut1(ts, d.year, d.month, d.day, 0, 0, 0)           # observe at midnight
+    #t12 = ut1(ts, d.year, d.month, d.day, 12, 0, 0)          # observe at noon
     e = earth.at(t)
     pos_m = e.observe(moon).apparent()
     ra_m  = pos_m.radec(epoch='date')[0]
@@ -1041,7 +894,7 @@ def ld_stars(d, NewMoonHours, ra_sun):      # used in moontab, LDstrategy
         HIPnum = line[:x3]
         Hpmag = float(line[x3+1:])          # Hipparcos magnitude
 
-        star = Star.from_dataframe(pandasDF.loc[int(HIPnum)])
+        star = Star.from_dataframe(hipDF.loc[int(HIPnum)])
         pos_s = earth.at(t00).observe(star).apparent()
         sep_sm = pos_m.separation_from(pos_s)
         ra, dec, distance = pos_s.radec(epoch='date')
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#   Copyright (C) 2024  Andrew Bauer
+
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This reports the peak memory (RSS) of the main process and of each worker process
+#   after each product, and keeps a run within the memory budget in config.py
+#   (memBudget in MB; 0 = no budget):
+#     1) the Nautical Almanac or Event Time tables are written page by page to the
+#        .tex file ('streaming') instead of being held as one string, and if that
+#        is not sufficient
+#     2) fewer worker processes are started.
+# The memory of a worker process is estimated as the largest peak of a worker
+#   process so far (see runstats.task), or else as the memory of the main process
+#   (which a worker process inherits or loads again: the ephemeris, the catalog).
+# The peak RSS is not available on Windows (the 'resource' module is Unix only).
+
+###### Standard library imports ######
+try:
+    import resource     # Unix only
+except ImportError:
+    resource = None
+import sys
+
+###### Local application imports ######
+import config
+import runstats
+
+#---------------------------
+#   Module initialization
+#---------------------------
+
+TEXDAY = 10000      # approximate size (bytes) of the LaTeX text per day (Nautical Almanac)
+MAXWORKERS = 12     # worker processes at most (see nautical.poolsize)
+
+#------------------------
+#   internal functions
+#------------------------
+
+def days(first_day, dtp):
+    # dtp = 0 if for entire year; = -1 if for entire month; else days to print
+    return 366 if dtp == 0 else 31 if dtp == -1 else dtp
+
+def worker_mb():
+    # the estimated memory of a worker process (MB)
+    workers = [v for k, v in runstats.peaks.items() if k.startswith('rss.worker.')]
+    return max(workers) if workers else peak_mb()
+
+#--------------------------
+#   external entry points
+#--------------------------
+
+def peak_mb():
+    # the peak RSS of this process (MB), or 0 if not available
+    if resource is None: return 0.0
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0)
+
+def poolsize(n, quiet = False):
+    # the number of worker processes (of n) within the memory budget (1 minimum)
+    if config.memBudget <= 0 or resource is None: return n
+    k = max(int((config.memBudget - peak_mb()) // max(worker_mb(), 1.0)), 1)
+    if k < n:
+        if not quiet:
+            print("NOTE: {} worker processes instead of {} (memory budget {} MB)".format(k, n, config.memBudget))
+        return k
+    return n
+
+def streaming(first_day, dtp):
+    # True if the pages should be written to the .tex file as they are created
+    if config.memBudget <= 0 or resource is None: return False
+    workers = 0
+    if config.MULTIpr:      # the pool may not exist yet
+        workers = runstats.workers or poolsize(min(config.CPUcores, MAXWORKERS), True)
+    need = peak_mb() + workers * worker_mb() + 2 * days(first_day, dtp) * TEXDAY / 1e6
+    return need > config.memBudget
+
+def report():
+    # records and returns the peak RSS of the main process and the worker processes
+    if resource is None: return ""
+    runstats.peak('rss.main', round(peak_mb(), 1))
+    workers = [v for k, v in runstats.peaks.items() if k.startswith('rss.worker.')]
+    msg = "peak RSS = {:0.0f} MB".format(runstats.peaks['rss.main'])
+    if workers:
+        msg += "; {} worker processes: {:0.0f} MB max, {:0.0f} MB total".format(len(workers), max(workers), sum(workers))
+    if config.memBudget > 0:
+        msg += " (budget {} MB)".format(config.memBudget)
+    return msg
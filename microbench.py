@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#   Copyright (C) 2024  Andrew Bauer
+
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# These are the microbenchmarks of the functions called most often (see CASES),
+#   each called repeatedly with the same inputs: 14 March 2027, latitude 52°N,
+#   the ephemeris in config.py and the built-in UT1 tables of Skyfield.
+#
+#   python microbench.py [-save] [case ...]
+#     -save       keep the results as the baseline for later comparisons (the
+#                 cases not run keep their previous baseline)
+#     case ...    only the cases named, e.g. fmtgha rise_set
+#
+# For each case the calls per second (the best of three timed loops) and the memory
+#   allocated per call (the peak of one call and the memory still in use after it,
+#   measured with tracemalloc) are printed and compared with
+#   'benchmark/micro_baseline.json'.
+
+###### Standard library imports ######
+from datetime import date
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+###### Local application imports ######
+import config
+from benchmark import SLOWER, bench
+
+#---------------------------
+#   Module initialization
+#---------------------------
+
+D = date(2027, 3, 14)       # the fixed inputs
+LAT = 52.0
+baseline = os.path.join(bench, "micro_baseline.json")
+
+#------------------------
+#   internal functions
+#------------------------
+
+def setup():
+    # returns [(name, function, arguments)] with all inputs calculated beforehand
+    config.useIERS = False      # the built-in UT1 tables (reproducible and offline)
+    config.useCache = False
+    config.trimEph = False
+    import alma_skyfield as sf
+    import ld_skyfield as ld
+    import ld_charts
+    import eventstore
+    from skyfield import almanac
+    from observers import site
+    from timegrid import ut1
+    ts = sf.init_sf("./")
+    ld.ld_init_sf("./")
+
+    y, m, d = D.year, D.month, D.day
+    t0 = ut1(ts, y, m, d, 0, 0, 0)
+    t0noon = ut1(ts, y, m, d, 12, 0, 0)
+    t1 = ut1(ts, y, m, d+1, 0, 0, 0)
+    topos, observer, latNS = site(sf.earth, LAT)
+    i = 1 + config.lat.index(LAT)
+
+    # moonrise/moonset and sunrise/sunset as found by Skyfield
+    moonrise, yM = almanac.find_discrete(t0, t1, sf.f_moon(observer, sf.getHorizon(t0noon)))
+    sunrise, yR = almanac.find_risings(observer, sf.sun, t0, t1, -0.8333)
+    sunset, yS = almanac.find_settings(observer, sf.sun, t0, t1, -0.8333)
+
+    # the hourly GHA of the Moon as used for its meridian passage
+    upper = sf.moonGHA(D)
+    upper2 = sf.moonGHA(D, True)
+    UpperList = [upper[6]] + upper[4][1:24] + [upper[7]]
+    UpperList2 = [upper2[6]] + upper2[4][1:24] + [upper2[7]]
+
+    # the inputs of ld_stars
+    out2, tup2, NMhours, ra_m = ld.ld_planets(D)
+
+    # the chart of makeLDcharts (tactic A) for getc
+    ld_charts.init_A4(ts, D)
+    ld_charts.shamin, ld_charts.shamax, ld_charts.sharng = 150, 340, 190
+    ld_charts.decmin, ld_charts.decmax = -55, 55
+    ld_charts.set_X_offset(None)
+
+    def fetch_search():
+        eventstore.events.clear()       # search every time
+        return sf.fetchMoonData(t0, t0noon, t1, i, LAT)
+
+    return [
+        ('fmtgha',         sf.fmtgha, (12.3456789, 5.4321)),
+        ('fmtdeg',         sf.fmtdeg, (-23.4567891, 2)),
+        ('rise_set',       sf.rise_set, (moonrise, yM, latNS)),
+        ('fmt_rise_set',   sf.fmt_rise_set, (sunrise, sunset, yR, yS, latNS)),
+        ('find_transit',   sf.find_transit, (D, UpperList, False)),
+        ('find_transit2',  sf.find_transit2, (D, UpperList2, False)),
+        ('fetchMoonData',  fetch_search, ()),
+        ('fetchMoonData+', sf.fetchMoonData, (t0, t0noon, t1, i, LAT)),     # found in the transient store
+        ('ld_stars',       ld.ld_stars, (D, NMhours, out2[0][1].hours)),
+        ('getc',           ld_charts.getc, ('Orion',)),
+    ]
+
+def timed(func, args, n):
+    start = time.perf_counter()
+    for k in range(n):
+        func(*args)
+    return time.perf_counter() - start
+
+def measure(func, args):
+    # returns calls per second, peak KB per call and retained bytes per call
+    func(*args)                 # the first call (imports, caches) is not measured
+    n = 1
+    while timed(func, args, n) < 0.2 and n < 1000000:
+        n *= 10                 # about 0.2 seconds or more per loop
+    rate = n / min(timed(func, args, n) for k in range(3))
+
+    tracemalloc.start()
+    peak = 0
+    size0 = tracemalloc.get_traced_memory()[0]
+    calls = min(n, 100)
+    for k in range(calls):
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        func(*args)
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - size)
+    kept = (tracemalloc.get_traced_memory()[0] - size0) / calls
+    tracemalloc.stop()
+    return rate, peak / 1024.0, kept
+
+#--------------------------
+#   external entry points
+#--------------------------
+
+def microbench(names, save):
+    old = {}
+    if os.path.isfile(baseline):
+        with open(baseline, mode="r", encoding="utf8") as f:
+            old = json.load(f)['cases']
+    results = {'python': sys.version.split(" ")[0], 'platform': sys.platform, 'cases': {}}
+    print("\n{:<15} {:>12} {:>10} {:>12} {:>12} {:>12}".format("case", "calls/s", "us/call", "peak KB/call", "kept B/call", "base calls/s"))
+    for name, func, args in setup():
+        if names and name not in names: continue
+        rate, peak, kept = measure(func, args)
+        results['cases'][name] = {'calls_per_s': round(rate, 1), 'peak_kb': round(peak, 1), 'kept_bytes': round(kept, 1)}
+        b = old.get(name)
+        base = "" if b is None else "{:12.1f}".format(b['calls_per_s'])
+        flag = ""
+        if b is not None and rate * SLOWER < b['calls_per_s']:
+            flag = "  slower by {:0.0f}%".format(100 * (1 - rate / b['calls_per_s']))
+        print("{:<15} {:12.1f} {:10.1f} {:12.1f} {:12.1f} {:>12}{}".format(name, rate, 1e6 / rate, peak, kept, base, flag))
+    if save:
+        updated = len(results['cases'])
+        results['cases'] = dict(old, **results['cases'])
+        os.makedirs(bench, exist_ok=True)
+        with open(baseline + ".new", mode="w", encoding="utf8") as f:
+            json.dump(results, f, indent=1)
+        os.replace(baseline + ".new", baseline)
+        print("saved as the baseline ({} of {} cases updated)".format(updated, len(results['cases'])))
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    microbench([a for a in args if not a.startswith('-')], "-save" in args)
@@ -22,7 +22,8 @@
 #     Note: 6 worker processes are sufficient
 #     Note: read/write to a global variable will occur randomly and give false
 #           results, e.g. if 'moonvisible[]' is declared here.
-#     Note: incrementing elapsed time in config.stopwatch fails: result is 0.0
+#     Note: timings and counts are added with runstats and returned with each task
+#           (incrementing a global variable of the main process fails: result is 0.0)
 # Shared memory: It is NOT possible to share arbitrary Python objects.
 #                Multiprocessing can create shared memory blocks containing C
 #                variables and C arrays. A NumPy extension adds shared NumPy arrays.
@@ -36,14 +37,18 @@ from math import degrees, atan
 
 ###### Third party imports ######
 from skyfield import VERSION
-from skyfield.api import load
-from skyfield.api import Topos, Star, wgs84, N, S, E, W     # Topos is deprecated in Skyfield v1.35!
+from skyfield.api import Star, S, W
 from skyfield import almanac
 from skyfield.nutationlib import iau2000b
 #from skyfield.data import hipparcos
 
 ###### Local application imports ######
 import config
+from observers import site
+from ephtrim import kernel
+from timegrid import ut1
+import eventstore
+import runstats
 
 #----------------------
 #   initialization
@@ -65,6 +70,9 @@ def SkyfieldVersion(version2):      # compare Skyfield version to version2
         elif v1 < v2: return -1
     return 0
 
+# Skyfield feature gates (resolved once rather than in every search)
+SF148 = SkyfieldVersion("1.48") >= 0
+
 def fmtdeg(deg, fixedwidth=1):
     # formats the angle (deg) to that used in the nautical almanac (ddd°mm.m)
 	# the optional argument specifies the minimum width for the degrees
@@ -322,8 +330,8 @@ def rise_set_error(y, lats, t0):
 def mp_planetstransit(d, ts, obj, with_seconds = False):  # used in eventtables.meridiantab
     # returns SHA and Meridian Passage for the navigational planets
 
-    out = [None, None, None]    # return [planet_sha, planet_transit] + processing time
-    eph = load(config.ephemeris[config.ephndx][0])	# load chosen ephemeris
+    out = [None, None]    # return [planet_sha, planet_transit]
+    eph = kernel()	# chosen ephemeris (opened once per process)
     earth   = eph['earth']
     if obj == 'venus':   planet = eph['venus']
     if obj == 'jupiter': planet = eph['jupiter barycenter']
@@ -334,35 +342,35 @@ def mp_planetstransit(d, ts, obj, with_seconds = False):  # used in eventtables.
         else:
             planet = eph['mars']
     lattxt = u'{} 0{} E transit'.format(obj, degree_sign)
-    if SkyfieldVersion("1.35") >= 0:
-        lats = 0.0     # default latitude (any will do)
-        topos = wgs84.latlon(lats, 0.0 * E, elevation_m=0.0)
-        observer = earth + topos
-    else:
-        topos = Topos(latNS, "0.0 E")   # Topos is deprecated in Skyfield v1.35!
+    topos, observer, latNS = site(earth, 0.0)   # default latitude (any will do)
 
     # calculate planet SHA
-    tfr = ts.ut1(d.year, d.month, d.day, 0, 0, 0)       # search from
+    tfr = ut1(ts, d.year, d.month, d.day, 0, 0, 0)       # search from
     position = earth.at(tfr).observe(planet)
     ra = position.apparent().radec(epoch='date')[0]     # RA
     out[0] = fmtgha(0, ra.hours)    # planet_sha
     
     # calculate planet transit
     d1 = d + timedelta(days=1)
-    tto = ts.ut1(d1.year, d1.month, d1.day, 0, 0, 0)    # search to
+    tto = ut1(ts, d1.year, d1.month, d1.day, 0, 0, 0)    # search to
     start00 = Time.time()                   # 00000
-    if SkyfieldVersion("1.48") < 0:
+    if not SF148:
         transit_time, y = almanac.find_discrete(tfr, tto, planet_transit(earth, planet))
         time00 = Time.time()-start00        # 00000
         out[1] = rise_set(transit_time,y,lattxt,with_seconds)[0]  # planet_transit
     else:
-        transit_time = almanac.find_transits(observer, planet, tfr, tto)
+        transit_time = transits(ts, observer, obj, planet, tfr, tto)
         time00 = Time.time()-start00        # 00000
         out[1] = fmt_transits(transit_time,lattxt,with_seconds)[0]  # planet_transit
 
-    out[2] = time00     # append processing time to list
+    runstats.add('events.transit', time00)   # processing time
     return out
 
+def transits(ts, observer, name, planet, t0, t1):
+    # meridian transits between t0 and t1 (from the transient store)
+    return eventstore.day_events(ts, ('transit', name), t0, t1,
+        lambda a, b, noon: [(almanac.find_transits(observer, planet, a, b), None)])[0][0]
+
 def planet_transit(earth, planet_name):
     # Build a function of time that returns a planet's upper transit time.
 
@@ -392,18 +400,13 @@ def mp_twilight(d, lat, ts, with_seconds = False):  # used in eventtables.twilig
     #       ...therefore daily tracking of the sun state is not possible.
 
     time00 = 0                              # 00000
-    eph = load(config.ephemeris[config.ephndx][0])	# load chosen ephemeris
+    eph = kernel()	# chosen ephemeris (opened once per process)
     earth   = eph['earth']
     sun     = eph['sun']
 
-    out = [None,None,None,None,None,None,None]  # 6 data items + processing time
+    out = [None,None,None,None,None,None]  # 6 data items
     hemisph = 'N' if lat >= 0 else 'S'
-    latNS = "{:3.1f} {}".format(abs(lat), hemisph)
-    if SkyfieldVersion("1.35") >= 0:
-        topos = wgs84.latlon(lat, 0.0 * E, elevation_m=0.0)
-        observer = earth + topos
-    else:
-        topos = Topos(latNS, "0.0 E")   # Topos is deprecated in Skyfield v1.35!
+    topos, observer, latNS = site(earth, lat)
 
     dt = datetime(d.year, d.month, d.day, 0, 0, 0)
 
@@ -412,20 +415,19 @@ def mp_twilight(d, lat, ts, with_seconds = False):  # used in eventtables.twilig
     else:
         dt -= timedelta(seconds=30)     # search from 30 seconds before midnight
 
-    t0 = ts.ut1(dt.year, dt.month, dt.day,   dt.hour, dt.minute, dt.second)
-    t1 = ts.ut1(dt.year, dt.month, dt.day+1, dt.hour, dt.minute, dt.second)
+    t0 = ut1(ts, dt.year, dt.month, dt.day,   dt.hour, dt.minute, dt.second)
+    t1 = ut1(ts, dt.year, dt.month, dt.day+1, dt.hour, dt.minute, dt.second)
     abhd = False                                # above/below horizon display NOT enabled
 
     # Sunrise/Sunset...
     horizon = 0.8333        # degrees below horizon
     start00 = Time.time()                   # 00000
-    if SkyfieldVersion("1.48") < 0:
-        actual, y = almanac.find_discrete(t0, t1, f_sun(earth, sun, topos, horizon))
+    if not SF148:
+        actual, y = almanac.find_discrete(t0, t1, f_sun(sun, observer, horizon))
         time00 += Time.time()-start00       # 00000
         out[2], out[3], r2, s2, fs = rise_set(actual,y,latNS,with_seconds)
     else:
-        sunrise, yR = almanac.find_risings(observer, sun, t0, t1, -horizon)
-        sunset,  yS = almanac.find_settings(observer, sun, t0, t1, -horizon)
+        (sunrise, yR), (sunset, yS) = sun_events(ts, sun, observer, lat, t0, t1, horizon)
         time00 += Time.time()-start00       # 00000
         out[2], out[3], r2, s2, fs = fmt_rise_set(sunrise,sunset,yR,yS,latNS,with_seconds)
 
@@ -438,13 +440,12 @@ def mp_twilight(d, lat, ts, with_seconds = False):  # used in eventtables.twilig
     # Civil Twilight...
     horizon = 6.0           # degrees below horizon
     start00 = Time.time()                   # 00000
-    if SkyfieldVersion("1.48") < 0:
-        civil, y = almanac.find_discrete(t0, t1, f_sun(earth, sun, topos, horizon))
+    if not SF148:
+        civil, y = almanac.find_discrete(t0, t1, f_sun(sun, observer, horizon))
         time00 += Time.time()-start00       # 00000
         out[1], out[4], r2, s2, fs = rise_set(civil,y,latNS,with_seconds)
     else:
-        sunrise, yR = almanac.find_risings(observer, sun, t0, t1, -horizon)
-        sunset,  yS = almanac.find_settings(observer, sun, t0, t1, -horizon)
+        (sunrise, yR), (sunset, yS) = sun_events(ts, sun, observer, lat, t0, t1, horizon)
         time00 += Time.time()-start00       # 00000
         out[1], out[4], r2, s2, fs = fmt_rise_set(sunrise,sunset,yR,yS,latNS,with_seconds)
 
@@ -456,13 +457,12 @@ def mp_twilight(d, lat, ts, with_seconds = False):  # used in eventtables.twilig
     # Nautical Twilight...
     horizon = 12.0          # degrees below horizon
     start00 = Time.time()                   # 00000
-    if SkyfieldVersion("1.48") < 0:
-        naut, y = almanac.find_discrete(t0, t1, f_sun(earth, sun, topos, horizon))
+    if not SF148:
+        naut, y = almanac.find_discrete(t0, t1, f_sun(sun, observer, horizon))
         time00 += Time.time()-start00       # 00000
         out[0], out[5], r2, s2, fs = rise_set(naut,y,latNS,with_seconds)
     else:
-        sunrise, yR = almanac.find_risings(observer, sun, t0, t1, -horizon)
-        sunset,  yS = almanac.find_settings(observer, sun, t0, t1, -horizon)
+        (sunrise, yR), (sunset, yS) = sun_events(ts, sun, observer, lat, t0, t1, horizon)
         time00 += Time.time()-start00       # 00000
         out[0], out[5], r2, s2, fs = fmt_rise_set(sunrise,sunset,yR,yS,latNS,with_seconds)
 
@@ -471,7 +471,7 @@ def mp_twilight(d, lat, ts, with_seconds = False):  # used in eventtables.twilig
         out[0] = yn
         out[5] = yn
 
-    out[6] = time00     # append processing time to list
+    runstats.add('events.sun', time00)   # processing time
     return out
 
 def midnightsun(d, hemisph):
@@ -490,9 +490,14 @@ def midnightsun(d, hemisph):
         out = r'''\rule{12Pt}{4Pt}'''
     return out
 
-def f_sun(earth, sun, topos, degBelowHorizon):
+def sun_events(ts, sun, observer, lat, t0, t1, horizon):
+    # [(sunrise, yR), (sunset, yS)] between t0 and t1 (from the transient store)
+    return eventstore.day_events(ts, ('sun', lat, horizon), t0, t1,
+        lambda a, b, noon: [almanac.find_risings(observer, sun, a, b, -horizon), almanac.find_settings(observer, sun, a, b, -horizon)])
+
+def f_sun(sun, observer, degBelowHorizon):
     # Build a function of time that returns the sun above/below horizon state.
-    topos_at = (earth + topos).at
+    topos_at = observer.at
 
     def is_sun_up_at(t):
         """The function that this returns will expect a single argument that is a 
@@ -517,26 +522,20 @@ def getmoonstate(dt, lat, horizon, ts, earth, moon):
 
     time00 = 0                              # 00000
     i = 1 + config.lat.index(lat)   # index 0 is reserved to enable an explicit setting
-    hemisph = 'N' if lat >= 0 else 'S'
-    latNS = '{:3.1f} {}'.format(abs(lat), hemisph)
-    if SkyfieldVersion("1.35") >= 0:
-        topos = wgs84.latlon(lat, 0.0 * E, elevation_m=0.0)
-        observer = earth + topos
-    else:
-        topos = Topos(latNS, "0.0 E")   # Topos is deprecated in Skyfield v1.35!
+    topos, observer, latNS = site(earth, lat)
 
-    t0 = ts.ut1(dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
+    t0 = ut1(ts, dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
     #horizon = 0.8333        # degrees below horizon
 
     # search for the next moonrise or moonset (returned in moonrise[0] and y[0])
     mstate = None
     while mstate == None:
-        t0 = ts.ut1(dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
+        t0 = ut1(ts, dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
         dt += timedelta(days=1)
-        t9 = ts.ut1(dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
+        t9 = ut1(ts, dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
         start00 = Time.time()               # 00000
-        if True or SkyfieldVersion("1.48") < 0:
-            moonrise, y = almanac.find_discrete(t0, t9, f_moon(earth, moon, topos, horizon))
+        if True or not SF148:
+            moonrise, y = almanac.find_discrete(t0, t9, f_moon(moon, observer, horizon))
             time00 += Time.time()-start00   # 00000
             if len(moonrise) > 0:
                 mstate = False if y[0] else True
@@ -577,21 +576,15 @@ def seek_moonset(prday, t9, t9noon, t0, nxday, t1, t1noon, t2, i, lat, ts, earth
     # note: this is called when there is only a moonrise on the specified date+latitude
 
     time00 = 0                              # 00000
-    config.moonHorizonSeeks += 1
+    runstats.count('events.horizon.seeks')
     m_set_t = 0     # normal case: assume moonsets yesterday & tomorrow
-    hemisph = 'N' if lat >= 0 else 'S'
-    latNS = "{:3.1f} {}".format(abs(lat), hemisph)
-    if SkyfieldVersion("1.35") >= 0:
-        topos = wgs84.latlon(lat, 0.0 * E, elevation_m=0.0)
-        observer = earth + topos
-    else:
-        topos = Topos(latNS, "0.0 E")   # Topos is deprecated in Skyfield v1.35!
+    topos, observer, latNS = site(earth, lat)
 
 #    rise, sett, ris2, set2, fs = fetchMoonData(nxday, t1, t1noon, t2, i, latNS, True, with_seconds)
     horizon = getHorizon(t1noon, earth, moon)
     start00 = Time.time()                   # 00000
-    if True or SkyfieldVersion("1.48") < 0:
-        moonrise, y = almanac.find_discrete(t1, t2, f_moon(earth, moon, topos, horizon))
+    if True or not SF148:
+        moonrise, y = eventstore.day_events(ts, ('moon', lat), t1, t2, lambda a, b, noon: [almanac.find_discrete(a, b, f_moon(moon, observer, getHorizon(noon, earth, moon)))])[0]
         time00 += Time.time()-start00       # 00000
         rise, sett, ris2, set2, fs = rise_set(moonrise,y,latNS,True)
     else:   # !!! DO NOT USE WITH Skyfield 1.48 !!! (see Skyfield Issue #998)
@@ -602,12 +595,12 @@ def seek_moonset(prday, t9, t9noon, t0, nxday, t1, t1noon, t2, i, lat, ts, earth
     if sett == '--:--':
         m_set_t = +1    # if no moonset detected - it is after tomorrow
     else:
-        config.moonHorizonSeeks += 1
+        runstats.count('events.horizon.seeks')
 #        rise, sett, ris2, set2, fs = fetchMoonData(prday, t9, t9noon, t0, i, latNS, True, with_seconds)
         horizon = getHorizon(t9noon, earth, moon)
         start00 = Time.time()               # 00000
-        if True or SkyfieldVersion("1.48") < 0:
-            moonrise, y = almanac.find_discrete(t9, t0, f_moon(earth, moon, topos, horizon))
+        if True or not SF148:
+            moonrise, y = eventstore.day_events(ts, ('moon', lat), t9, t0, lambda a, b, noon: [almanac.find_discrete(a, b, f_moon(moon, observer, getHorizon(noon, earth, moon)))])[0]
             time00 += Time.time()-start00   # 00000
             rise, sett, ris2, set2, fs = rise_set(moonrise,y,latNS,True)
         else:   # !!! DO NOT USE WITH Skyfield 1.48 !!! (see Skyfield Issue #998)
@@ -627,21 +620,15 @@ def seek_moonrise(prday, t9, t9noon, t0, nxday, t1, t1noon, t2, i, lat, ts, eart
     # note: this is called when there is only a moonset on the specified date+latitude
 
     time00 = 0                              # 00000
-    config.moonHorizonSeeks += 1
+    runstats.count('events.horizon.seeks')
     m_rise_t = 0    # normal case: assume moonrise yesterday & tomorrow
-    hemisph = 'N' if lat >= 0 else 'S'
-    latNS = "{:3.1f} {}".format(abs(lat), hemisph)
-    if SkyfieldVersion("1.35") >= 0:
-        topos = wgs84.latlon(lat, 0.0 * E, elevation_m=0.0)
-        observer = earth + topos
-    else:
-        topos = Topos(latNS, "0.0 E")   # Topos is deprecated in Skyfield v1.35!
+    topos, observer, latNS = site(earth, lat)
 
 #    rise, sett, ris2, set2, fs = fetchMoonData(nxday, t1, t1noon, t2, i, latNS, True)
     horizon = getHorizon(t1noon, earth, moon)
     start00 = Time.time()                   # 00000
-    if True or SkyfieldVersion("1.48") < 0:
-        moonrise, y = almanac.find_discrete(t1, t2, f_moon(earth, moon, topos, horizon))
+    if True or not SF148:
+        moonrise, y = eventstore.day_events(ts, ('moon', lat), t1, t2, lambda a, b, noon: [almanac.find_discrete(a, b, f_moon(moon, observer, getHorizon(noon, earth, moon)))])[0]
         time00 += Time.time()-start00       # 00000
         rise, sett, ris2, set2, fs = rise_set(moonrise,y,latNS,True)
     else:   # !!! DO NOT USE WITH Skyfield 1.48 !!! (see Skyfield Issue #998)
@@ -652,12 +639,12 @@ def seek_moonrise(prday, t9, t9noon, t0, nxday, t1, t1noon, t2, i, lat, ts, eart
     if rise == '--:--':
         m_rise_t = +1    # if no moonrise detected - it is after tomorrow
     else:
-        config.moonHorizonSeeks += 1
+        runstats.count('events.horizon.seeks')
 #        rise, sett, ris2, set2, fs = fetchMoonData(prday, t9, t9noon, t0, i, latNS, True)
         horizon = getHorizon(t9noon, earth, moon)
         start00 = Time.time()               # 00000
-        if True or SkyfieldVersion("1.48") < 0:
-            moonrise, y = almanac.find_discrete(t9, t0, f_moon(earth, moon, topos, horizon))
+        if True or not SF148:
+            moonrise, y = eventstore.day_events(ts, ('moon', lat), t9, t0, lambda a, b, noon: [almanac.find_discrete(a, b, f_moon(moon, observer, getHorizon(noon, earth, moon)))])[0]
             time00 += Time.time()-start00   # 00000
             rise, sett, ris2, set2, fs = rise_set(moonrise,y,latNS,True)
         else:   # !!! DO NOT USE WITH Skyfield 1.48 !!! (see Skyfield Issue #998)
@@ -711,22 +698,16 @@ def mp_moonrise_set(d, lat, ts):    # used in eventtables.twilighttab
 
     time00 = 0.0    # 00000 - time spent in find_discrete() when at least one time was returned
     timeAB = 0.0    # time spent seeking if moon is above/below horizon
-    eph = load(config.ephemeris[config.ephndx][0])	# load chosen ephemeris
+    eph = kernel()	# chosen ephemeris (opened once per process)
     earth   = eph['earth']
     moon    = eph['moon']
 
-    out = [None, None, None]  # return [first_event, second_event, processing time]
+    out = [None, None]  # return [first_event, second_event]
     ev1 = ['--:--','--:--']	# first event
     ev2 = ['--:--','--:--']	# second event on same day (rare)
     i = 1 + config.lat.index(lat)   # index 0 is reserved to enable an explicit setting
 
-    hemisph = 'N' if lat >= 0 else 'S'
-    latNS = "{:3.1f} {}".format(abs(lat), hemisph)
-    if SkyfieldVersion("1.35") >= 0:
-        topos = wgs84.latlon(lat, 0.0 * E, elevation_m=0.0)
-        observer = earth + topos
-    else:
-        topos = Topos(latNS, "0.0 E")   # Topos is deprecated in Skyfield v1.35!
+    topos, observer, latNS = site(earth, lat)
 
     dt = datetime(d.year, d.month, d.day, 0, 0, 0)
 
@@ -735,18 +716,18 @@ def mp_moonrise_set(d, lat, ts):    # used in eventtables.twilighttab
     #print("       ",dt.isoformat(' '))
 
     d9 = d + timedelta(days=-1)
-    t9 = ts.ut1(dt.year, dt.month, dt.day-1, dt.hour, dt.minute, dt.second)
+    t9 = ut1(ts, dt.year, dt.month, dt.day-1, dt.hour, dt.minute, dt.second)
 
-    t0 = ts.ut1(dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
+    t0 = ut1(ts, dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
 
     d1 = d + timedelta(days=1)
-    t1 = ts.ut1(dt.year, dt.month, dt.day+1, dt.hour, dt.minute, dt.second)
+    t1 = ut1(ts, dt.year, dt.month, dt.day+1, dt.hour, dt.minute, dt.second)
 
-    t2 = ts.ut1(dt.year, dt.month, dt.day+2, dt.hour, dt.minute, dt.second)
+    t2 = ut1(ts, dt.year, dt.month, dt.day+2, dt.hour, dt.minute, dt.second)
 
-    t9noon = ts.ut1(dt.year, dt.month, dt.day, dt.hour-12, dt.minute, dt.second)
-    t0noon = ts.ut1(dt.year, dt.month, dt.day, dt.hour+12, dt.minute, dt.second)
-    t1noon = ts.ut1(dt.year, dt.month, dt.day+1, dt.hour+12, dt.minute, dt.second)
+    t9noon = ut1(ts, dt.year, dt.month, dt.day, dt.hour-12, dt.minute, dt.second)
+    t0noon = ut1(ts, dt.year, dt.month, dt.day, dt.hour+12, dt.minute, dt.second)
+    t1noon = ut1(ts, dt.year, dt.month, dt.day+1, dt.hour+12, dt.minute, dt.second)
 
     #horizon = 0.8333           # 16' (semi-diameter) + 34' (atmospheric refraction)
 #-----------------------------------------------------------
@@ -755,8 +736,8 @@ def mp_moonrise_set(d, lat, ts):    # used in eventtables.twilighttab
     horizon = getHorizon(t0noon, earth, moon)   # 0.8307988 on 16-08-2024
     #print("horizon =",horizon)
     start00 = Time.time()                   # 00000
-    if True or SkyfieldVersion("1.48") < 0:
-        moonrise, y = almanac.find_discrete(t0, t1, f_moon(earth, moon, topos, horizon))
+    if True or not SF148:
+        moonrise, y = eventstore.day_events(ts, ('moon', lat), t0, t1, lambda a, b, noon: [almanac.find_discrete(a, b, f_moon(moon, observer, getHorizon(noon, earth, moon)))])[0]
         time00 += Time.time()-start00       # 00000
         ev1[0], ev1[1], ev2[0], ev2[1], mstate = rise_set(moonrise,y,latNS,True)
     else:   # !!! DO NOT USE WITH Skyfield 1.48 !!! (see Skyfield Issue #998)
@@ -783,13 +764,13 @@ def mp_moonrise_set(d, lat, ts):    # used in eventtables.twilighttab
 
     out[0] = ev1        # [rise, set] for event 1
     out[1] = ev2        # [rise, set] for event 2 (rare)
-    # append to list ...
-    out[2] = (time00, timeAB)     # time spent (returning >= 1 event time) + (seeking if moon above/below horizon)
+    runstats.add('events.moon', time00)         # time spent (returning >= 1 event time)
+    runstats.add('events.horizon', timeAB)      # time spent seeking if moon above/below horizon
     return out
 
-def f_moon(earth, moon, topos, degBelowHorizon):
+def f_moon(moon, observer, degBelowHorizon):
     # Build a function of time that returns the moon above/below horizon state.
-    topos_at = (earth + topos).at
+    topos_at = observer.at
 
     def is_moon_up_at(t):
         """The function that this returns will expect a single argument that is a 
@@ -21,7 +21,8 @@
 #     Note: 6 worker processes are sufficient
 #     Note: read/write to a global variable will occur randomly and give false
 #           results, e.g. if 'moonvisible[]' is declared here.
-#     Note: incrementing elapsed time in config.stopwatch fails: result is 0.0
+#     Note: timings and counts are added with runstats and returned with each task
+#           (incrementing a global variable of the main process fails: result is 0.0)
 # Shared memory: It is NOT possible to share arbitrary Python objects.
 #                Multiprocessing can create shared memory blocks containing C
 #                variables and C arrays. A NumPy extension adds shared NumPy arrays.
@@ -35,14 +36,18 @@ from math import degrees, atan, tan, pi, copysign
 
 ###### Third party imports ######
 from skyfield import VERSION
-from skyfield.api import load
-from skyfield.api import Topos, Star, wgs84, N, S, E, W     # Topos is deprecated in Skyfield v1.35!
+from skyfield.api import Star, S, W
 from skyfield import almanac
 from skyfield.nutationlib import iau2000b
 #from skyfield.data import hipparcos
 
 ###### Local application imports ######
 import config
+from observers import site
+from ephtrim import kernel
+from timegrid import ut1
+import eventstore
+import runstats
 
 #----------------------
 #   initialization
@@ -65,6 +70,10 @@ def SkyfieldVersion(version2):      # compare Skyfield version to version2
         elif v1 < v2: return -1
     return 0
 
+# Skyfield feature gates (resolved once rather than in every search)
+SF147 = SkyfieldVersion("1.47") >= 0
+SF148 = SkyfieldVersion("1.48") >= 0
+
 def GHAcolong(gha):
     # return the colongitude, e.g. 270° returns 90°
     coGHA = gha + 180
@@ -324,7 +333,7 @@ def rise_set_error(y, lats, t0):
 #-------------------------------------------------------
 
 def mp_ariesGHA(d, ts):                         # used in nautical.planetstab(m)
-    t = ts.ut1(d.year, d.month, d.day, hour_of_day, 0, 0)
+    t = ut1(ts, d.year, d.month, d.day, hour_of_day, 0, 0)
 
     ghas = ['' for x in range(24)]
     for i in range(24):
@@ -332,7 +341,7 @@ def mp_ariesGHA(d, ts):                         # used in nautical.planetstab(m)
     return ghas
 
 def mp_venusGHA(d, ts, earth, venus):           # used in nautical.planetstab(m)
-    t = ts.ut1(d.year, d.month, d.day, hour_of_day, 0, 0)
+    t = ut1(ts, d.year, d.month, d.day, hour_of_day, 0, 0)
     position = earth.at(t).observe(venus)
     ra = position.apparent().radec(epoch='date')[0]
     dec = position.apparent().radec(epoch='date')[1]
@@ -349,7 +358,7 @@ def mp_venusGHA(d, ts, earth, venus):           # used in nautical.planetstab(m)
     return ghas, decs, degs
 
 def mp_marsGHA(d, ts, earth, mars):             # used in nautical.planetstab(m)
-    t = ts.ut1(d.year, d.month, d.day, hour_of_day, 0, 0)
+    t = ut1(ts, d.year, d.month, d.day, hour_of_day, 0, 0)
     position = earth.at(t).observe(mars)
     ra = position.apparent().radec(epoch='date')[0]
     dec = position.apparent().radec(epoch='date')[1]
@@ -366,7 +375,7 @@ def mp_marsGHA(d, ts, earth, mars):             # used in nautical.planetstab(m)
     return ghas, decs, degs
 
 def mp_jupiterGHA(d, ts, earth, jupiter):       # used in nautical.planetstab(m)
-    t = ts.ut1(d.year, d.month, d.day, hour_of_day, 0, 0)
+    t = ut1(ts, d.year, d.month, d.day, hour_of_day, 0, 0)
     position = earth.at(t).observe(jupiter)
     ra = position.apparent().radec(epoch='date')[0]
     dec = position.apparent().radec(epoch='date')[1]
@@ -383,7 +392,7 @@ def mp_jupiterGHA(d, ts, earth, jupiter):       # used in nautical.planetstab(m)
     return ghas, decs, degs
 
 def mp_saturnGHA(d, ts, earth, saturn):         # used in nautical.planetstab(m)
-    t = ts.ut1(d.year, d.month, d.day, hour_of_day, 0, 0)
+    t = ut1(ts, d.year, d.month, d.day, hour_of_day, 0, 0)
     position = earth.at(t).observe(saturn)
     ra = position.apparent().radec(epoch='date')[0]
     dec = position.apparent().radec(epoch='date')[1]
@@ -406,8 +415,8 @@ def mp_saturnGHA(d, ts, earth, saturn):         # used in nautical.planetstab(m)
 # > > > > > > > > > > MULTIPROCESSING ENTRY POINT < < < < < < < < < <
 def mp_planetGHA(d, ts, obj):                   # used in nautical.planetstab
 
-    out = [None, None, None]  # return [planet_sha, planet_transit] + processing time
-    eph = load(config.ephemeris[config.ephndx][0])	# load chosen ephemeris
+    out = [None, None]  # return [planet_sha, planet_transit]
+    eph = kernel()	# chosen ephemeris (opened once per process)
     earth   = eph['earth']
     if obj == 'venus':   venus   = eph['venus']
     if obj == 'jupiter': jupiter = eph['jupiter barycenter']
@@ -437,8 +446,8 @@ def mp_planetGHA(d, ts, obj):                   # used in nautical.planetstab
 def mp_planetstransit(d, ts, obj, with_seconds = False):
     # returns SHA and Meridian Passage for the navigational planets
 
-    out = [None, None, None]  # return [planet_sha, planet_transit] + processing time
-    eph = load(config.ephemeris[config.ephndx][0])	# load chosen ephemeris
+    out = [None, None]  # return [planet_sha, planet_transit]
+    eph = kernel()	# chosen ephemeris (opened once per process)
     earth   = eph['earth']
     if obj == 'venus':   planet = eph['venus']
     if obj == 'jupiter': planet = eph['jupiter barycenter']
@@ -449,35 +458,35 @@ def mp_planetstransit(d, ts, obj, with_seconds = False):
         else:
             planet = eph['mars']
     lattxt = u'{} 0{} E transit'.format(obj, degree_sign)
-    if SkyfieldVersion("1.35") >= 0:
-        lats = 0.0     # default latitude (any will do)
-        topos = wgs84.latlon(lats, 0.0 * E, elevation_m=0.0)
-        observer = earth + topos
-    else:
-        topos = Topos(latNS, "0.0 E")   # Topos is deprecated in Skyfield v1.35!
+    topos, observer, latNS = site(earth, 0.0)   # default latitude (any will do)
 
     # calculate planet SHA
-    tfr = ts.ut1(d.year, d.month, d.day, 0, 0, 0)       # search from
+    tfr = ut1(ts, d.year, d.month, d.day, 0, 0, 0)       # search from
     position = earth.at(tfr).observe(planet)
     ra = position.apparent().radec(epoch='date')[0]     # RA
     out[0] = fmtgha(0, ra.hours)    # planet_sha
     
     # calculate planet transit
     d1 = d + timedelta(days=1)
-    tto = ts.ut1(d1.year, d1.month, d1.day, 0, 0, 0)    # search to
+    tto = ut1(ts, d1.year, d1.month, d1.day, 0, 0, 0)    # search to
     start00 = time()                        # 00000
-    if SkyfieldVersion("1.47") < 0:
+    if not SF147:
         transit_time, y = almanac.find_discrete(tfr, tto, planet_transit(earth, planet))
         time00 = time()-start00             # 00000
         out[1] = rise_set(transit_time,y,lattxt,with_seconds = False)[0]  # planet_transit
     else:
-        transit_time = almanac.find_transits(observer, planet, tfr, tto)
+        transit_time = transits(ts, observer, obj, planet, tfr, tto)
         time00 = time()-start00             # 00000
         out[1] = fmt_transits(transit_time,lattxt,with_seconds)[0]  # planet_transit
 
-    out[2] = time00     # append processing time to list
+    runstats.add('events.transit', time00)   # processing time
     return out
 
+def transits(ts, observer, name, planet, t0, t1):
+    # meridian transits between t0 and t1 (from the transient store)
+    return eventstore.day_events(ts, ('transit', name), t0, t1,
+        lambda a, b, noon: [(almanac.find_transits(observer, planet, a, b), None)])[0][0]
+
 def planet_transit(earth, planet_name):
     # Build a function of time that returns a planet's upper transit time.
 
@@ -497,7 +506,7 @@ def planet_transit(earth, planet_name):
 
 def hor_parallax(d, ts):      # used in nautical.starstab
 
-    eph = load(config.ephemeris[config.ephndx][0])	# load chosen ephemeris
+    eph = kernel()	# chosen ephemeris (opened once per process)
     earth = eph['earth']
     venus = eph['venus']
     if config.ephndx >= 3:
@@ -506,7 +515,7 @@ def hor_parallax(d, ts):      # used in nautical.starstab
         mars = eph['mars']
 
 # Venus
-    t0 = ts.ut1(d.year, d.month, d.day, 0, 0, 0)
+    t0 = ut1(ts, d.year, d.month, d.day, 0, 0, 0)
     position0 = earth.at(t0).observe(venus)
     vau = position0.apparent().radec(epoch='date')[2]	# distance
     hpvenus = "{:0.1f}".format((tan(6371/(vau.au*149597870.7)))*60*180/pi)
@@ -525,7 +534,7 @@ def hor_parallax(d, ts):      # used in nautical.starstab
 def mp_sunGHA(d, ts, earth, sun):              # used in nautical.sunmoontab(m)
     # compute sun's GHA and DEC per hour of day
 
-    t = ts.ut1(d.year, d.month, d.day, hour_of_day, 0, 0)
+    t = ut1(ts, d.year, d.month, d.day, hour_of_day, 0, 0)
     position = earth.at(t).observe(sun)
     ra = position.apparent().radec(epoch='date')[0]
     dec = position.apparent().radec(epoch='date')[1]
@@ -544,7 +553,7 @@ def mp_sunGHA(d, ts, earth, sun):              # used in nautical.sunmoontab(m)
 # used in nautical.sunmoontab(m) & eventtables.equationtab
 def mp_moonGHA(d, ts, earth, moon, with_seconds = False):
     # compute moon's GHA, DEC and HP per hour of day
-    t = ts.ut1(d.year, d.month, d.day, hour_of_day, 0, 0)
+    t = ut1(ts, d.year, d.month, d.day, hour_of_day, 0, 0)
     position = earth.at(t).observe(moon)
     ra = position.apparent().radec(epoch='date')[0]
     dec = position.apparent().radec(epoch='date')[1]
@@ -552,12 +561,12 @@ def mp_moonGHA(d, ts, earth, moon, with_seconds = False):
 
     if with_seconds:
         # also compute moon's GHA at End of Day (23:59:59.5) and Start of Day (24 hours earlier)
-        tSoD = ts.ut1(d.year, d.month, d.day-1, 23, 59, 59.5)
-        tEoD = ts.ut1(d.year, d.month, d.day, 23, 59, 59.5)
+        tSoD = ut1(ts, d.year, d.month, d.day-1, 23, 59, 59.5)
+        tEoD = ut1(ts, d.year, d.month, d.day, 23, 59, 59.5)
     else:   # round to minutes of time
         # also compute moon's GHA at End of Day (23:59:30) and Start of Day (24 hours earlier)
-        tSoD = ts.ut1(d.year, d.month, d.day-1, 23, 59, 30)
-        tEoD = ts.ut1(d.year, d.month, d.day, 23, 59, 30)
+        tSoD = ut1(ts, d.year, d.month, d.day-1, 23, 59, 30)
+        tEoD = ut1(ts, d.year, d.month, d.day, 23, 59, 30)
 
     posSoD = earth.at(tSoD).observe(moon)
     raSoD = posSoD.apparent().radec(epoch='date')[0]
@@ -594,9 +603,9 @@ def mp_moonGHA(d, ts, earth, moon, with_seconds = False):
 
 def mp_moonVD(d00, d, d_valNA, ts, earth, moon):           # used in nautical.sunmoontab(m)
 # OLD:  # first value required is from 23:30 on the previous day...
-# OLD:  t0 = ts.ut1(d00.year, d00.month, d00.day, 23, 30, 0)
+# OLD:  t0 = ut1(ts, d00.year, d00.month, d00.day, 23, 30, 0)
     # first value required is from 00:00 on the current day...
-    t0 = ts.ut1(d.year, d.month, d.day, 0, 0, 0)
+    t0 = ut1(ts, d.year, d.month, d.day, 0, 0, 0)
     pos0 = earth.at(t0).observe(moon)
     ra0 = pos0.apparent().radec(epoch='date')[0]
     dec0 = pos0.apparent().radec(epoch='date')[1]
@@ -606,9 +615,9 @@ def mp_moonVD(d00, d, d_valNA, ts, earth, moon):           # used in nautical.su
         D0 = round(D0, 1)
 
 # OLD:  # ...then 24 values at hourly intervals from 23:30 onwards
-# OLD:  t = ts.ut1(d.year, d.month, d.day, hour_of_day, 30, 0)
+# OLD:  t = ut1(ts, d.year, d.month, d.day, hour_of_day, 30, 0)
     # ...then 24 values at hourly intervals from 00:00 onwards
-    t = ts.ut1(d.year, d.month, d.day, next_hour_of_day, 0, 0)
+    t = ut1(ts, d.year, d.month, d.day, next_hour_of_day, 0, 0)
     position = earth.at(t).observe(moon)
     ra = position.apparent().radec(epoch='date')[0]
     dec = position.apparent().radec(epoch='date')[1]
@@ -639,7 +648,7 @@ def mp_moonVD(d00, d, d_valNA, ts, earth, moon):           # used in nautical.su
 def mp_sunmoon(date, d_valNA, ts, n):
     # !! WE *MUST* PASS config.d_valNA AS ITS VALUE CAN BE CHANGED PROGRAMMATICALLY !!
 
-    eph = load(config.ephemeris[config.ephndx][0])	# load chosen ephemeris
+    eph = kernel()	# chosen ephemeris (opened once per process)
     earth   = eph['earth']
     sun     = eph['sun']
     moon    = eph['moon']
@@ -669,11 +678,11 @@ def mp_stellar_info(d, ts, df, n):        # used in nautical.starstab
         #hipparcos_epoch = ts.tt(1991.25)
     #    df = hipparcos.load_dataframe(f)
 
-    eph = load(config.ephemeris[config.ephndx][0])	# load chosen ephemeris
+    eph = kernel()	# chosen ephemeris (opened once per process)
     earth   = eph['earth']
 
-    t00 = ts.ut1(d.year, d.month, d.day, 0, 0, 0)   #calculate at midnight
-    #t12 = ts.ut1(d.year, d.month, d.day, 12, 0, 0)  #calculate at noon
+    t00 = ut1(ts, d.year, d.month, d.day, 0, 0, 0)   #calculate at midnight
+    #t12 = ut1(ts, d.year, d.month, d.day, 12, 0, 0)  #calculate at noon
     out = []
 
     if n == 0: db = db1
@@ -783,18 +792,13 @@ def mp_twilight(d, lat, ts, with_seconds = False):     # used in nautical.twilig
     #       ...therefore daily tracking of the sun state is not possible.
 
     time00 = 0.0                            # 00000
-    eph = load(config.ephemeris[config.ephndx][0])	# load chosen ephemeris
+    eph = kernel()	# chosen ephemeris (opened once per process)
     earth   = eph['earth']
     sun     = eph['sun']
 
-    out = [None,None,None,None,None,None,None]  # 6 data items + processing time
+    out = [None,None,None,None,None,None]  # 6 data items
     hemisph = 'N' if lat >= 0 else 'S'
-    latNS = "{:3.1f} {}".format(abs(lat), hemisph)
-    if SkyfieldVersion("1.35") >= 0:
-        topos = wgs84.latlon(lat, 0.0 * E, elevation_m=0.0)
-        observer = earth + topos
-    else:
-        topos = Topos(latNS, "0.0 E")   # Topos is deprecated in Skyfield v1.35!
+    topos, observer, latNS = site(earth, lat)
 
     dt = datetime(d.year, d.month, d.day, 0, 0, 0)
 
@@ -803,20 +807,19 @@ def mp_twilight(d, lat, ts, with_seconds = False):     # used in nautical.twilig
     else:
         dt -= timedelta(seconds=30)     # search from 30 seconds before midnight
 
-    t0 = ts.ut1(dt.year, dt.month, dt.day,   dt.hour, dt.minute, dt.second)
-    t1 = ts.ut1(dt.year, dt.month, dt.day+1, dt.hour, dt.minute, dt.second)
+    t0 = ut1(ts, dt.year, dt.month, dt.day,   dt.hour, dt.minute, dt.second)
+    t1 = ut1(ts, dt.year, dt.month, dt.day+1, dt.hour, dt.minute, dt.second)
     abhd = False                                # above/below horizon display NOT enabled
 
     # Sunrise/Sunset...
     start00 = time()                        # 00000
     horizon = 0.8333        # degrees below horizon
-    if SkyfieldVersion("1.48") < 0:
-        actual, y = almanac.find_discrete(t0, t1, f_sun(earth, sun, topos, horizon))
+    if not SF148:
+        actual, y = almanac.find_discrete(t0, t1, f_sun(sun, observer, horizon))
         time00 += time()-start00            # 00000
         out[2], out[3], r2, s2, fs = rise_set(actual,y,latNS,with_seconds)
     else:
-        sunrise, yR = almanac.find_risings(observer, sun, t0, t1, -horizon)
-        sunset,  yS = almanac.find_settings(observer, sun, t0, t1, -horizon)
+        (sunrise, yR), (sunset, yS) = sun_events(ts, sun, observer, lat, t0, t1, horizon)
         time00 += time()-start00            # 00000
         out[2], out[3], r2, s2, fs = fmt_rise_set(sunrise,sunset,yR,yS,latNS,with_seconds)
 
@@ -829,13 +832,12 @@ def mp_twilight(d, lat, ts, with_seconds = False):     # used in nautical.twilig
     # Civil Twilight...
     horizon = 6.0           # degrees below horizon
     start00 = time()                        # 00000
-    if SkyfieldVersion("1.48") < 0:
-        civil, y = almanac.find_discrete(t0, t1, f_sun(earth, sun, topos, horizon))
+    if not SF148:
+        civil, y = almanac.find_discrete(t0, t1, f_sun(sun, observer, horizon))
         time00 += time()-start00            # 00000
         out[1], out[4], r2, s2, fs = rise_set(civil,y,latNS,with_seconds)
     else:
-        sunrise, yR = almanac.find_risings(observer, sun, t0, t1, -horizon)
-        sunset,  yS = almanac.find_settings(observer, sun, t0, t1, -horizon)
+        (sunrise, yR), (sunset, yS) = sun_events(ts, sun, observer, lat, t0, t1, horizon)
         time00 += time()-start00            # 00000
         out[1], out[4], r2, s2, fs = fmt_rise_set(sunrise,sunset,yR,yS,latNS,with_seconds)
 
@@ -847,13 +849,12 @@ def mp_twilight(d, lat, ts, with_seconds = False):     # used in nautical.twilig
     # Nautical Twilight...
     horizon = 12.0          # degrees below horizon
     start00 = time()                        # 00000
-    if SkyfieldVersion("1.48") < 0:
-        naut, y = almanac.find_discrete(t0, t1, f_sun(earth, sun, topos, horizon))
+    if not SF148:
+        naut, y = almanac.find_discrete(t0, t1, f_sun(sun, observer, horizon))
         time00 += time()-start00            # 00000
         out[0], out[5], r2, s2, fs = rise_set(naut,y,latNS,with_seconds)
     else:
-        sunrise, yR = almanac.find_risings(observer, sun, t0, t1, -horizon)
-        sunset,  yS = almanac.find_settings(observer, sun, t0, t1, -horizon)
+        (sunrise, yR), (sunset, yS) = sun_events(ts, sun, observer, lat, t0, t1, horizon)
         time00 += time()-start00            # 00000
         out[0], out[5], r2, s2, fs = fmt_rise_set(sunrise,sunset,yR,yS,latNS,with_seconds)
 
@@ -862,7 +863,7 @@ def mp_twilight(d, lat, ts, with_seconds = False):     # used in nautical.twilig
         out[0] = yn
         out[5] = yn
 
-    out[6] = time00     # append processing time to list
+    runstats.add('events.sun', time00)   # processing time
     return out
 
 def midnightsun(d, hemisph):
@@ -881,9 +882,14 @@ def midnightsun(d, hemisph):
         out = r'''\rule{12Pt}{4Pt}'''
     return out
 
-def f_sun(earth, sun, topos, degBelowHorizon):
+def sun_events(ts, sun, observer, lat, t0, t1, horizon):
+    # [(sunrise, yR), (sunset, yS)] between t0 and t1 (from the transient store)
+    return eventstore.day_events(ts, ('sun', lat, horizon), t0, t1,
+        lambda a, b, noon: [almanac.find_risings(observer, sun, a, b, -horizon), almanac.find_settings(observer, sun, a, b, -horizon)])
+
+def f_sun(sun, observer, degBelowHorizon):
     # Build a function of time that returns the sun above/below horizon state.
-    topos_at = (earth + topos).at
+    topos_at = observer.at
 
     def is_sun_up_at(t):
         """The function that this returns will expect a single argument that is a 
@@ -908,27 +914,21 @@ def getmoonstate(dt, lat, horizon, ts, earth, moon):
 
     time00 = 0.0                            # 00000
     Hseeks = 0
-    hemisph = 'N' if lat >= 0 else 'S'
-    latNS = '{:3.1f} {}'.format(abs(lat), hemisph)
-    if SkyfieldVersion("1.35") >= 0:
-        topos = wgs84.latlon(lat, 0.0 * E, elevation_m=0.0)
-        observer = earth + topos
-    else:
-        topos = Topos(latNS, "0.0 E")   # Topos is deprecated in Skyfield v1.35!
+    topos, observer, latNS = site(earth, lat)
 
-    t0 = ts.ut1(dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
+    t0 = ut1(ts, dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
     #horizon = 0.8333
 
     # search for the next moonrise or moonset (returned in moonrise[0] and y[0])
     mstate = None
     while mstate == None:
         Hseeks += 1
-        t0 = ts.ut1(dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
+        t0 = ut1(ts, dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
         dt += timedelta(days=1)
-        t9 = ts.ut1(dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
+        t9 = ut1(ts, dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
         start00 = time()                    # 00000
-        if True or SkyfieldVersion("1.48") < 0:
-            moonrise, y = almanac.find_discrete(t0, t9, f_moon(earth, moon, topos, horizon))
+        if True or not SF148:
+            moonrise, y = almanac.find_discrete(t0, t9, f_moon(moon, observer, horizon))
             time00 += time()-start00        # 00000
             if len(moonrise) > 0:
                 mstate = False if y[0] else True
@@ -971,18 +971,12 @@ def seek_moonset(t9, t9noon, t0, t1, t1noon, t2, lat, ts, earth, moon):
     time00 = 0.0                            # 00000
     Hseeks = 1
     m_set_t = 0     # normal case: assume moonsets yesterday & tomorrow
-    hemisph = 'N' if lat >= 0 else 'S'
-    latNS = "{:3.1f} {}".format(abs(lat), hemisph)
-    if SkyfieldVersion("1.35") >= 0:
-        topos = wgs84.latlon(lat, 0.0 * E, elevation_m=0.0)
-        observer = earth + topos
-    else:
-        topos = Topos(latNS, "0.0 E")   # Topos is deprecated in Skyfield v1.35!
+    topos, observer, latNS = site(earth, lat)
 
     horizon = getHorizon(t1noon, earth, moon)
     start00 = time()                        # 00000
-    if True or SkyfieldVersion("1.48") < 0:
-        moonrise, y = almanac.find_discrete(t1, t2, f_moon(earth, moon, topos, horizon))
+    if True or not SF148:
+        moonrise, y = eventstore.day_events(ts, ('moon', lat), t1, t2, lambda a, b, noon: [almanac.find_discrete(a, b, f_moon(moon, observer, getHorizon(noon, earth, moon)))])[0]
         time00 += time()-start00            # 00000
         rise, sett, ris2, set2, fs = rise_set(moonrise,y,latNS)
     else:   # !!! DO NOT USE WITH Skyfield 1.48 !!! (see Skyfield Issue #998)
@@ -996,8 +990,8 @@ def seek_moonset(t9, t9noon, t0, t1, t1noon, t2, lat, ts, earth, moon):
         Hseeks += 1
         horizon = getHorizon(t9noon, earth, moon)
         start00 = time()                    # 00000
-        if True or SkyfieldVersion("1.48") < 0:
-            moonrise, y = almanac.find_discrete(t9, t0, f_moon(earth, moon, topos, horizon))
+        if True or not SF148:
+            moonrise, y = eventstore.day_events(ts, ('moon', lat), t9, t0, lambda a, b, noon: [almanac.find_discrete(a, b, f_moon(moon, observer, getHorizon(noon, earth, moon)))])[0]
             time00 += time()-start00        # 00000
             rise, sett, ris2, set2, fs = rise_set(moonrise,y,latNS)
         else:   # !!! DO NOT USE WITH Skyfield 1.48 !!! (see Skyfield Issue #998)
@@ -1020,18 +1014,12 @@ def seek_moonrise(t9, t9noon, t0, t1, t1noon, t2, lat, ts, earth, moon):
     time00 = 0.0                        # 00000
     Hseeks = 1
     m_rise_t = 0    # normal case: assume moonrise yesterday & tomorrow
-    hemisph = 'N' if lat >= 0 else 'S'
-    latNS = "{:3.1f} {}".format(abs(lat), hemisph)
-    if SkyfieldVersion("1.35") >= 0:
-        topos = wgs84.latlon(lat, 0.0 * E, elevation_m=0.0)
-        observer = earth + topos
-    else:
-        topos = Topos(latNS, "0.0 E")   # Topos is deprecated in Skyfield v1.35!
+    topos, observer, latNS = site(earth, lat)
 
     horizon = getHorizon(t1noon, earth, moon)
     start00 = time()                        # 00000
-    if True or SkyfieldVersion("1.48") < 0:
-        moonrise, y = almanac.find_discrete(t1, t2, f_moon(earth, moon, topos, horizon))
+    if True or not SF148:
+        moonrise, y = eventstore.day_events(ts, ('moon', lat), t1, t2, lambda a, b, noon: [almanac.find_discrete(a, b, f_moon(moon, observer, getHorizon(noon, earth, moon)))])[0]
         time00 += time()-start00            # 00000
         rise, sett, ris2, set2, fs = rise_set(moonrise,y,latNS)
     else:   # !!! DO NOT USE WITH Skyfield 1.48 !!! (see Skyfield Issue #998)
@@ -1045,8 +1033,8 @@ def seek_moonrise(t9, t9noon, t0, t1, t1noon, t2, lat, ts, earth, moon):
         Hseeks += 1
         horizon = getHorizon(t9noon, earth, moon)
         start00 = time()                    # 00000
-        if True or SkyfieldVersion("1.48") < 0:
-            moonrise, y = almanac.find_discrete(t9, t0, f_moon(earth, moon, topos, horizon))
+        if True or not SF148:
+            moonrise, y = eventstore.day_events(ts, ('moon', lat), t9, t0, lambda a, b, noon: [almanac.find_discrete(a, b, f_moon(moon, observer, getHorizon(noon, earth, moon)))])[0]
             time00 += time()-start00        # 00000
             rise, sett, ris2, set2, fs = rise_set(moonrise,y,latNS)
         else:   # !!! DO NOT USE WITH Skyfield 1.48 !!! (see Skyfield Issue #998)
@@ -1102,48 +1090,42 @@ def mp_moonrise_set(d, lat, mstate0, ts):   # used in nautical.twilighttab (sect
     timeAB = 0.0    # time spent seeking if moon is above/below horizon
     Hseeks = 0      # count horizon seeks
     Mseeks = 0      # count of moonrise and/or moonset seeks (a time is returned)
-    eph = load(config.ephemeris[config.ephndx][0])	# load chosen ephemeris
+    eph = kernel()	# chosen ephemeris (opened once per process)
     earth   = eph['earth']
     moon    = eph['moon']
 
-    # return [first_event, second_event] per day + processing time + Hseeks
-    out = [None, None, None, None]
+    # return [first_event, second_event] per day + moon state
+    out = [None, None, None]
     ev1 = ['--:--','--:--','--:--','--:--','--:--','--:--']	# first event
     ev2 = ['--:--','--:--','--:--','--:--','--:--','--:--']	# second event on same day (rare)
 
-    hemisph = 'N' if lat >= 0 else 'S'
-    latNS = "{:3.1f} {}".format(abs(lat), hemisph)
-    if SkyfieldVersion("1.35") >= 0:
-        topos = wgs84.latlon(lat, 0.0 * E, elevation_m=0.0)
-        observer = earth + topos
-    else:
-        topos = Topos(latNS, "0.0 E")   # Topos is deprecated in Skyfield v1.35!
+    topos, observer, latNS = site(earth, lat)
 
     dt = datetime(d.year, d.month, d.day, 0, 0, 0)
     dt -= timedelta(seconds=30)     # search from 30 seconds before midnight
 
     d9 = d + timedelta(days=-1)
-    t9 = ts.ut1(dt.year, dt.month, dt.day-1, dt.hour, dt.minute, dt.second)
+    t9 = ut1(ts, dt.year, dt.month, dt.day-1, dt.hour, dt.minute, dt.second)
 
-    t0 = ts.ut1(dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
+    t0 = ut1(ts, dt.year, dt.month, dt.day, dt.hour, dt.minute, dt.second)
 
     d1 = d + timedelta(days=1)
-    t1 = ts.ut1(dt.year, dt.month, dt.day+1, dt.hour, dt.minute, dt.second)
+    t1 = ut1(ts, dt.year, dt.month, dt.day+1, dt.hour, dt.minute, dt.second)
 
     d2 = d + timedelta(days=2)
-    t2 = ts.ut1(dt.year, dt.month, dt.day+2, dt.hour, dt.minute, dt.second)
+    t2 = ut1(ts, dt.year, dt.month, dt.day+2, dt.hour, dt.minute, dt.second)
 
     d3 = d + timedelta(days=3)
-    t3 = ts.ut1(dt.year, dt.month, dt.day+3, dt.hour, dt.minute, dt.second)
+    t3 = ut1(ts, dt.year, dt.month, dt.day+3, dt.hour, dt.minute, dt.second)
 
-    t4 = ts.ut1(dt.year, dt.month, dt.day+4, dt.hour, dt.minute, dt.second)
+    t4 = ut1(ts, dt.year, dt.month, dt.day+4, dt.hour, dt.minute, dt.second)
 
     # get the angle of the moon below the horizon at noontime (for daily average distance)
-    t9noon = ts.ut1(dt.year, dt.month, dt.day, dt.hour-12, dt.minute, dt.second)
-    t0noon = ts.ut1(dt.year, dt.month, dt.day, dt.hour+12, dt.minute, dt.second)
-    t1noon = ts.ut1(dt.year, dt.month, dt.day+1, dt.hour+12, dt.minute, dt.second)
-    t2noon = ts.ut1(dt.year, dt.month, dt.day+2, dt.hour+12, dt.minute, dt.second)
-    t3noon = ts.ut1(dt.year, dt.month, dt.day+3, dt.hour+12, dt.minute, dt.second)
+    t9noon = ut1(ts, dt.year, dt.month, dt.day, dt.hour-12, dt.minute, dt.second)
+    t0noon = ut1(ts, dt.year, dt.month, dt.day, dt.hour+12, dt.minute, dt.second)
+    t1noon = ut1(ts, dt.year, dt.month, dt.day+1, dt.hour+12, dt.minute, dt.second)
+    t2noon = ut1(ts, dt.year, dt.month, dt.day+2, dt.hour+12, dt.minute, dt.second)
+    t3noon = ut1(ts, dt.year, dt.month, dt.day+3, dt.hour+12, dt.minute, dt.second)
 
     #horizon = 0.8333           # 16' (semi-diameter) + 34' (atmospheric refraction)
 #-----------------------------------------------------------
@@ -1153,8 +1135,8 @@ def mp_moonrise_set(d, lat, mstate0, ts):   # used in nautical.twilighttab (sect
     Mseeks += 1
     horizon = getHorizon(t0noon, earth, moon)   # 0.8307988 on 16-08-2024
     start00 = time()                        # 00000
-    if True or SkyfieldVersion("1.48") < 0:
-        moonrise, y = almanac.find_discrete(t0, t1, f_moon(earth, moon, topos, horizon))
+    if True or not SF148:
+        moonrise, y = eventstore.day_events(ts, ('moon', lat), t0, t1, lambda a, b, noon: [almanac.find_discrete(a, b, f_moon(moon, observer, getHorizon(noon, earth, moon)))])[0]
         time00 += time()-start00            # 00000
         ev1[0], ev1[3], ev2[0], ev2[3], mstate1 = rise_set(moonrise,y,latNS)
     else:   # !!! DO NOT USE WITH Skyfield 1.48 !!! (see Skyfield Issue #998)
@@ -1189,8 +1171,8 @@ def mp_moonrise_set(d, lat, mstate0, ts):   # used in nautical.twilighttab (sect
     Mseeks += 1
     horizon = getHorizon(t1noon, earth, moon)
     start00 = time()                        # 00000
-    if True or SkyfieldVersion("1.48") < 0:
-        moonrise, y = almanac.find_discrete(t1, t2, f_moon(earth, moon, topos, horizon))
+    if True or not SF148:
+        moonrise, y = eventstore.day_events(ts, ('moon', lat), t1, t2, lambda a, b, noon: [almanac.find_discrete(a, b, f_moon(moon, observer, getHorizon(noon, earth, moon)))])[0]
         time00 += time()-start00            # 00000
         ev1[1], ev1[4], ev2[1], ev2[4], mstate2 = rise_set(moonrise,y,latNS)
     else:   # !!! DO NOT USE WITH Skyfield 1.48 !!! (see Skyfield Issue #998)
@@ -1225,8 +1207,8 @@ def mp_moonrise_set(d, lat, mstate0, ts):   # used in nautical.twilighttab (sect
     Mseeks += 1
     horizon = getHorizon(t2noon, earth, moon)
     start00 = time()                        # 00000
-    if True or SkyfieldVersion("1.48") < 0:
-        moonrise, y = almanac.find_discrete(t2, t3, f_moon(earth, moon, topos, horizon))
+    if True or not SF148:
+        moonrise, y = eventstore.day_events(ts, ('moon', lat), t2, t3, lambda a, b, noon: [almanac.find_discrete(a, b, f_moon(moon, observer, getHorizon(noon, earth, moon)))])[0]
         time00 += time()-start00            # 00000
         ev1[2], ev1[5], ev2[2], ev2[5], mstate3 = rise_set(moonrise,y,latNS)
     else:   # !!! DO NOT USE WITH Skyfield 1.48 !!! (see Skyfield Issue #998)
@@ -1258,14 +1240,16 @@ def mp_moonrise_set(d, lat, mstate0, ts):   # used in nautical.twilighttab (sect
 
     out[0] = ev1        # [rise day 1, rise day 2, rise day 3, set day 1, set day 2, set day 3] for event 1
     out[1] = ev2        # [rise day 1, rise day 2, rise day 3, set day 1, set day 2, set day 3] for event 2 (rare)
-    # append to list ...
-    out[2] = (time00, timeAB)     # time spent (returning >= 1 event time) + (seeking if moon above/below horizon)
-    out[3] = (Mseeks, Hseeks, mstate3)     # count of (moonrise/set seeks) + (horizon seeks) + moon state
+    out[2] = mstate3    # updated moon state
+    runstats.add('events.moon', time00)         # time spent (returning >= 1 event time)
+    runstats.add('events.horizon', timeAB)      # time spent seeking if moon above/below horizon
+    runstats.count('events.moon.seeks', Mseeks)
+    runstats.count('events.horizon.seeks', Hseeks)
     return out
 
-def f_moon(earth, moon, topos, degBelowHorizon):
+def f_moon(moon, observer, degBelowHorizon):
     # Build a function of time that returns the moon above/below horizon state.
-    topos_at = (earth + topos).at
+    topos_at = observer.at
 
     def is_moon_up_at(t):
         """The function that this returns will expect a single argument that is a 
@@ -51,6 +51,14 @@ from math import cos, copysign, pi
 ###### Local application imports ######
 #from alma_ephem import magnitudes
 import config
+import checkpoint
+import pagestore
+import runstats         # timings and counts of the worker processes
+import profiler         # profiles of the worker processes (-prw)
+import progress         # pages per second and ETA
+import memory           # peak RSS and the memory budget
+import pagelog          # a JSON record per page (-pgl)
+import alma_skyfield     # for the moon state (checkpoint)
 if config.MULTIpr:  # in multi-processing mode ...
     # ! DO NOT PLACE imports IN CONDITIONAL 'if'-STATEMENTS WHEN MULTI-PROCESSING !
     import multiprocessing as mp
@@ -67,6 +75,7 @@ else:
 UpperLists = [[], [], []]    # moon GHA per hour for 3 days
 LowerLists = [[], [], []]    # moon colong GHA per hour for 3 days
 msg0 = "\nKeyboardInterrupt detected - multiprocessing aborted."
+sharedpool = None   # a worker pool shared by several jobs (batch mode)
 
 #------------------------
 #   internal functions
@@ -271,7 +280,7 @@ def twilight_symbol(oldtwi):
 # >>>>>>>>>>>>>>>>>>>>>>>>
 def mp_planetGHA_worker(Date, ts, obj):
     #print(" mp_planetGHA_worker Start  {}".format(obj))
-    gha = mp_planetGHA(Date, ts, obj)    # ===>>> mp_nautical.py
+    gha = runstats.task(mp_planetGHA, Date, ts, obj, key = obj)    # ===>>> mp_nautical.py
     #print(" mp_planetGHA_worker Finish {}".format(obj))
     return gha      # return list for four planets and Aries
 
@@ -299,7 +308,8 @@ def planetstab(Date, ts):
 
             try:
                 # RECOMMENDED: chunksize = 1
-                listofGHA = pool.map(partial_func2, objlist, 1)
+                with runstats.timer('ipc.wait'):
+                    listofGHA = runstats.collect(pool.map(partial_func2, objlist, 1))
             except KeyboardInterrupt:
                 print(msg0)
                 sys.exit(0)
@@ -429,7 +439,8 @@ def planetstabm(Date, ts):
 
             try:
                 # RECOMMENDED: chunksize = 1
-                listofGHA = pool.map(partial_func2, objlist, 1)
+                with runstats.timer('ipc.wait'):
+                    listofGHA = runstats.collect(pool.map(partial_func2, objlist, 1))
             except KeyboardInterrupt:
                 print(msg0)
                 sys.exit(0)
@@ -544,7 +555,7 @@ def planetstabm(Date, ts):
 # >>>>>>>>>>>>>>>>>>>>>>>>
 def mp_planets_worker(Date, ts, obj):
     #print(" mp_planets_worker Start  {}".format(obj))
-    sha = mp_planetstransit(Date, ts, obj)    # ===>>> mp_nautical.py
+    sha = runstats.task(mp_planetstransit, Date, ts, obj, key = obj)    # ===>>> mp_nautical.py
     #print(" mp_planets_worker Finish {}".format(obj))
     return sha      # return list for four planets
 
@@ -604,14 +615,12 @@ def starstab(Date, ts):
 
             try:
                 # RECOMMENDED: chunksize = 1
-                listofsha = pool.map(partial_func2, objlist, 1)
+                with runstats.timer('ipc.wait'):
+                    listofsha = runstats.collect(pool.map(partial_func2, objlist, 1))
             except KeyboardInterrupt:
                 print(msg0)
                 sys.exit(0)
 
-            for k in range(len(listofsha)):
-                config.stopwatch += listofsha[k][2]     # accumulate multiprocess processing time
-                del listofsha[k][-1]
             p = [item for sublist in listofsha for item in sublist]
             p.extend(hor_parallax(datex, ts))
         else:
@@ -649,7 +658,7 @@ def starstab(Date, ts):
 # >>>>>>>>>>>>>>>>>>>>>>>>
 def mp_sunmoon_worker(Date, d_valNA, ts, n):
     # split the work by date into 3 separate days
-    sunmoondata = mp_sunmoon(Date, d_valNA, ts, n)      # ===>>> mp_nautical.py
+    sunmoondata = runstats.task(mp_sunmoon, Date, d_valNA, ts, n, key = n)      # ===>>> mp_nautical.py
     return sunmoondata
 
 def sunmoontab(Date, ts):
@@ -666,7 +675,8 @@ def sunmoontab(Date, ts):
         partial_func = partial(mp_sunmoon_worker, Date, config.d_valNA, ts)
 
         try:
-            sunmoonlist = pool.map(partial_func, [nn for nn in range(3)], 1)
+            with runstats.timer('ipc.wait'):
+                sunmoonlist = runstats.collect(pool.map(partial_func, [nn for nn in range(3)], 1))
         except KeyboardInterrupt:
             print(msg0)
             sys.exit(0)
@@ -777,7 +787,8 @@ def sunmoontabm(Date, ts):
         partial_func = partial(mp_sunmoon_worker, Date, config.d_valNA, ts)
 
         try:
-            sunmoonlist = pool.map(partial_func, [nn for nn in range(3)], 1)
+            with runstats.timer('ipc.wait'):
+                sunmoonlist = runstats.collect(pool.map(partial_func, [nn for nn in range(3)], 1))
         except KeyboardInterrupt:
             print(msg0)
             sys.exit(0)
@@ -900,17 +911,24 @@ def sunmoontabm(Date, ts):
 # Note: the size of moonvisible MUST equal the size of config.lat
 moonvisible = [None] * 31       # moonvisible[0] up to moonvisible[30]
 
+sink = None     # the .tex file the pages are written to when created (see memory.py)
+
+def flush(out):
+    # writes the pages created so far to the .tex file
+    sink.write(out)
+    return ''
+
 def mp_twilight_worker(Date, ts, lat):
     #print(" mp_twilight_worker Start {}".format(lat))
     hemisph = 'N' if lat >= 0 else 'S'
-    twi = mp_twilight(Date, lat, ts)                # ===>>> mp_nautical.py
+    twi = runstats.task(mp_twilight, Date, lat, ts, key = lat)                # ===>>> mp_nautical.py
     #print(" mp_twilight_worker Finish {}".format(lat))
     return twi      # return list for all latitudes
 
 def mp_moonlight_worker(Date, ts, lat, mstate):
     #print(" mp_moonlight_worker Start  {}".format(lat))
     hemisph = 'N' if lat >= 0 else 'S'
-    ml = mp_moonrise_set(Date, lat, mstate, ts)     # ===>>> mp_nautical.py
+    ml = runstats.task(mp_moonrise_set, Date, lat, mstate, ts, key = lat)     # ===>>> mp_nautical.py
     #print(" mp_moonlight_worker Finish {}".format(lat))
     return ml       # return list for all latitudes
 
@@ -924,36 +942,27 @@ def twilighttab(Date, ts):
 
         try:
             # RECOMMENDED: chunksize = 1
-            listoftwi = pool.map(partial_func, config.lat, 1)
+            with runstats.timer('ipc.wait'):
+                listoftwi = runstats.collect(pool.map(partial_func, config.lat, 1))
         except KeyboardInterrupt:
             print(msg0)
             sys.exit(0)
 
-        for k in range(len(listoftwi)):
-            config.stopwatch += listoftwi[k][6]     # accumulate multiprocess processing time
-            del listoftwi[k][-1]
-
         # multiprocess moonlight values for "Date, Date+1, Date+2" per latitude simultaneously
         data = [(config.lat[ii], moonvisible[ii]) for ii in range(len(config.lat))]
         partial_func2 = partial(mp_moonlight_worker, Date, ts)  # list of tuples
 
         try:
             # RECOMMENDED: chunksize = 1
-            listmoon = pool.starmap(partial_func2, data, 1)
+            with runstats.timer('ipc.wait'):
+                listmoon = runstats.collect(pool.starmap(partial_func2, data, 1))
         except KeyboardInterrupt:
             print(msg0)
             sys.exit(0)
 
         #print("listmoon = {}".format(listmoon))
         for k in range(len(listmoon)):
-            tuple_seeks = listmoon[k][-1]
-            config.moonDataSeeks    += tuple_seeks[0]   # count of moonrise or set seeks
-            config.moonHorizonSeeks += tuple_seeks[1]   # count of horizon seeks
-            moonvisible[k] = tuple_seeks[2]             # updated moon state
-            del listmoon[k][-1]
-            tuple_times = listmoon[k][-1]
-            config.stopwatch  += tuple_times[0]         # accumulate multiprocess processing time
-            config.stopwatch2 += tuple_times[1]         # accumulate multiprocess processing time
+            moonvisible[k] = listmoon[k][-1]            # updated moon state
             del listmoon[k][-1]
         #print("listmoon = {}".format(listmoon))
 
@@ -1215,9 +1224,7 @@ def twilighttab(Date, ts):
 #   page preparation
 #----------------------
 
-def doublepage(Date, page1, ts):
-    # creates a doublepage (3 days) of the nautical almanac
-
+def eoptext(Date):
     # time delta values for the initial date&time...
     dut1, deltat = getDUT1(Date)
     timeDUT1 = r"DUT1 = UT1-UTC = {:+.4f} sec\quad$\Delta$T = TT-UT1 = {:+.4f} sec".format(dut1, deltat)
@@ -1231,6 +1238,16 @@ def doublepage(Date, page1, ts):
             LOfoot_IERSEOP = config.endIERSEOP
         if Date > config.dt_IERSEOP:
             LOfoot_IERSEOP = r'''\textbf{No IERS EOP prediction data available}'''
+    return timeDUT1, LOfoot_IERSEOP
+
+def doublepage(Date, page1, ts, eop = None):
+    # creates a doublepage (3 days) of the nautical almanac
+    # eop = (DUT1 header, IERS EOP footer) text if not for 'Date', e.g. placeholders
+
+    if eop is None:
+        timeDUT1, LOfoot_IERSEOP = eoptext(Date)
+    else:
+        timeDUT1, LOfoot_IERSEOP = eop
 
     find_new_moon(Date)     # required for 'moonage' and 'equation_of_time"
     #from alma_skyfield import PreviousNewMoon, PreviousFullMoon, NextNewMoon, NextFullMoon
@@ -1289,12 +1306,14 @@ def doublepage(Date, page1, ts):
 '''
 # ...........................................................
 
-    if config.tbls == "m":
-        page += planetstabm(Date,ts)
-    else:
-        page += planetstab(Date,ts) + r'''\enskip
+    with runstats.timer('table.planets'):
+        if config.tbls == "m":
+            page += planetstabm(Date,ts)
+        else:
+            page += planetstab(Date,ts) + r'''\enskip
 '''
-    page += starstab(Date,ts)
+    with runstats.timer('table.stars'):
+        page += starstab(Date,ts)
 
 # >>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
     if config.FANCYhd:
@@ -1328,12 +1347,14 @@ def doublepage(Date, page1, ts):
 
     page += str1
 
-    if config.tbls == "m":
-        page += sunmoontabm(Date,ts)
-    else:
-        page += sunmoontab(Date,ts) + r'''\enskip
+    with runstats.timer('table.sunmoon'):
+        if config.tbls == "m":
+            page += sunmoontabm(Date,ts)
+        else:
+            page += sunmoontab(Date,ts) + r'''\enskip
 '''
-    page += twilighttab(Date,ts)
+    with runstats.timer('table.twilight'):
+        page += twilighttab(Date,ts)
     # to avoid "Overfull \hbox" messages, leave a paragraph end before the end of a size change. (This may only apply to tabular* table style) See lines below...
     page += r'''
 \end{scriptsize}'''
@@ -1342,9 +1363,33 @@ def doublepage(Date, page1, ts):
 #   This simple but effective function eliminates endless keyboard interrupts
 #   each time Ctrl-C is issued, while none actually kill the parent process
 #   ... and this causes the Command Prompt window (in Windows, MPmode=0) to hang.
-def init_worker():
+def init_worker(profile = False):
     # Prevent child process from ever receiving a KeyboardInterrupt.
     signal.signal(signal.SIGINT, signal.SIG_IGN)
+    profiler.init_worker(profile)   # (config.py is not maintained in worker processes)
+
+def incpage(Date, page1, ts):
+    # a doublepage from the page store if the UT1-UTC values it depends on have not changed
+    ut1 = pagestore.ut1window(Date, 3)
+    before = [list(moonvisible), list(alma_skyfield.moonvisible)]  # the moon state before this page
+    found = pagestore.fetch('NA', Date, page1, ut1, before)
+    if found is not None:
+        page, states = found
+        moonvisible[:] = states[0]      # the moon state after this page
+        alma_skyfield.moonvisible[:] = states[1]
+        pagestore.reused += 1
+    else:
+        page = doublepage(Date, page1, ts, (pagestore.PHDUT1, pagestore.PHFOOT))
+        pagestore.store('NA', Date, page1, ut1, page, before, [moonvisible, alma_skyfield.moonvisible])
+        pagestore.created += 1
+    timeDUT1, LOfoot_IERSEOP = eoptext(Date)
+    return pagestore.fill(page, timeDUT1, LOfoot_IERSEOP)
+
+def poolsize():
+    n = config.CPUcores
+    if n > 12: n = 12   # use 12 cores maximum
+    if (config.WINpf or config.MACOSpf) and n > 8: n = 8   # 8 maximum if Windows or Mac OS
+    return memory.poolsize(n)   # fewer within the memory budget
 
 def pages(first_day, dtp, ts):
     # dtp = 0 if for entire year; = -1 if for entire month; else days to print
@@ -1352,11 +1397,12 @@ def pages(first_day, dtp, ts):
     if config.MULTIpr:
         # Windows & macOS defaults to "spawn"; Unix to "fork"
         #mp.set_start_method("spawn")
-        n = config.CPUcores
-        if n > 12: n = 12   # use 12 cores maximum
-        if (config.WINpf or config.MACOSpf) and n > 8: n = 8   # 8 maximum if Windows or Mac OS
         global pool
-        pool = mp.Pool(n, init_worker)   # start 8 max. worker processes
+        if sharedpool is not None:
+            pool = sharedpool   # batch mode: the pool is closed by the caller
+        else:
+            runstats.workers = poolsize()
+            pool = mp.Pool(runstats.workers, init_worker, (config.profile == 2,))   # start 8 max. worker processes
 
     out = ''
     page01 = True
@@ -1364,6 +1410,16 @@ def pages(first_day, dtp, ts):
     dpp = 3         # 3 days per page
     day1 = first_day
 
+    ckpt = None
+    if config.useCKPT and dtp <= 0:     # checkpoint an entire month/year
+        ckpt = checkpoint.resume('NA', first_day, dtp, [moonvisible, alma_skyfield.moonvisible])
+        if ckpt['day1'] is not None:
+            out = ckpt['out']
+            page01 = False
+            day1 = ckpt['day1']
+    progress.begin(first_day, dtp, day1)
+    pagelog.begin('NA')
+
     if dtp == 0:        # if entire year
         year = first_day.year
         yr = year
@@ -1371,7 +1427,7 @@ def pages(first_day, dtp, ts):
             cmth = day1.strftime("%b ")
             day3 = day1 + timedelta(days=2)
             if cmth != pmth:
-                print() # progress indicator - next month
+                print(progress.month_line()) # progress indicator - next month
                 #print(cmth, end='')
                 sys.stdout.write(cmth)	# next month
                 sys.stdout.flush()
@@ -1379,9 +1435,14 @@ def pages(first_day, dtp, ts):
             else:
                 sys.stdout.write('.')	# progress indicator
                 sys.stdout.flush()
-            out += doublepage(day1,page01,ts)
+            page = incpage(day1,page01,ts) if config.incPages else doublepage(day1,page01,ts)
+            out += page
+            if sink is not None: out = flush(out)
             page01 = False
+            pagelog.page(day1, 3, page)
             day1 += timedelta(days=3)
+            progress.page(day1)
+            if ckpt is not None: checkpoint.save(ckpt, day1, page)
             year = day1.year
     elif dtp == -1:     # if entire month
         mth = first_day.month
@@ -1390,7 +1451,7 @@ def pages(first_day, dtp, ts):
             cmth = day1.strftime("%b ")
             day3 = day1 + timedelta(days=2)
             if cmth != pmth:
-                print() # progress indicator - next month
+                print(progress.month_line()) # progress indicator - next month
                 #print(cmth, end='')
                 sys.stdout.write(cmth)	# next month
                 sys.stdout.flush()
@@ -1398,22 +1459,37 @@ def pages(first_day, dtp, ts):
             else:
                 sys.stdout.write('.')	# progress indicator
                 sys.stdout.flush()
-            out += doublepage(day1,page01,ts)
+            page = incpage(day1,page01,ts) if config.incPages else doublepage(day1,page01,ts)
+            out += page
+            if sink is not None: out = flush(out)
             page01 = False
+            pagelog.page(day1, 3, page)
             day1 += timedelta(days=3)
+            progress.page(day1)
+            if ckpt is not None: checkpoint.save(ckpt, day1, page)
             mth = day1.month
     else:           # print 'dtp' days beginning with first_day
         i = dtp   # don't decrement dtp
         while i > 0:
-            out += doublepage(day1,page01,ts)
+            page = incpage(day1,page01,ts) if config.incPages else doublepage(day1,page01,ts)
+            out += page
+            if sink is not None: out = flush(out)
             page01 = False
+            pagelog.page(day1, 3, page)
             i -= 3
             day1 += timedelta(days=3)
+            progress.page(day1)
 
     if dtp <= 0:        # if Full Almanac for a whole month/year...
-        print("\n")		# 2 x newline to terminate progress indicator
-
-    if config.MULTIpr:
+        print(progress.summary() + "\n")	# terminate progress indicator
+    if ckpt is not None: checkpoint.finish(ckpt)
+    if config.incPages:
+        print("{} pages recalculated; {} pages unchanged since the last IERS EOP data".format(pagestore.created, pagestore.reused))
+        pagestore.created = 0
+        pagestore.reused = 0
+        pagestore.prune()
+
+    if config.MULTIpr and sharedpool is None:
         pool.close()    # close all worker processes
         pool.join()
 
@@ -1453,14 +1529,20 @@ def page1():
 #   external entry point
 #--------------------------
 
-def almanac(first_day, dtp, ts):
+def almanac(first_day, dtp, ts, outfile = None):
     # make almanac starting from first_day
     # dtp = 0 if for entire year; = -1 if for entire month; else days to print
+    # outfile: the pages are written to it as they are created if the memory budget requires it
+    global sink
+    sink = outfile if outfile is not None and memory.streaming(first_day, dtp) else None
 
-    if config.FANCYhd:
-        return makeNAnew(first_day, dtp, ts) # use the 'fancyhdr' package
-    else:
-        return makeNAold(first_day, dtp, ts) # use old formatting
+    try:
+        if config.FANCYhd:
+            return makeNAnew(first_day, dtp, ts) # use the 'fancyhdr' package
+        else:
+            return makeNAold(first_day, dtp, ts) # use old formatting
+    finally:
+        sink = None
 
 #   The following functions are intentionally separate functions.
 #   'makeEVold' is required for TeX Live 2019, which is the standard
@@ -1696,6 +1778,9 @@ def makeNAnew(first_day, dtp, ts):
 \pagestyle{datapage}  % the default page style for the document
 \setcounter{page}{2}'''
 
+    if sink is not None:
+        sink.write(tex)     # the pages follow as they are created
+        tex = ''
     tex += pages(first_day,dtp,ts)
     tex += r'''
 \end{document}'''
@@ -1890,6 +1975,9 @@ def makeNAold(first_day, dtp, ts):
     tex += r'''
 \setcounter{page}{2}'''
 
+    if sink is not None:
+        sink.write(tex)     # the pages follow as they are created
+        tex = ''
     tex += pages(first_day,dtp,ts)
     tex += r'''
 \end{document}'''
@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#   Copyright (C) 2024  Andrew Bauer
+
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This is the table of observers (one per latitude at longitude 0° and elevation
+#   zero) shared by all rise/set/twilight/transit searches in alma_skyfield,
+#   mp_nautical and mp_eventtables.
+#
+# The geographic position (ITRS vector) of each latitude and the formatted latitude
+#   text are calculated once per process. The observer (Earth + geographic position)
+#   is kept for the Earth object in use, which ephtrim.Ephemeris returns unchanged.
+
+###### Third party imports ######
+from skyfield import VERSION
+from skyfield.api import Topos, wgs84, E     # Topos is deprecated in Skyfield v1.35!
+
+#---------------------------
+#   Module initialization
+#---------------------------
+
+SF135 = VERSION >= (1, 35)      # wgs84.latlon replaces Topos
+sites = {}          # latitude -> (geographic position, latitude text)
+observers = {}      # latitude -> observer for the Earth object 'earth0'
+earth0 = None
+
+#--------------------------
+#   external entry points
+#--------------------------
+
+def site(earth, lat):
+    # returns (geographic position, observer, latitude text) for latitude 'lat'
+    global earth0
+    if lat not in sites:
+        hemisph = 'N' if lat >= 0 else 'S'
+        latNS = "{:3.1f} {}".format(abs(lat), hemisph)
+        if SF135:
+            topos = wgs84.latlon(lat, 0.0 * E, elevation_m=0.0)
+        else:
+            topos = Topos(latNS, "0.0 E")   # Topos is deprecated in Skyfield v1.35!
+        sites[lat] = (topos, latNS)
+    topos, latNS = sites[lat]
+    if earth is not earth0:
+        observers.clear()
+        earth0 = earth
+    if lat not in observers:
+        observers[lat] = earth + topos
+    return topos, observers[lat], latNS
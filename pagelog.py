@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#   Copyright (C) 2024  Andrew Bauer
+
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# With the command line option -pgl a JSON record is appended to 'pages.jsonl' for
+#   every page of the Nautical Almanac and the Event Time tables, e.g.
+#     {"run": "2026-10-19 09:12:31", "product": "NA", "from": "2027-01-01",
+#      "to": "2027-01-03", "seconds": 1.82, "tables": {"planets": 0.21, ...},
+#      "searches": {"events.moon.seeks": 93, ...}, "search_seconds": {"events.moon": 0.9, ...},
+#      "cache": {"eventstore.hits": 31, "sfcache.misses": 12, ...}, "tex_bytes": 30512}
+#   "seconds" is the time since the previous page, the other values are the timers
+#   and counts of runstats.py added for the page (including the worker processes).
+#   All runs are appended to the same file, so that the records of a date can be
+#   compared over time ("run" is the start of the run).
+
+###### Standard library imports ######
+from datetime import datetime, timedelta
+import json
+import time
+
+###### Local application imports ######
+import config
+import runstats
+
+#---------------------------
+#   Module initialization
+#---------------------------
+
+LOGFILE = "pages.jsonl"
+SEARCHES = ('events.',)
+CACHES = ('eventstore.', 'sfcache.')
+
+run = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+product = ''
+timers0 = {}
+counts0 = {}
+last = 0.0
+
+#------------------------
+#   internal functions
+#------------------------
+
+def select(d, prefixes, digits = None):
+    return {k: (v if digits is None else round(v, digits)) for k, v in sorted(d.items()) if k.startswith(prefixes)}
+
+def snapshot():
+    global timers0, counts0, last
+    timers0 = dict(runstats.timers)
+    counts0 = dict(runstats.counts)
+    last = time.time()
+
+#--------------------------
+#   external entry points
+#--------------------------
+
+def begin(name):
+    # the pages of product 'name' ('NA' or 'EV') start
+    global product
+    if not config.pageLog: return
+    product = name
+    snapshot()
+
+def page(Date, days, tex):
+    # appends the record of a page of 'days' days beginning with Date
+    if not config.pageLog: return
+    t = runstats.delta(runstats.timers, timers0)
+    c = runstats.delta(runstats.counts, counts0)
+    record = {'run': run, 'product': product, 'from': Date.isoformat(),
+              'to': (Date + timedelta(days=days-1)).isoformat(),
+              'seconds': round(time.time() - last, 3),
+              'tables': {k[6:]: round(v, 3) for k, v in sorted(t.items()) if k.startswith('table.')},
+              'searches': select(c, SEARCHES), 'search_seconds': select(t, SEARCHES, 3),
+              'cache': select(c, CACHES), 'tex_bytes': len(tex.encode('utf8'))}
+    with open(LOGFILE, mode="a", encoding="utf8") as f:
+        f.write(json.dumps(record) + "\n")
+    snapshot()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#   Copyright (C) 2024  Andrew Bauer
+
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This keeps every Nautical Almanac doublepage created with the command line
+#   option '-inc', together with the UT1-UTC values it was built with, so that
+#   after a refresh of finals2000A.all only the affected pages are recalculated.
+#
+# A doublepage (3 days) depends on the Earth Orientation Parameters from the day
+#   before to the day after its dates. A stored page is reused if none of these
+#   UT1-UTC values differ by more than config.eopTol seconds. The DUT1 header and
+#   the IERS EOP footer are stored as placeholders and are always filled in with
+#   the current text, as they change with every finals2000A.all version.
+# A page also depends on the moon states (moonvisible) it starts with, as they come
+#   from the previous page: they are stored with the page and it is reused only
+#   if they are the same.
+# Other settings that affect the page content are part of the page store filename.
+# The least recently used pages are deleted when the page store exceeds config.pageMB.
+
+###### Standard library imports ######
+from hashlib import sha1
+import json
+import os
+
+###### Local application imports ######
+import config
+from checkpoint import pagesettings
+from alma_skyfield import getDUT1s
+from skyfield import VERSION
+
+#---------------------------
+#   Module initialization
+#---------------------------
+
+PHDUT1 = "%%DUT1%%"         # placeholder for the DUT1 header text
+PHFOOT = "%%IERSEOP%%"      # placeholder for the IERS EOP footer text
+reused = 0                  # pages found in the page store (since the last reset)
+created = 0                 # pages calculated (since the last reset)
+
+#------------------------
+#   internal functions
+#------------------------
+
+def filename(kind, Date, page1):
+    key = json.dumps(pagesettings() + [kind, page1, config.ephemeris[config.ephndx][0], VERSION])
+    return "{}pagestore/{}_{}_{}.json".format(config.docker_prefix, kind, Date.strftime("%Y%m%d"), sha1(key.encode('utf8')).hexdigest()[:12])
+
+#--------------------------
+#   external entry points
+#--------------------------
+
+def prune():
+    # delete the least recently used pages if the page store exceeds config.pageMB
+    folder = "{}pagestore/".format(config.docker_prefix)
+    if not os.path.isdir(folder): return
+    files = []
+    for entry in os.scandir(folder):
+        if entry.is_file() and entry.name.endswith(".json"):
+            st = entry.stat()
+            files.append((st.st_mtime, st.st_size, entry.path))
+    total = sum(f[1] for f in files)
+    limit = config.pageMB * 1024 * 1024
+    if total <= limit: return
+    excess = total - int(limit * 0.9)   # make room for further pages
+    for mtime, size, fn in sorted(files):
+        try:
+            os.remove(fn)
+        except OSError:
+            pass
+        excess -= size
+        if excess <= 0: break
+
+def ut1window(Date, days):
+    # the UT1-UTC values a page of 'days' days depends on
+    return [round(float(x), 7) for x in getDUT1s(Date, -1, days)]
+
+def fetch(kind, Date, page1, ut1, before):
+    # returns (page text with placeholders, saved moon states) or None if it must be recalculated
+    # before = the moon states the page starts with
+    fn = filename(kind, Date, page1)
+    if not os.path.exists(fn): return None
+    try:
+        with open(fn, mode="r", encoding="utf8") as f:
+            data = json.load(f)
+    except ValueError:
+        return None     # ignore a damaged file
+    if len(data['ut1']) != len(ut1): return None
+    for old, new in zip(data['ut1'], ut1):
+        if abs(old - new) > config.eopTol: return None
+    if data.get('before') != json.loads(json.dumps([list(s) for s in before])): return None
+    os.utime(fn)        # recently used (see prune)
+    return data['page'], data['states']
+
+def store(kind, Date, page1, ut1, page, before, states):
+    # before = the moon states the page starts with; states = the moon states after it
+    fn = filename(kind, Date, page1)
+    os.makedirs(os.path.dirname(fn), exist_ok=True)
+    with open(fn + ".new", mode="w", encoding="utf8") as f:
+        json.dump({'ut1': ut1, 'page': page, 'before': [list(s) for s in before],
+                   'states': [list(s) for s in states]}, f)
+    os.replace(fn + ".new", fn)
+
+def fill(page, timeDUT1, footer):
+    return page.replace(PHDUT1, timeDUT1).replace(PHFOOT, footer)
@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#   Copyright (C) 2024  Andrew Bauer
+
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This profiles a run with the command line option -prf (the main process) or -prw
+#   (the main process and the tasks of the worker processes):
+#     sfalmanac.prof    the merged cProfile statistics of all processes, e.g. for
+#                       'python -m pstats sfalmanac.prof' or snakeviz
+#     sfalmanac.folded  the collapsed stacks of a sampling profiler (one line per
+#                       stack, weighted in microseconds) for flamegraph.pl or speedscope
+# A worker process profiles each task it runs with run() and returns the statistics
+#   with the result of the task (see runstats.task); merge() adds them in the main
+#   process. The wall time of pdflatex (a subprocess) is recorded separately with
+#   external() as the stack '[pdflatex]'.
+
+###### Standard library imports ######
+import atexit
+import cProfile
+import os
+import pstats
+import sys
+import threading
+import time
+
+#---------------------------
+#   Module initialization
+#---------------------------
+
+INTERVAL = 0.005        # seconds between samples of the stack
+PROFILE = "sfalmanac.prof"
+FOLDED = "sfalmanac.folded"
+
+workers = False         # profile the tasks of the worker processes too
+prof = None             # the cProfile.Profile of this process
+active = False          # sample the stack of the main thread
+stacks = {}             # collapsed stack -> microseconds
+tasks = None            # the pstats.Stats merged from the worker tasks
+external_time = {}      # subprocess name -> seconds
+lock = threading.Lock()
+sampler = None          # the sampling thread of this process
+
+#------------------------
+#   internal functions
+#------------------------
+
+class Loaded:
+    # the statistics of a worker task in the form pstats.Stats can load
+    def __init__(self, stats):
+        self.stats = stats
+    def create_stats(self):
+        pass
+
+def frames(frame):
+    # the collapsed stack of a frame (outermost first)
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append("{} ({})".format(code.co_name, os.path.basename(code.co_filename)))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+def sample(ident):
+    # samples the stack of thread 'ident' while 'active'
+    last = time.perf_counter()
+    while True:
+        time.sleep(INTERVAL)
+        now = time.perf_counter()
+        if active:
+            frame = sys._current_frames().get(ident)
+            if frame is not None:
+                stack = frames(frame)
+                with lock:
+                    stacks[stack] = stacks.get(stack, 0) + int((now - last) * 1e6)
+        last = now
+
+def start_sampler():
+    global sampler
+    if sampler is None:
+        sampler = threading.Thread(target=sample, args=(threading.main_thread().ident,), daemon=True)
+        sampler.start()
+
+def save():
+    # writes the merged profile and the collapsed stacks (at exit of the main process)
+    global active
+    prof.disable()
+    active = False
+    stats = pstats.Stats(prof)
+    if tasks is not None: stats.add(tasks)
+    stats.dump_stats(PROFILE)
+    with lock:
+        lines = ["{} {}".format(k, v) for k, v in sorted(stacks.items()) if v > 0]
+    for name, secs in external_time.items():
+        lines.append("[{}] {}".format(name, int(secs * 1e6)))
+    with open(FOLDED, mode="w", encoding="utf8") as f:
+        f.write("\n".join(lines) + "\n")
+    print("\nprofile saved in '{}', collapsed stacks in '{}'".format(PROFILE, FOLDED))
+    for name, secs in external_time.items():
+        print("{} (subprocess) = {:0.2f} seconds".format(name, secs))
+
+#--------------------------
+#   external entry points
+#--------------------------
+
+def start(profile_workers):
+    # profiles the main process until it exits
+    global prof, active, workers
+    workers = profile_workers
+    start_sampler()
+    prof = cProfile.Profile()
+    prof.enable()
+    active = True
+    atexit.register(save)
+
+def init_worker(profile_workers):
+    # in a new worker process: a profile inherited from the main process is disabled
+    global prof, active, workers, stacks, lock, sampler
+    if prof is not None: prof.disable()
+    prof = None
+    active = False
+    stacks = {}
+    lock = threading.Lock()
+    sampler = None          # (threads are not inherited)
+    workers = profile_workers
+
+def run(func, *args):
+    # profiles func(*args) in a worker process; returns (result, statistics)
+    global active, stacks
+    start_sampler()
+    p = cProfile.Profile()
+    active = True
+    p.enable()
+    try:
+        result = func(*args)
+    finally:
+        p.disable()
+        active = False
+    p.create_stats()
+    with lock:
+        out, stacks = stacks, {}
+    return result, (p.stats, out)
+
+def merge(profile):
+    # adds the statistics of a worker task
+    global tasks
+    stats, sampled = profile
+    if tasks is None:
+        tasks = pstats.Stats(Loaded(stats))
+    else:
+        tasks.add(Loaded(stats))
+    with lock:
+        for k, v in sampled.items():
+            stacks[k] = stacks.get(k, 0) + v
+
+class external:
+    # with profiler.external('pdflatex'): the wall time of a subprocess
+    def __init__(self, name):
+        self.name = name
+    def __enter__(self):
+        global active
+        self.sampling = active
+        active = False      # (the main thread only waits)
+        self.start = time.time()
+        return self
+    def __exit__(self, *exc):
+        global active
+        external_time[self.name] = external_time.get(self.name, 0.0) + time.time() - self.start
+        active = self.sampling
+        return False
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#   Copyright (C) 2024  Andrew Bauer
+
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This reports the progress of the pages of the Nautical Almanac and the Event Time
+#   tables: after each month of the progress indicator (the month name and a dot
+#   per page) the pages per second, days per second and the estimated time to
+#   complete are printed, and at the end the time spent per stage (see runstats.py).
+# In batch mode (-bat) the progress is also written after every page to a status
+#   file next to the manifest (e.g. jobs.status.json for jobs.json), which is
+#   replaced in one step so that it can be read at any time:
+#     {"state": "running", "updated": "2026-10-19 09:12:31", "job": 2, "jobs": 5,
+#      "file": "NAtrad(A4)_2027", "days": 120, "days_total": 365, "pages": 40,
+#      "elapsed": 95.2, "pages_per_s": 0.42, "days_per_s": 1.26, "eta": 194.4,
+#      "stages": {"events.moon": 41.3, ...}}
+#   "state" is "running", "done" (the job has finished) or "finished" (the batch).
+
+###### Standard library imports ######
+from datetime import date, datetime, timedelta
+import json
+import os
+import time
+
+###### Local application imports ######
+import runstats
+
+#---------------------------
+#   Module initialization
+#---------------------------
+
+STAGES = ('table.', 'events.', 'ipc.wait', 'latex.')  # the timers shown (not run.total, which includes them)
+
+statusfile = None       # the status file (batch mode only)
+status = {}             # its contents
+first = None            # the first day of the job
+total = 0               # the days of the job
+done0 = 0               # days already done when the pages started (checkpoint)
+done = 0                # days done
+pages = 0               # pages done
+start = 0.0
+
+#------------------------
+#   internal functions
+#------------------------
+
+def last_day(first_day, dtp):
+    # dtp = 0 if for entire year; = -1 if for entire month; else days to print
+    if dtp == 0: return date(first_day.year, 12, 31)
+    if dtp == -1: return date(first_day.year + first_day.month//12, first_day.month%12 + 1, 1) - timedelta(days=1)
+    return first_day + timedelta(days=dtp-1)
+
+def rates():
+    # returns (pages per second, days per second, seconds to complete)
+    elapsed = time.time() - start
+    if elapsed <= 0 or done <= done0: return 0.0, 0.0, None
+    dps = (done - done0) / elapsed
+    return pages / elapsed, dps, (total - done) / dps
+
+def stages():
+    return {k: round(v, 2) for k, v in sorted(runstats.timers.items()) if k.startswith(STAGES)}
+
+def hms(secs):
+    return "--:--:--" if secs is None else str(timedelta(seconds=int(secs)))
+
+def write(state):
+    # replaces the status file
+    if statusfile is None: return
+    pps, dps, eta = rates()
+    status.update({'state': state, 'updated': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                   'days': done, 'days_total': total, 'pages': pages,
+                   'elapsed': round(time.time() - start, 1) if start else 0.0,
+                   'pages_per_s': round(pps, 3), 'days_per_s': round(dps, 3),
+                   'eta': None if eta is None else round(eta, 1), 'stages': stages()})
+    tmp = statusfile + ".tmp"
+    with open(tmp, mode="w", encoding="utf8") as f:
+        json.dump(status, f, indent=1)
+    os.replace(tmp, statusfile)
+
+#--------------------------
+#   external entry points
+#--------------------------
+
+def batch(manifest):
+    # writes the status of the batch jobs to a file next to the manifest
+    global statusfile
+    statusfile = os.path.splitext(manifest)[0] + ".status.json"
+
+def job(n, jobs, fn):
+    # a batch job starts
+    global first, total, done0, done, pages, start
+    first, total, done0, done, pages, start = None, 0, 0, 0, 0, time.time()
+    status.clear()
+    status.update({'job': n, 'jobs': jobs, 'file': fn})
+    write('running')
+
+def job_done():
+    write('done')
+
+def finished():
+    write('finished')
+
+def begin(first_day, dtp, day1):
+    # the pages from first_day (dtp as in pages()) start at day1 (later if resumed)
+    global first, total, done0, done, pages, start
+    first = first_day
+    total = (last_day(first_day, dtp) - first_day).days + 1
+    done0 = done = (day1 - first_day).days
+    pages = 0
+    start = time.time()
+    write('running')
+
+def page(next_day):
+    # a page is done; next_day is the first day of the next page
+    global done, pages
+    pages += 1
+    done = min(total, (next_day - first).days)
+    write('running')
+
+def month_line():
+    # the end of a line of the progress indicator (after the first month)
+    if pages == 0: return ""
+    pps, dps, eta = rates()
+    return "  {:0.2f} pages/s  {:0.2f} days/s  ETA {}".format(pps, dps, hms(eta))
+
+def summary():
+    # the final line of the progress indicator
+    elapsed = time.time() - start
+    s = ", ".join("{} {:0.1f}s".format(k, v) for k, v in stages().items() if v >= 0.05)
+    return "{}\n{} pages in {:0.1f} seconds ({:0.2f} pages/s, {:0.2f} days/s){}".format(
+        month_line(), pages, elapsed, pages / elapsed if elapsed > 0 else 0.0,
+        (done - done0) / elapsed if elapsed > 0 else 0.0, "\nstages: " + s if s else "")
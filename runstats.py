@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#   Copyright (C) 2024  Andrew Bauer
+
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This collects the timers (seconds) and counters of a run by name. A name starts
+#   with its subsystem, e.g.
+#     ephemeris.load        loading (and trimming) the ephemeris
+#     events.sun            sunrise/sunset and twilight searches
+#     events.moon           moonrise/moonset searches
+#     events.horizon        searches if the Moon is continuously above/below the horizon
+#     events.transit        meridian transit searches
+#     eventstore.hits       searches found in the transient store (eventstore.py)
+#     sfcache.hits          values found in the persistent cache (sfcache.py)
+#     run.total             creating the product file (all of the above: not a stage)
+#     table.<name>          creating a table of a page, e.g. table.twilight (see pagelog.py)
+#     latex.pdf             running pdflatex
+#     ipc.wait              waiting for the worker processes
+#     ipc.tasks             tasks returned by the worker processes
+#     ipc.busy              time the worker processes spent on tasks
+#     ipc.capacity          waiting time multiplied by the number of worker processes
+#     ipc.queue             time the tasks waited before a worker process started them
+#     ipc.stall             time the worker processes were idle until the slowest task finished
+#     ipc.worker.<n>        time worker process <n> spent on tasks
+#     ipc.<type>.busy       (and .capacity) the same per task type, e.g. ipc.mp_twilight.busy
+#     task.<type>.<key>     time spent on the tasks of a type per key (e.g. the latitude)
+# and the peak values (the largest value reported) by name:
+#     rss.main              the peak RSS (MB) of the main process (see memory.py)
+#     rss.worker.<n>        the peak RSS (MB) of worker process <n>
+#
+# A worker process runs its task with task(), which returns the result together
+#   with the timers and counters it added and when it ran; collect() adds these in
+#   the main process and accounts for the pool: every pool.map is a barrier that
+#   waits for the slowest task while the other worker processes are idle. summary()
+#   shows the parallel efficiency (busy / capacity) of a run.
+# timer_start() in sfalmanac.py resets them for each run (the 'ephemeris' timers,
+#   measured once per session, are kept). With the command line option -sts
+#   they are saved as JSON with the product file, e.g. NAmod(A4)_2027.json.
+
+###### Standard library imports ######
+import json
+import os
+import sys
+import time
+try:
+    import resource     # Unix only
+except ImportError:
+    resource = None
+
+###### Local application imports ######
+import profiler
+
+#---------------------------
+#   Module initialization
+#---------------------------
+
+KEEP = ('ephemeris.',)  # subsystems not reset between runs
+
+timers = {}     # name -> seconds
+counts = {}     # name -> count
+peaks = {}      # name -> largest value
+started = {}    # name -> start of the timer (see collect)
+pids = {}       # process id -> worker number
+workers = 0     # the number of worker processes (set where the pool is created)
+
+#-------------------------------
+#   internal functions
+#-------------------------------
+
+def delta(new, old):
+    return {k: v - old.get(k, 0) for k, v in new.items() if v != old.get(k, 0)}
+
+def barrier(spans, start, stop):
+    # accounts for the worker processes between the start and the end of a pool.map
+    wall = stop - start
+    n = max(workers, len(set(pid for kind, pid, s, e, rss in spans)))
+    last = {}
+    for kind, pid, s, e, rss in spans:
+        if pid not in pids: pids[pid] = len(pids) + 1
+        if rss: peak('rss.worker.{}'.format(pids[pid]), rss)
+        add('ipc.busy', e - s)
+        add('ipc.{}.busy'.format(kind), e - s)
+        add('ipc.worker.{}'.format(pids[pid]), e - s)
+        add('ipc.queue', max(0.0, s - start))
+        last[pid] = max(e, last.get(pid, e))
+    add('ipc.capacity', wall * n)
+    if spans: add('ipc.{}.capacity'.format(spans[0][0]), wall * n)
+    # workers without a task were idle during the whole barrier
+    add('ipc.stall', sum(max(0.0, stop - e) for e in last.values()) + wall * (n - len(last)))
+
+#--------------------------
+#   external entry points
+#--------------------------
+
+def add(name, seconds):
+    timers[name] = timers.get(name, 0.0) + seconds
+
+def count(name, n = 1):
+    counts[name] = counts.get(name, 0) + n
+
+def peak(name, v):
+    peaks[name] = max(v, peaks.get(name, v))
+
+def value(name):
+    # a timer or counter (0 if never used)
+    return timers.get(name, counts.get(name, 0))
+
+def total(prefix):
+    # the sum of all timers starting with 'prefix', e.g. 'events.'
+    return sum(v for k, v in timers.items() if k.startswith(prefix))
+
+class timer:
+    # with runstats.timer('latex.pdf'):
+    def __init__(self, name):
+        self.name = name
+    def __enter__(self):
+        self.start = time.time()
+        started[self.name] = self.start
+        return self
+    def __exit__(self, *exc):
+        add(self.name, time.time() - self.start)
+        return False
+
+def task(func, *args, key = None):
+    # runs func(*args) in a worker process; returns (result, timers and counters added,
+    #   the task type, process, time and peak RSS, and its profile with -prw); 'key' is e.g. the latitude
+    t0, c0 = dict(timers), dict(counts)
+    start = time.time()
+    if profiler.workers:
+        result, profile = profiler.run(func, *args)
+    else:
+        result, profile = func(*args), None
+    stop = time.time()
+    name = 'task.' + func.__name__ + ('' if key is None else '.{}'.format(key))
+    add(name, stop - start)
+    count(name)
+    rss = 0.0
+    if resource is not None:    # the peak RSS of the worker process (MB)
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+        if sys.platform == 'darwin': rss /= 1024.0
+        rss = round(rss, 1)
+    return result, (delta(timers, t0), delta(counts, c0), (func.__name__, os.getpid(), start, stop, rss), profile)
+
+def collect(results):
+    # adds the timers and counters of the worker tasks; returns their results
+    #   (called within 'with timer('ipc.wait')', which started the barrier)
+    start = started.get('ipc.wait', time.time())
+    out = []
+    spans = []
+    for result, (t, c, span, profile) in results:
+        if profile is not None: profiler.merge(profile)
+        for k, v in t.items():
+            add(k, v)
+        for k, v in c.items():
+            count(k, v)
+        count('ipc.tasks')
+        out.append(result)
+        spans.append(span)
+    barrier(spans, start, time.time())
+    return out
+
+def summary():
+    # returns the lines showing the parallel efficiency of the run (if multiprocessing)
+    capacity = value('ipc.capacity')
+    if capacity == 0: return []
+    lines = ["parallel efficiency = {:0.1f}% ({} tasks, {} worker processes)".format(
+        100 * value('ipc.busy') / capacity, value('ipc.tasks'), max(workers, len(pids)))]
+    lines.append("  idle until the slowest task finished = {:0.2f} seconds, queued tasks = {:0.2f} seconds".format(
+        value('ipc.stall'), value('ipc.queue')))
+    busy = ["{}:{:0.0f}%".format(n, 100 * value('ipc.worker.{}'.format(n)) / value('ipc.wait'))
+            for n in sorted(pids.values())]
+    lines.append("  busy per worker process: " + " ".join(busy))
+    kinds = sorted(k[4:-9] for k in timers if k.startswith('ipc.') and k.endswith('.capacity') and k != 'ipc.capacity')
+    for kind in kinds:
+        tasks = [(v / counts[k], k[len(kind)+6:]) for k, v in timers.items()
+                 if k.startswith('task.' + kind + '.') and counts.get(k)]
+        slowest = ", ".join("{} {:0.3f}s".format(key, t) for t, key in sorted(tasks, reverse=True)[:3])
+        lines.append("  {:<17} efficiency {:5.1f}%  slowest (mean per task): {}".format(
+            kind, 100 * value('ipc.{}.busy'.format(kind)) / value('ipc.{}.capacity'.format(kind)), slowest))
+    return lines
+
+def reset():
+    for d in (timers, counts):
+        for k in [k for k in d if not k.startswith(KEEP)]:
+            del d[k]
+    peaks.clear()
+    pids.clear()
+
+def save(filename, **info):
+    # writes the timers and counters of this run with 'info' (e.g. the product) as JSON
+    with open(filename, mode="w", encoding="utf8") as f:
+        json.dump({'info': info,
+                   'timers': {k: round(v, 3) for k, v in sorted(timers.items())},
+                   'counts': dict(sorted(counts.items())),
+                   'peaks': dict(sorted(peaks.items()))}, f, indent=1)
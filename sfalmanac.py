@@ -19,11 +19,11 @@
 
 ###### Standard library imports ######
 import os
+import json
 import sys, site
 import time
 from sysconfig import get_path  # new in python 3.2
 from datetime import date, datetime, timedelta, timezone
-from multiprocessing import cpu_count
 
 ###### Local application imports ######
 import config
@@ -32,19 +32,19 @@ config.WINpf = True if sys.platform.startswith('win') else False
 config.LINUXpf = True if sys.platform.startswith('linux') else False
 config.MACOSpf = True if sys.platform == 'darwin' else False
 config.FANCYhd = False  # default for TeX Live <= "TeX Live 2019/Debian"
-config.CPUcores = cpu_count()
+config.CPUcores = os.cpu_count() or 1   # as multiprocessing.cpu_count() (without importing it)
 # NOTE: Multiprocessing on Windows using 'spawn' requires all variables modified
 #       and stored in config.py to be re-calculated for every spawned process!
 # NOTE: multiprocessing is supported in modules: nautical, eventtables
 #       Hence these can only be imported *after* we know if '-sp' is specified
-from alma_skyfield import init_sf
-from ld_skyfield import ld_init_sf
-#from nautical import almanac            # multiprocessing supported
-from suntables import sunalmanac
-#from eventtables import makeEVtables    # multiprocessing supported
-from ld_tables import makeLDtables
-from ld_charts import makeLDcharts
-from increments import makelatex
+# NOTE: the modules for each product (and thereby Skyfield and NumPy) are only
+#       imported once we know which product is required (see 'importProduct').
+#       The "Increments and Corrections" tables need none of these.
+from checkpoint import runStart, runDone, runEnd
+import runstats
+import profiler
+import progress
+import memory
 
 #   Some modules in SFalmanac have been ported from the original source code ...
 #   this may explain why sections of code are not consolidated. Furthermore two
@@ -77,7 +77,21 @@ def toUNIX(fn):
             fn = fn.replace("(",r"\(").replace(")",r"\)")
     return fn
 
+def texfile(filename):
+    # the LaTeX file (discarded with -dry)
+    return open(os.devnull if config.dryRun else filename + ".tex", mode="w", encoding="utf8")
+
+def datfile(filename):
+    # the data store filename (discarded with -dry)
+    return os.devnull if config.dryRun else filename + ".dat"
+
+def counters():
+    # the counters of a run (shown with -dry)
+    items = ["{} = {}".format(k, v) for k, v in sorted(runstats.counts.items())]
+    return "counters: " + (", ".join(items) if items else "(none)")
+
 def deletePDF(filename):
+    if config.dryRun: return
     if os.path.exists(filename + ".pdf"):
         try:
             os.remove(filename + ".pdf")
@@ -88,13 +102,16 @@ def deletePDF(filename):
         os.remove(filename + ".tex")
 
 def makePDF(pdfcmd, fn, msg = ""):
+    if config.dryRun: return
     command = r'pdflatex {}'.format(pdfcmd + toUNIX(fn + ".tex"))
     print()     # blank line before "This is pdfTex, Version 3.141592653...
     if pdfcmd == "":
-        os.system(command)
+        with runstats.timer('latex.pdf'), profiler.external('pdflatex'):
+            os.system(command)
         print("finished" + msg)
     else:
-        returned_value = os.system(command)
+        with runstats.timer('latex.pdf'), profiler.external('pdflatex'):
+            returned_value = os.system(command)
         if returned_value != 0:
             if msg != "":
                 print("ERROR detected while" + msg)
@@ -109,12 +126,19 @@ def makePDF(pdfcmd, fn, msg = ""):
     return
 
 def tidy_up(fn):
+    if config.dryRun:
+        print(counters())
+        if config.runStats:
+            runstats.save(fn + ".json", file = fn, pgsz = config.pgsz, MULTIpr = config.MULTIpr, dryRun = True)
+        return
     if not keeptex: os.remove(fn + ".tex")
     if not keeplog:
         if os.path.isfile(fn + ".log"):
             os.remove(fn + ".log")
     if os.path.isfile(fn + ".aux"):
         os.remove(fn + ".aux")
+    if config.runStats:
+        runstats.save(fn + ".json", file = fn, pgsz = config.pgsz, MULTIpr = config.MULTIpr)
     return
 
 def check_mth(mm):
@@ -165,18 +189,13 @@ def check_years(yearfr, yearto):
         sys.exit(0)
 
 def timer_start():
-    # initialize these counts before processing the next year (Almanac or Event Tables)
-    config.stopwatch  = 0.0     # 00000
-    config.stopwatch2 = 0.0     # 00000
-    config.moonDaysCount = 0
-    config.moonDataSeeks = 0
-    config.moonDataFound = 0
-    config.moonHorizonSeeks = 0
-    config.moonHorizonFound = 0
+    # initialize the timers and counts before processing the next year (Almanac or Event Tables)
+    runstats.reset()
     return time.time()
 
 def timer_end(start, x = 0):
     stop = time.time()
+    runstats.add('run.total', stop-start)
     #print("start = {}".format(time.localtime(start)))
     #print("stop  = {}".format(time.localtime(stop)))
     msg = "execution time = {:0.2f} seconds".format(stop-start)
@@ -185,37 +204,72 @@ def timer_end(start, x = 0):
         x = abs(x)
     print(msg)
     if config.logfileopen: config.writeLOG("\n\n" + msg)
+    msg = memory.report()   # peak RSS of the main process and the worker processes
+    if msg != "":
+        print(msg)
+        if config.logfileopen: config.writeLOG("\n" + msg)
     if x == 0: return
 
-    pct = 100 * config.stopwatch/(stop-start)
+    stopwatch = runstats.total('events.') - runstats.value('events.horizon')
+    pct = 100 * stopwatch/(stop-start)
     msg4 = " ({:0.1f}%)".format(pct) if not config.MULTIpr else ""
-    msg2 = "stopwatch      = {:0.2f} seconds".format(config.stopwatch) + msg4
+    msg2 = "stopwatch      = {:0.2f} seconds".format(stopwatch) + msg4
     print(msg2)                 # 00000
     if config.logfileopen: config.writeLOG(msg2 + "\n")
     msg3 = "(stopwatch = time spent getting moonrise and/or moonset times)"
     #if x == 2: msg3 += "\n"
     if config.logfileopen: config.writeLOG(msg3 + "\n")
     print(msg3)                 # 00000
+    for line in runstats.summary():     # the worker pool (if multiprocessing)
+        print(line)
+        if config.logfileopen: config.writeLOG(line + "\n")
 
     if x == 1: return   # following is not required for Event Time tables
-    msg5 = "stopwatch2     = {:0.2f} seconds".format(config.stopwatch2)
+    msg5 = "stopwatch2     = {:0.2f} seconds".format(runstats.value('events.horizon'))
     print(msg5)                 # 00000
     msg6 = "(stopwatch2 = time spent searching if moon above/below horizon)"
     if x == 2: msg6 += "\n"
     print(msg6)
     return
 
+def importProduct(s):
+    # import the modules required for product 's'
+    global init_sf, ld_init_sf, almanac, sunalmanac, makeEVtables, makeLDtables, makeLDcharts, makelatex, makeStore
+    if int(s) <= 3 or s == '7':
+        from alma_skyfield import init_sf
+    if s in set(['4', '5']):
+        from ld_skyfield import ld_init_sf
+    if s == '1':
+        from nautical import almanac            # multiprocessing supported
+    elif s == '2':
+        from suntables import sunalmanac
+    elif s == '3':
+        from eventtables import makeEVtables    # multiprocessing supported
+    elif s == '4':
+        from ld_tables import makeLDtables
+    elif s == '5':
+        from ld_charts import makeLDcharts
+    elif s == '6':
+        from increments import makelatex
+    elif s == '7':
+        from alma_store import makeStore
+
 def search_stats():
+    v = runstats.value
     if config.MULTIpr:
-        msg4 = "Moonrise/moonset time seeks  = {}".format(config.moonDataSeeks)
+        msg4 = "Moonrise/moonset time seeks  = {}".format(v('events.moon.seeks'))
         print(msg4)
-        msg5 = "Above/below horizon searches = {}".format(config.moonHorizonSeeks)
+        msg5 = "Above/below horizon searches = {}".format(v('events.horizon.seeks'))
         print(msg5)
+        if v('eventstore.hits') + v('eventstore.misses') > 0:
+            print("Moonrise/moonset searches found in the transient store = {} of {}".format(v('eventstore.hits'), v('eventstore.hits') + v('eventstore.misses')))
     else:
-        msg4 = "Moonrise/moonset times found in transient store = {} of {}".format(config.moonDataFound, config.moonDataSeeks)
+        msg4 = "Moonrise/moonset times found in transient store = {} of {}".format(v('events.moon.found'), v('events.moon.seeks'))
         print(msg4)
-        msg5 = "Moon continuously above/below horizon state found in transient store = {} of {}".format(config.moonHorizonFound, config.moonHorizonSeeks)
+        msg5 = "Moon continuously above/below horizon state found in transient store = {} of {}".format(v('events.horizon.found'), v('events.horizon.seeks'))
         print(msg5)
+    if v('sfcache.hits') + v('sfcache.misses') > 0:
+        print("Calculated values found in the persistent cache = {} of {}".format(v('sfcache.hits'), v('sfcache.hits') + v('sfcache.misses')))
     return
 
 def checkCoreCount():       # only called when config.MULTIpr == True
@@ -233,6 +287,214 @@ def checkCoreCount():       # only called when config.MULTIpr == True
     if config.CPUcores < 12 or (config.WINpf and config.CPUcores < 8):
         print("\nNOTE: only {} logical processors are available for parallel processessing".format(config.CPUcores))
 
+def batchError(n, msg):
+    print("ERROR in batch job {}: {}".format(n, msg))
+    sys.exit(0)
+
+def batchRange(n, ss, days):
+    # the dates of a batch job, entered as in interactive mode:
+    #   'DDMMYYYY' (with 'days'), 'YYYY', 'YYYY-YYYY', 'MM', '-MM', 'YYYY-MM' or '' (today)
+    # returns a list of (first_day, dtp, filename date) - one per file to create
+    today = datetime.now(timezone.utc).date()
+    if len(ss) == 4 or (len(ss) == 9 and ss[4] == '-'):    # year(s)
+        yearfr = ss[0:4]
+        yearto = ss[-4:]
+        check_years(yearfr, yearto)
+        return [(date(y, 1, 1), 0, "{}".format(y)) for y in range(int(yearfr), int(yearto)+1)]
+    if len(ss) in [2,3]:                                    # month
+        if not ss[-2:].isnumeric() or (len(ss) == 3 and ss[0] != '-'):
+            batchError(n, "incorrect date range '{}'".format(ss))
+        mm = ss[-2:]
+        check_mth(mm)
+        yy = today.year
+        if len(ss) == 2 and int(mm) < today.month: yy += 1
+        if len(ss) == 3 and int(mm) >= today.month: yy -= 1
+        first_day = date(yy, int(mm), 1)
+        dtp = -1
+    elif len(ss) == 7 and ss[4] == '-':                     # month of a given year
+        if not (ss[0:4].isnumeric() and ss[5:7].isnumeric()):
+            batchError(n, "incorrect date range '{}'".format(ss))
+        check_mth(ss[5:7])
+        first_day = date(int(ss[0:4]), int(ss[5:7]), 1)
+        dtp = -1
+    elif len(ss) in [0,8] and ss.isnumeric() or ss == '':   # day(s)
+        first_day = today
+        if ss != '':
+            check_date(ss[4:], ss[2:4], ss[0:2])
+            first_day = date(int(ss[4:]), int(ss[2:4]), int(ss[0:2]))
+        dtp = int(days)
+        if not 1 <= dtp <= 300:
+            batchError(n, "'days' must be between 1 and 300")
+    else:
+        batchError(n, "incorrect date range '{}'".format(ss))
+    if not (yrmin <= first_day.year <= yrmax):
+        batchError(n, "please pick a year between {} and {}".format(yrmin,yrmax))
+    if dtp == -1: return [(first_day, dtp, first_day.strftime("%Y-%m"))]
+    txt = first_day.strftime("%Y%m%d")
+    if dtp > 1:     # filename as 'from date'-'to date'
+        txt += (first_day + timedelta(days=dtp-1)).strftime("-%Y%m%d")
+    return [(first_day, dtp, txt)]
+
+def runBatch(filename):
+    # create all products in a JSON manifest in one process with a single initialization
+    # of Skyfield (and, when multiprocessing, one worker pool shared by all jobs), e.g.
+    #   {"jobs": [{"product": 1, "range": "2027", "style": "m", "pgsz": "A4"},
+    #             {"product": 3, "range": "01032027", "days": 10},
+    #             {"product": 4, "range": "03", "strategy": "C", "pdf": false}]}
+    # optional job settings: "days", "pgsz" ('A4'/'Letter'), "style" ('t', 'm', 't+', 'm+'),
+    #   "dvalues" ('nao'/'dtr'), "strategy" ('A', 'B', 'C'), "pdf" (false = keep .tex only)
+    try:
+        with open(filename, mode="r", encoding="utf8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        print("ERROR: cannot read the batch manifest '{}' ({})".format(filename, e))
+        sys.exit(0)
+    jobs = manifest.get('jobs', []) if isinstance(manifest, dict) else manifest
+
+    # validate all jobs before anything is created...
+    todo = []
+    for n, job in enumerate(jobs, 1):
+        product = str(job.get('product', ''))
+        if product not in set(['1', '2', '3', '4', '5', '6', '7']):
+            batchError(n, "'product' must be 1, 2, 3, 4, 5, 6 or 7")
+        pgsz = job.get('pgsz', config.pgsz)
+        if pgsz not in set(['A4', 'Letter']):
+            batchError(n, "'pgsz' must be 'A4' or 'Letter'")
+        dvalues = job.get('dvalues', '')
+        if dvalues not in set(['', 'nao', 'dtr']):
+            batchError(n, "'dvalues' must be 'nao' or 'dtr'")
+        strat = str(job.get('strategy', config.defaultLDstrategy)).upper()
+        if strat == '': strat = 'B'
+        if strat not in set(['A', 'B', 'C']):
+            batchError(n, "'strategy' must be 'A', 'B' or 'C'")
+        if product == '6':
+            dates = [(None, 0, "")]
+        else:
+            dates = batchRange(n, str(job.get('range', '')), job.get('days', 1))
+        if product == '5':
+            for i, (first_day, dtp, txt) in enumerate(dates):
+                if dtp == 0:
+                    batchError(n, "Lunar Distance charts for a whole year are not supported")
+                if dtp == -1:       # the number of days in the month
+                    dtp = (first_day.replace(month = first_day.month%12 + 1, day = 1)-timedelta(days=1)).day
+                if dtp > 50:
+                    batchError(n, "'days' must be between 1 and 50 for Lunar Distance charts")
+                dates[i] = (first_day, dtp, txt)
+        pdf = (job.get('pdf', True) and product != '7' and not config.dryRun)
+        if pdf and product in set(['1', '3', '4']):
+            check_exists(spdf + "A4chart0-180_P.pdf")
+            check_exists(spdf + "A4chart180-360_P.pdf")
+        if pdf and product == '2':
+            check_exists(spdf + "Ra.jpg")
+        for first_day, dtp, txt in dates:
+            todo.append({'product': product, 'first_day': first_day, 'dtp': dtp, 'txt': txt, 'pgsz': pgsz,
+                         'style': str(job.get('style', 't')), 'dvalues': dvalues, 'strategy': strat, 'pdf': pdf})
+    if len(todo) == 0:
+        print("ERROR: no jobs in the batch manifest '{}'".format(filename))
+        sys.exit(0)
+
+    progress.batch(filename)     # the status file next to the manifest
+    # initialize once for all jobs...
+    products = set([job['product'] for job in todo])
+    years = [y for job in todo if job['first_day'] is not None
+             for y in (job['first_day'].year, (job['first_day'] + timedelta(days=max(job['dtp'], 31))).year)]
+    if len(years) > 0:
+        config.ephspan = (min(years), max(years))   # for an excerpt of the ephemeris (see ephtrim.py)
+    for product in sorted(products):
+        importProduct(product)
+    if products & set(['1', '2', '3', '7']):
+        ts = init_sf(spad)      # in alma_skyfield (almanac-based)
+    if products & set(['4', '5']):
+        ldts = ld_init_sf(spad) # in ld_skyfield ('Lunar Distance'-based)
+    pool = None
+    if config.MULTIpr and products & set(['1', '3']):
+        checkCoreCount()
+        if config.MULTIpr:
+            import multiprocessing as mp
+            import nautical, eventtables
+            runstats.workers = nautical.poolsize()
+            pool = mp.Pool(runstats.workers, nautical.init_worker, (config.profile == 2,))
+            nautical.sharedpool = pool
+            if eventtables.MPmode == 0: eventtables.sharedpool = pool
+    pgsz = config.pgsz
+    d_valNA = config.d_valNA
+
+    timings = []
+    bstart = time.time()
+    for n, job in enumerate(todo, 1):
+        product = job['product']
+        first_day = job['first_day']
+        dtp = job['dtp']
+        config.pgsz = job['pgsz']
+        config.tbls = 'm' if job['style'][0:1] == 'm' else ''
+        config.decf = '+' if job['style'][1:2] == '+' else ''
+        DecFmt = '[old]' if config.decf == '+' else ''
+        config.d_valNA = d_valNA
+        if job['dvalues'] == 'nao': config.d_valNA = True
+        if job['dvalues'] == 'dtr': config.d_valNA = False
+
+        if product == '1':
+            ff = "NAtrad" if config.tbls != 'm' else "NAmod"
+            fn = toUnix("{}({})_{}".format(ff,config.pgsz,job['txt']+DecFmt))
+        elif product == '2':
+            ff = "STtrad" if config.tbls != 'm' else "STmod"
+            fn = toUnix("{}({})_{}".format(ff,config.pgsz,job['txt']+DecFmt))
+        elif product == '3':
+            fn = toUnix("Event-Times({})_{}".format(config.pgsz,job['txt']))
+        elif product == '4':
+            fn = toUnix("LDtable({})_{}".format(config.pgsz,job['txt']))
+        elif product == '5':
+            fn = toUnix("LDchart({})_{}".format(config.pgsz,job['txt']))
+        elif product == '6':
+            fn = toUnix("Inc({})").format(config.pgsz)
+        else:
+            fn = "SFstore_{}".format(job['txt'])
+        print("\nBatch job {} of {}: creating '{}'".format(n, len(todo), fn))
+        progress.job(n, len(todo), fn)
+
+        start = timer_start()
+        if product == '7':
+            makeStore(datfile(f_prefix + fn), first_day, dtp)
+        else:
+            deletePDF(f_prefix + fn)
+            # :::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+            outfile = texfile(f_prefix + fn)
+            if product == '1':   outfile.write(almanac(first_day,dtp,ts,outfile))
+            elif product == '2': outfile.write(sunalmanac(first_day,dtp))
+            elif product == '3': outfile.write(makeEVtables(first_day,dtp,ts,outfile))
+            elif product == '4': outfile.write(makeLDtables(first_day,dtp,job['strategy']))
+            elif product == '5': makeLDcharts(first_day,job['strategy'],dtp,outfile,ldts,onlystars,quietmode)
+            else:                outfile.write(makelatex())
+            outfile.close()
+            # :::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+        calc = time.time() - start
+        runstats.add('run.total', calc)     # (before tidy_up saves the statistics)
+        msg = memory.report()   # peak RSS of the main process and the worker processes
+        if msg != "": print(msg)
+        if job['pdf']:
+            if config.dockerized: os.chdir(os.getcwd() + f_postfix)     # DOCKER ONLY
+            makePDF(listarg, fn)
+            tidy_up(fn)
+            if config.dockerized: os.chdir(docker_main)     # reset working folder to code folder
+        if config.dryRun: print(counters())
+        if config.runStats and not job['pdf']:
+            runstats.save(f_prefix + fn + ".json", file = fn, pgsz = config.pgsz, MULTIpr = config.MULTIpr)
+        timings.append((fn, calc, time.time() - start))
+        progress.job_done()
+
+    if pool is not None:
+        pool.close()    # close all worker processes
+        pool.join()
+    progress.finished()
+    config.pgsz = pgsz
+    config.d_valNA = d_valNA
+
+    print("\nBatch summary ({} jobs):".format(len(timings)))
+    print("{:>9}  {:>9}  {}".format("data (s)", "total (s)", "file"))
+    for fn, calc, total in timings:
+        print("{:9.2f}  {:9.2f}  {}".format(calc, total, fn))
+    print("batch execution time = {:0.2f} seconds".format(time.time() - bstart))
+    return
 
 ###### Main Program ######
 
@@ -242,37 +504,20 @@ if __name__ == '__main__':      # required for Windows multiprocessing compatibi
         print("This runs only with Python 3")
         sys.exit(0)
 
-    # check if pandas version is compatible with numpy
-    # (this is required to prevent a crash in "df = hipparcos.load_dataframe(f)")
+    # NOTE: pandas is no longer required (the Hipparcos catalog is read by hipcatalog.py)
+    #       so the check that the pandas version is compatible with numpy is obsolete.
     n = sys.version.find(" ")
     py_ver = sys.version[:n]        # python version
-    
-    if compareVersion(py_ver,"3.8") >= 0:
-        from importlib.metadata import version          # for Python >= 3.8
-        pandas_ver = version('pandas')
-        np_ver = version('numpy')
-
-        if compareVersion(np_ver,"2.0.0") >= 0:         # if numpy >= 2.0.0
-            if compareVersion(pandas_ver, "2.2.2") < 0: # if pandas < 2.2.2
-                print("ISSUE: pandas version {} is incompatible with numpy {}".format(pandas_ver, np_ver))
-                print("       upgrade pandas to >= 2.2.2 or downgrade numpy to <= 1.26.4")
-                sys.exit(0)
-    else:   # if Python < 3.8
-        import numpy as np
-        try:
-            import pandas
-        except ValueError:
-            print("ISSUE: pandas version is incompatible with numpy {}".format(np.__version__))
-            print("       upgrade pandas to >= 2.2.2 or downgrade numpy to <= 1.26.4")
-            sys.exit(0)
 
     # check if TeX Live is compatible with the 'fancyhdr' package...
     process = os.popen("tex --version")
     returned_value = process.read()
     process.close()
     if returned_value == "":
-        print("- - - Neither TeX Live nor MiKTeX is installed - - -")
-        sys.exit(0)
+        if "-dry" not in set(sys.argv[1:]):
+            print("- - - Neither TeX Live nor MiKTeX is installed - - -")
+            sys.exit(0)
+        config.FANCYhd = True   # nothing is typeset in a dry run
     pos1 = returned_value.find("(") 
     pos2 = returned_value.find(")")
     if pos1 != -1 and pos2 != -1:
@@ -292,10 +537,14 @@ if __name__ == '__main__':      # required for Windows multiprocessing compatibi
             config.FANCYhd = True  # assume MiKTeX can handle the 'fancyhdr' package
 
     # command line arguments...
-    validargs = ['-v', '-q', '-log', '-tex', '-sky', '-old', '-a4', '-let', '-nao', '-dtr', '-dpo', '-sbr', '-sp', '-nmg', '-d1', '-d2', '-d3', '-d4']
+    validargs = ['-v', '-q', '-log', '-tex', '-sky', '-old', '-a4', '-let', '-nao', '-dtr', '-dpo', '-sbr', '-sp', '-nmg', '-srv', '-bat', '-inc', '-sts', '-prf', '-prw', '-pgl', '-dry', '-d1', '-d2', '-d3', '-d4']
     # (the 4 dummy arguments d1 d2 d3 d4 are specified in 'dockerfile')
+    batchfile = ""
     for i in list(range(1, len(sys.argv))):
-        if sys.argv[i] not in validargs:
+        if sys.argv[i-1] == '-bat':
+            batchfile = sys.argv[i]     # the batch manifest filename
+            continue
+        if sys.argv[i] not in validargs or (sys.argv[i] == '-bat' and i == len(sys.argv) - 1):
             print("Invalid argument: {}".format(sys.argv[i]))
             print("\nValid command line arguments are:")
             print(" -v   ... 'verbose': to send pdfTeX output to the terminal")
@@ -311,6 +560,15 @@ if __name__ == '__main__':      # required for Windows multiprocessing compatibi
             print(" -dpo ... data pages only")
             print(" -sbr ... square brackets in Unix filenames")
             print(" -sp  ... execute in single-processing mode (slower)")
+            print(" -srv ... run as a local almanac query service (see alma_server.py)")
+            print(" -bat ... followed by a JSON file: create all jobs listed (see runBatch)")
+            print(" -inc ... recalculate only almanac pages affected by new IERS EOP data")
+            print(" -sts ... save the timings and counts of each run as JSON (see runstats.py)")
+            print(" -prf ... profile the run (see profiler.py)")
+            print(" -prw ... profile the run including the worker processes")
+            print(" -pgl ... append a JSON record per page to 'pages.jsonl' (see pagelog.py)")
+            print(" -dry ... compute only: no .tex or PDF file is created (timings and counters are shown)")
+            print("          (the persistent cache, the page store and checkpoints are not used)")
             sys.exit(0)
 
     # NOTE: pdfTeX 3.14159265-2.6-1.40.21 (TeX Live 2020/Debian), as used in the Docker
@@ -326,16 +584,24 @@ if __name__ == '__main__':      # required for Windows multiprocessing compatibi
     #
     if "-nmg" in set(sys.argv[1:]): config.moonimg = False  # only for debugging
     config.DPonly = True if "-dpo" in set(sys.argv[1:]) else False
+    config.incPages = True if "-inc" in set(sys.argv[1:]) else False
+    config.runStats = True if "-sts" in set(sys.argv[1:]) else False
+    config.pageLog = True if "-pgl" in set(sys.argv[1:]) else False
+    if "-dry" in set(sys.argv[1:]):
+        config.dryRun = True
+        config.useCKPT = False  # compute all pages (no checkpoints are resumed or saved)
+        config.useCache = False # ... without values saved by earlier runs in 'sfcache.db'
+        if config.incPages:
+            print("NOTE: -inc is ignored with -dry (all pages are calculated)")
+        config.incPages = False
+    if "-prf" in set(sys.argv[1:]): config.profile = 1
+    if "-prw" in set(sys.argv[1:]): config.profile = 2
+    if config.profile > 0: profiler.start(config.profile == 2)
     if "-old" in set(sys.argv[1:]): config.FANCYhd = False  # don't use the 'fancyhdr' package
 
     if "-sp" in set(sys.argv[1:]):
         config.MULTIpr = False
 
-    # NOTE: multiprocessing is supported in modules: nautical, eventtables
-    #       Hence these can only be imported *after* we know if '-sp' is specified
-    from nautical import almanac            # multiprocessing supported
-    from eventtables import makeEVtables    # multiprocessing supported
-
     if not("-a4" in set(sys.argv[1:]) and "-let" in set(sys.argv[1:])):
         if "-a4" in set(sys.argv[1:]): config.pgsz = "A4"
         if "-let" in set(sys.argv[1:]): config.pgsz = "Letter"
@@ -419,6 +685,15 @@ if __name__ == '__main__':      # required for Windows multiprocessing compatibi
     f_prefix = config.docker_prefix
     f_postfix = config.docker_postfix
 
+    if "-srv" in set(sys.argv[1:]):
+        from alma_server import serve   # long-running: keeps Skyfield initialized
+        serve(spad, f_prefix)
+        sys.exit(0)
+
+    if batchfile != "":
+        runBatch(batchfile)     # non-interactive: all products in one process
+        sys.exit(0)
+
     # ------------ process user input ------------
 
     s = input("""\n  What do you want to create?:\n
@@ -428,16 +703,17 @@ if __name__ == '__main__':      # required for Windows multiprocessing compatibi
     4   Lunar Distance tables (for a day/month/year)
     5   Lunar Distance charts (for a day/month)
     6   "Increments and Corrections" tables (static data)
+    7   Almanac data store    (for a day/month/year)
 """)
 
-    if s in set(['1', '3', '4']): dnum = 6
+    if s in set(['1', '3', '4', '7']): dnum = 6
     elif s == '2': dnum = 30
     else: dnum = 0
     smalltxt = " (or 'x' for a brief sample)" if dnum > 0 else ""
     smallmsg = "\n    - or 'x' for {} days from today".format(dnum) if dnum > 0 else ""
 
-    if s in set(['1', '2', '3', '4', '5', '6']):
-        if int(s) < 5:
+    if s in set(['1', '2', '3', '4', '5', '6', '7']):
+        if int(s) < 5 or s == '7':
             daystoprocess = 0
             ss = input("""  Enter as numeric digits{}:\n
     - starting date as 'DDMMYYYY'
@@ -641,7 +917,13 @@ if __name__ == '__main__':      # required for Windows multiprocessing compatibi
 
 # ------------ create the desired tables/charts ------------
 
-        if int(s) <= 3:
+        importProduct(s)    # after '-sp' is known (multiprocessing in nautical, eventtables)
+        if s != '6':        # the years required (for an excerpt of the ephemeris, see ephtrim.py)
+            if entireYr:
+                config.ephspan = (int(yearfr), int(yearto))
+            else:
+                config.ephspan = (first_day.year, (first_day + timedelta(days=daystoprocess)).year)
+        if int(s) <= 3 or s == '7':
             ts = init_sf(spad)      # in alma_skyfield (almanac-based)
         elif int(s) in set([4, 5]):
             ts = ld_init_sf(spad)   # in ld_skyfield ('Lunar Distance'-based)
@@ -652,24 +934,25 @@ if __name__ == '__main__':      # required for Windows multiprocessing compatibi
             check_exists(spdf + "A4chart180-360_P.pdf")
             print("Take a break - this computer needs some time for cosmic meditation.")
     ##        config.initLOG()		# initialize log file
+            run = toUnix("NA({})_{}-{}".format(papersize,yearfr,yearto))
+            done = runStart(run) if config.useCKPT else set()
             for yearint in range(int(yearfr),int(yearto)+1):
+                year = "{:4d}".format(yearint)  # year = "%4d" %yearint
+                ff = "NAtrad" if config.tbls != 'm' else "NAmod"
+                fn = toUnix("{}({})_{}".format(ff,papersize,year+DecFmt))
+                if fn in done and os.path.exists(f_prefix + fn + ".pdf"):
+                    print("\n'{}' was created before the interruption".format(fn + ".pdf"))
+                    continue
                 if config.MULTIpr: checkCoreCount()
                 start = timer_start()
-                config.moonDataSeeks = 0
-                config.moonDataFound = 0
-                config.moonHorizonSeeks = 0
-                config.moonHorizonFound = 0
-                year = "{:4d}".format(yearint)  # year = "%4d" %yearint
                 msg = "\nCreating the nautical almanac for the year {}".format(year)
                 print(msg)
     ##            config.writeLOG(msg)
                 first_day = date(yearint, 1, 1)
-                ff = "NAtrad" if config.tbls != 'm' else "NAmod"
-                fn = toUnix("{}({})_{}".format(ff,papersize,year+DecFmt))
                 deletePDF(f_prefix + fn)
                 # :::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
-                outfile = open(f_prefix + fn + ".tex", mode="w", encoding="utf8")
-                outfile.write(almanac(first_day,0,ts))
+                outfile = texfile(f_prefix + fn)
+                outfile.write(almanac(first_day,0,ts,outfile))
                 outfile.close()
                 # :::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
                 timer_end(start, 1)
@@ -678,6 +961,8 @@ if __name__ == '__main__':      # required for Windows multiprocessing compatibi
                 makePDF(listarg, fn)
                 tidy_up(fn)
                 if config.dockerized: os.chdir(docker_main)     # reset working folder to code folder
+                if config.useCKPT: runDone(run, fn, done)
+            if config.useCKPT: runEnd(run)
     ##        config.closeLOG()     # close log after the for-loop
 
         elif s == '1' and entireMth:        # Nautical Almanac (for a month)
@@ -686,10 +971,6 @@ if __name__ == '__main__':      # required for Windows multiprocessing compatibi
     ##        config.initLOG()		# initialize log file
             if config.MULTIpr: checkCoreCount()
             start = timer_start()
-            config.moonDataSeeks = 0
-            config.moonDataFound = 0
-            config.moonHorizonSeeks = 0
-            config.moonHorizonFound = 0
             msg = "\nCreating the nautical almanac for {}".format(first_day.strftime("%B %Y"))
             print(msg)
     ##            config.writeLOG(msg)
@@ -697,8 +978,8 @@ if __name__ == '__main__':      # required for Windows multiprocessing compatibi
             fn = toUnix("{}({})_{}".format(ff,papersize,syr + '-' + smth + DecFmt))
             deletePDF(f_prefix + fn)
             # :::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
-            outfile = open(f_prefix + fn + ".tex", mode="w", encoding="utf8")
-            outfile.write(almanac(first_day,-1,ts))
+            outfile = texfile(f_prefix + fn)
+            outfile.write(almanac(first_day,-1,ts,outfile))
             outfile.close()
             # :::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
             timer_end(start, 1)
@@ -715,10 +996,6 @@ if __name__ == '__main__':      # required for Windows multiprocessing compatibi
     ##        config.initLOG()		# initialize log file
             if config.MULTIpr: checkCoreCount()
             start = timer_start()
-            config.moonDataSeeks = 0
-            config.moonDataFound = 0
-            config.moonHorizonSeeks = 0
-            config.moonHorizonFound = 0
             txt = "from" if daystoprocess > 1 else "for"
             msg = "\nCreating the nautical almanac {} {}".format(txt,first_day.strftime("%d %B %Y"))
             print(msg)
@@ -731,8 +1008,8 @@ if __name__ == '__main__':      # required for Windows multiprocessing compatibi
             fn = toUnix("{}({})_{}".format(ff,papersize,symd+dto+DecFmt))
             deletePDF(f_prefix + fn)
             # :::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
-            outfile = open(f_prefix + fn + ".tex", mode="w", encoding="utf8")
-            outfile.write(almanac(first_day,daystoprocess,ts))
+            outfile = texfile(f_prefix + fn)
+            outfile.write(almanac(first_day,daystoprocess,ts,outfile))
             outfile.close()
             # :::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
             timer_end(start, 1)
@@ -754,7 +1031,7 @@ if __name__ == '__main__':      # required for Windows multiprocessing compatibi
                 fn = toUnix("{}({})_{}".format(ff,papersize,year+DecFmt))
                 deletePDF(f_prefix + fn)
                 # :::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
-                outfile = open(f_prefix + fn + ".tex", mode="w", encoding="utf8")
+                outfile = texfile(f_prefix + fn)
                 outfile.write(sunalmanac(first_day,0))
                 outfile.close()
                 # :::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
@@ -771,7 +1048,7 @@ if __name__ == '__main__':      # required for Windows multiprocessing compatibi
             fn = toUnix("{}({})_{}".format(ff,papersize,syr + '-' + smth + DecFmt))
             deletePDF(f_prefix + fn)
             # :::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
-            outfile = open(f_prefix + fn + ".tex", mode="w", encoding="utf8")
+            outfile = texfile(f_prefix + fn)
             outfile.write(sunalmanac(first_day,-1))
             outfile.close()
             # :::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
@@ -793,7 +1070,7 @@ if __name__ == '__main__':      # required for Windows multiprocessing compatibi
             fn = toUnix("{}({})_{}".format(ff,papersize,symd+dto+DecFmt))
             deletePDF(f_prefix + fn)
             # :::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
-            outfile = open(f_prefix + fn + ".tex", mode="w", encoding="utf8")
+            outfile = texfile(f_prefix + fn)
             outfile.write(sunalmanac(first_day,daystoprocess))
             outfile.close()
             # :::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
@@ -806,18 +1083,23 @@ if __name__ == '__main__':      # required for Windows multiprocessing compatibi
             check_exists(spdf + "A4chart0-180_P.pdf")
             check_exists(spdf + "A4chart180-360_P.pdf")
             print("Take a break - this computer needs some time for cosmic meditation.")
+            run = toUnix("EV({})_{}-{}".format(papersize,yearfr,yearto))
+            done = runStart(run) if config.useCKPT else set()
             for yearint in range(int(yearfr),int(yearto)+1):
+                year = "{:4d}".format(yearint)  # year = "%4d" %yearint
+                fn = toUnix("Event-Times({})_{}".format(papersize,year))
+                if fn in done and os.path.exists(f_prefix + fn + ".pdf"):
+                    print("\n'{}' was created before the interruption".format(fn + ".pdf"))
+                    continue
                 if config.MULTIpr: checkCoreCount()
                 start = timer_start()
-                year = "{:4d}".format(yearint)  # year = "%4d" %yearint
                 msg = "\nCreating the event time tables for the year {}".format(year)
                 print(msg)
                 first_day = date(yearint, 1, 1)
-                fn = toUnix("Event-Times({})_{}".format(papersize,year))
                 deletePDF(f_prefix + fn)
                 # :::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
-                outfile = open(f_prefix + fn + ".tex", mode="w", encoding="utf8")
-                outfile.write(makeEVtables(first_day,0,ts))
+                outfile = texfile(f_prefix + fn)
+                outfile.write(makeEVtables(first_day,0,ts,outfile))
                 outfile.close()
                 # :::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
                 timer_end(start, 1)
@@ -825,6 +1107,8 @@ if __name__ == '__main__':      # required for Windows multiprocessing compatibi
                 makePDF(listarg, fn)
                 tidy_up(fn)
                 if config.dockerized: os.chdir(docker_main)     # reset working folder to code folder
+                if config.useCKPT: runDone(run, fn, done)
+            if config.useCKPT: runEnd(run)
 
         elif s == '3' and entireMth:      # Event Time tables  (for a month)
             check_exists(spdf + "A4chart0-180_P.pdf")
@@ -836,8 +1120,8 @@ if __name__ == '__main__':      # required for Windows multiprocessing compatibi
             fn = toUnix("Event-Times({})_{}".format(papersize,syr + '-' + smth))
             deletePDF(f_prefix + fn)
             # :::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
-            outfile = open(f_prefix + fn + ".tex", mode="w", encoding="utf8")
-            outfile.write(makeEVtables(first_day,-1,ts))
+            outfile = texfile(f_prefix + fn)
+            outfile.write(makeEVtables(first_day,-1,ts,outfile))
             outfile.close()
             # :::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
             timer_end(start, 1)
@@ -860,8 +1144,8 @@ if __name__ == '__main__':      # required for Windows multiprocessing compatibi
                 fn += lastdate.strftime("-%Y%m%d")
             deletePDF(f_prefix + fn)
             # :::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
-            outfile = open(f_prefix + fn + ".tex", mode="w", encoding="utf8")
-            outfile.write(makeEVtables(first_day,daystoprocess,ts))
+            outfile = texfile(f_prefix + fn)
+            outfile.write(makeEVtables(first_day,daystoprocess,ts,outfile))
             outfile.close()
             # :::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
             timer_end(start, 1)
@@ -883,7 +1167,7 @@ if __name__ == '__main__':      # required for Windows multiprocessing compatibi
                     fn = toUnix("LDtable({})_{}".format(papersize,year))
                     first_day = date(yearint, 1, 1)
                     # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
-                    outfile = open(fn + ".tex", mode="w", encoding="utf8")
+                    outfile = texfile(fn)
                     outfile.write(makeLDtables(first_day,0,strat))
                     outfile.close()
                     # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
@@ -909,7 +1193,7 @@ if __name__ == '__main__':      # required for Windows multiprocessing compatibi
                 print(msg)
                 deletePDF(f_prefix + fn)
                 # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
-                outfile = open(f_prefix + fn + ".tex", mode="w", encoding="utf8")
+                outfile = texfile(f_prefix + fn)
                 outfile.write(makeLDtables(first_day,daystoprocess,strat))
                 outfile.close()
                 # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
@@ -937,7 +1221,7 @@ if __name__ == '__main__':      # required for Windows multiprocessing compatibi
             else: msg = "\nCreating the lunar distance chart for {}".format(symd)
             print(msg)
             # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
-            outfile = open(f_prefix + fn + ".tex", mode="w", encoding="utf8")
+            outfile = texfile(f_prefix + fn)
             makeLDcharts(first_day,strat,daystoprocess,outfile,ts,onlystars,quietmode)
             outfile.close()
             # ::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
@@ -954,7 +1238,7 @@ if __name__ == '__main__':      # required for Windows multiprocessing compatibi
             fn = toUnix("Inc({})").format(papersize)
             deletePDF(f_prefix + fn)
             # :::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
-            outfile = open(f_prefix + fn + ".tex", mode="w", encoding="utf8")
+            outfile = texfile(f_prefix + fn)
             outfile.write(makelatex())
             outfile.close()
             # :::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
@@ -962,5 +1246,36 @@ if __name__ == '__main__':      # required for Windows multiprocessing compatibi
             makePDF(listarg, fn)
             tidy_up(fn)
 
+        elif s == '7':  # Almanac data store (binary, for lookups without regenerating pages)
+            if entireYr:
+                years = range(int(yearfr),int(yearto)+1)
+            else:
+                years = [first_day.year]
+            for yearint in years:
+                start = timer_start()
+                if entireYr:
+                    first_day = date(yearint, 1, 1)
+                    fn = "SFstore_{}".format(yearint)
+                    msg = "\nCreating the almanac data store for the year {}".format(yearint)
+                    dtp = 0
+                elif entireMth:
+                    fn = "SFstore_{}".format(syr + '-' + smth)
+                    msg = "\nCreating the almanac data store for {}".format(first_day.strftime("%B %Y"))
+                    dtp = -1
+                else:
+                    fn = "SFstore_{}".format(symd)
+                    if daystoprocess > 1:   # filename as 'from date'-'to date'
+                        lastdate = first_day + timedelta(days=daystoprocess-1)
+                        fn += lastdate.strftime("-%Y%m%d")
+                    txt = "from" if daystoprocess > 1 else "for"
+                    msg = "\nCreating the almanac data store {} {}".format(txt,first_day.strftime("%d %B %Y"))
+                    dtp = daystoprocess
+                print(msg)
+                # :::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+                days = makeStore(datfile(f_prefix + fn), first_day, dtp)
+                # :::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::::
+                timer_end(start, -1)
+                print("finished creating '{}' ({} days)".format(fn + ".dat", days))
+
     else:
-        print("Error! Choose 1, 2, 3, 4, 5 or 6")
\ No newline at end of file
+        print("Error! Choose 1, 2, 3, 4, 5, 6 or 7")
\ No newline at end of file
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#   Copyright (C) 2024  Andrew Bauer
+
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This is a persistent cache (SQLite file 'sfcache.db' in the Skyfield data folder)
+#   of values calculated by Skyfield that do not depend on the page formatting,
+#   i.e. table style, page size or d-value mode. Creating the same dates again in
+#   another style then skips the Skyfield calculations.
+#
+# Each entry is keyed by the ephemeris file, a hash of the IERS EOP data file,
+#   the Skyfield version, the function and its arguments (including the date).
+#   New EOP data or another ephemeris therefore never uses older values.
+# The least recently used entries are deleted when the file exceeds config.cacheMB.
+#
+# Only the main process uses the cache; worker processes calculate as before.
+#   Threads of the main process (e.g. the jobs of alma_server.py) share the
+#   connection: every read and write holds 'lock'.
+
+###### Standard library imports ######
+import atexit
+from hashlib import sha1
+import inspect
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+###### Local application imports ######
+import config
+import runstats
+
+#---------------------------
+#   Module initialization
+#---------------------------
+
+CACHEVER = 2        # increment when cached function results (or the keys) change
+db = None           # SQLite connection (None = cache not in use)
+dbpid = 0           # the process that opened the cache
+prefix = ""         # key prefix: cache version, ephemeris, EOP hash and Skyfield version
+pending = 0         # inserts since the last commit
+touched = set()     # keys read since the last commit (to update their 'last used' time)
+lock = threading.RLock()    # the connection is shared by the threads of the process
+
+#------------------------
+#   internal functions
+#------------------------
+
+def filehash(filename):
+    h = sha1()
+    with open(filename, mode="rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+def commit():
+    global pending
+    with lock:
+        if db is None: return
+        now = time.time()
+        db.executemany("UPDATE cache SET used = ? WHERE key = ?", [(now, k) for k in touched])
+        touched.clear()
+        db.commit()
+        pending = 0
+        evict()
+
+def evict():
+    # delete the least recently used entries if the cache exceeds config.cacheMB
+    total = db.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+    limit = config.cacheMB * 1024 * 1024
+    if total <= limit: return
+    excess = total - int(limit * 0.9)   # make room for further entries
+    keys = []
+    for key, size in db.execute("SELECT key, size FROM cache ORDER BY used"):
+        keys.append((key,))
+        excess -= size
+        if excess <= 0: break
+    db.executemany("DELETE FROM cache WHERE key = ?", keys)
+    db.commit()
+
+#--------------------------
+#   external entry points
+#--------------------------
+
+def open_cache(spad, eopfile, skyfield_version):
+    # called by init_sf once the timescale has been loaded
+    # eopfile = the IERS EOP data file in use, or "" for the built-in UT1 tables
+    global db, dbpid, prefix
+    if not config.useCache: return
+    eop = filehash(eopfile) if eopfile != "" and os.path.isfile(eopfile) else "builtin"
+    prefix = "{}|{}|{}|{}|".format(CACHEVER, config.ephemeris[config.ephndx][0], eop, skyfield_version)
+    if db is not None and dbpid == os.getpid(): return
+    db = sqlite3.connect(spad + "sfcache.db", check_same_thread=False)
+    dbpid = os.getpid()
+    db.execute("PRAGMA journal_mode = WAL")
+    db.execute("PRAGMA synchronous = NORMAL")
+    db.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, size INTEGER, used REAL)")
+    atexit.register(close_cache)
+
+def close_cache():
+    global db
+    with lock:
+        if db is None or dbpid != os.getpid(): return
+        commit()
+        db.close()
+        db = None
+
+def cached(func):
+    # decorator for functions of (date, ...) that return the same values in every page style
+    signature = inspect.signature(func)
+    def wrapper(*args, **kwargs):
+        global pending
+        if db is None or dbpid != os.getpid():
+            return func(*args, **kwargs)
+        # the same key for positional, keyword and default arguments
+        bound = signature.bind(*args, **kwargs)
+        bound.apply_defaults()
+        key = prefix + func.__name__ + repr(tuple(bound.arguments.items()))
+        with lock:
+            if db is None: return func(*args, **kwargs)     # (closed by another thread)
+            row = db.execute("SELECT value FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                runstats.count('sfcache.hits')
+                touched.add(key)
+                return pickle.loads(row[0])
+            runstats.count('sfcache.misses')
+        value = func(*args, **kwargs)   # (calculated without holding the lock)
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        with lock:
+            if db is None: return value
+            db.execute("INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)", (key, blob, len(key) + len(blob), time.time()))
+            pending += 1
+            if pending >= 500: commit()
+        return value
+    wrapper.__name__ = func.__name__
+    wrapper.__doc__ = func.__doc__
+    return wrapper
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#   Copyright (C) 2024  Andrew Bauer
+
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Client/server test of alma_server.py: the service is started on a free port and
+#   every endpoint is called from concurrent client threads, e.g.
+#     python -m unittest tests.test_alma_server
+# The ephemeris (config.ephndx) is taken from the folder SFALMANAC_DATA (default:
+#   the current folder); the test is skipped if it is not there. SFALMANAC_TEST_DATE
+#   (YYYY-MM-DD, default 2027-03-14) must lie within the ephemeris.
+
+###### Standard library imports ######
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+###### Local application imports ######
+import config
+
+spad = os.path.join(os.environ.get('SFALMANAC_DATA', '.'), '')
+day = date.fromisoformat(os.environ.get('SFALMANAC_TEST_DATE', '2027-03-14'))
+ephfile = config.ephemeris[config.ephndx][0]
+
+@unittest.skipUnless(os.path.isfile(spad + ephfile), "{} not found in '{}'".format(ephfile, spad))
+class TestAlmaServer(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        config.useIERS = False      # no download
+        config.trimEph = False
+        config.useCache = False     # no 'sfcache.db' in the data folder
+        config.MULTIpr = False
+        import alma_server
+        cls.srv = alma_server
+        cls.folder = tempfile.mkdtemp()
+        alma_server.ts = alma_server.init_sf(spad)
+        alma_server.f_prefix = os.path.join(cls.folder, '')
+        alma_server.server = alma_server.PoolServer(('127.0.0.1', 0), alma_server.Handler, 4)
+        cls.port = alma_server.server.server_address[1]
+        cls.thread = threading.Thread(target=alma_server.server.serve_forever)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        if cls.thread.is_alive():
+            cls.srv.query("/shutdown", cls.port)
+            cls.thread.join(30)
+        cls.srv.server.server_close()
+        shutil.rmtree(cls.folder)
+
+    def get(self, path):
+        return self.srv.query(path, self.port, 120)
+
+    def test_1_position(self):
+        paths = ["/position?body={}&t={}T{:02d}:30".format(b, day.isoformat(), h)
+                 for b in ('sun', 'moon', 'aries') for h in (0, 12, 23)]
+        with ThreadPoolExecutor(6) as ex:
+            replies = list(ex.map(self.get, paths * 2))
+        for r in replies:
+            self.assertNotIn('error', r)
+            self.assertTrue(0.0 <= r['gha'] < 360.0)
+            self.assertTrue(-90.0 <= r['dec'] <= 90.0)
+        self.assertEqual(replies[:len(paths)], replies[len(paths):])
+
+    def test_2_event(self):
+        r = self.get("/event?event=sunrise&date={}&lat=45".format(day.isoformat()))
+        self.assertNotIn('error', r)
+        self.assertEqual(r['date'], day.isoformat())
+        self.assertTrue(r['t'].startswith(day.isoformat()))
+
+    def test_3_job(self):
+        with ThreadPoolExecutor(2) as ex:
+            f = ex.submit(self.get, "/job?product=7&date={}&days=1".format(day.strftime("%d%m%Y")))
+            p = ex.submit(self.get, "/position?body=venus&t={}T06:00".format(day.isoformat()))
+            r = f.result()
+            self.assertNotIn('error', p.result())
+        self.assertNotIn('error', r)
+        self.assertTrue(os.path.isfile(os.path.join(self.folder, r['file'])))
+
+    def test_4_errors(self):
+        self.assertIn('error', self.get("/nothing"))
+        self.assertIn('missing parameter', self.get("/position?body=sun")['error'])
+        self.assertIn('error', self.get("/position?body=pluto&t=2027-03-14"))
+        self.assertIn('error', self.get("/job?product=1&date=1403"))
+
+    def test_5_status(self):
+        r = self.get("/status")
+        self.assertGreater(r['requests'], 0)
+        self.assertGreater(r['hits'], 0)
+        self.assertEqual(r['ephemeris'], ephfile)
+
+    def test_6_shutdown(self):
+        self.assertEqual(self.get("/shutdown"), {'stopping': True})
+        self.thread.join(30)
+        self.assertFalse(self.thread.is_alive())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#   Copyright (C) 2024  Andrew Bauer
+
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# Test of eopfetch.py against a local HTTP server that serves a complete, an
+#   incomplete and a corrupt finals2000A.all, e.g.
+#     python -m unittest tests.test_eopfetch
+
+###### Standard library imports ######
+from datetime import date, timedelta
+from http.server import HTTPServer, BaseHTTPRequestHandler
+import glob
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+###### Local application imports ######
+import eopfetch
+
+EOPdf = "finals2000A.all"
+
+def finals(days, measured):
+    # a finals2000A.all with 'measured' days flagged "I" followed by predictions ("P")
+    lines = []
+    for n in range(days):
+        d = date(2026, 1, 1) + timedelta(days=n)
+        mjd = 61041 + n
+        flag = "I" if n < measured else "P"
+        lines.append("{:%y%m%d} {:5d}".format(d, mjd).ljust(57) + flag + " " * 20)
+    return "\n".join(lines) + "\n"
+
+files = {'/good/' + EOPdf: finals(20, 10),
+         '/incomplete/' + EOPdf: finals(10, 10),     # no predictions
+         '/corrupt/' + EOPdf: "<html>maintenance</html>\n"}
+
+class Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path not in files:
+            self.send_error(404)
+            return
+        data = files[self.path].encode('ascii')
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        return
+
+class TestEOPfetch(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = HTTPServer(('127.0.0.1', 0), Handler)
+        cls.url = "http://127.0.0.1:{}".format(cls.server.server_address[1])
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.thread.join()
+
+    def setUp(self):
+        self.spad = os.path.join(tempfile.mkdtemp(), '')
+        eopfetch.swapped = False
+
+    def tearDown(self):
+        shutil.rmtree(self.spad)
+
+    def downloads(self):
+        return glob.glob(self.spad + EOPdf + ".*.download")
+
+    def test_fallback(self):
+        # the first servers fail: the file of the last one is used
+        urls = [self.url + p for p in ('/missing/', '/corrupt/', '/incomplete/', '/good/')]
+        self.assertTrue(eopfetch.fetch(self.spad, EOPdf, urls))
+        with open(self.spad + EOPdf + ".new") as f:
+            self.assertEqual(f.read(), files['/good/' + EOPdf])
+        self.assertEqual(self.downloads(), [])
+
+    def test_failure(self):
+        urls = [self.url + p for p in ('/missing/', '/corrupt/', '/incomplete/')]
+        urls.append("http://127.0.0.1:1/")     # not reachable
+        self.assertFalse(eopfetch.fetch(self.spad, EOPdf, urls))
+        self.assertEqual(os.listdir(self.spad), [])
+
+    def test_swap_new(self):
+        old = self.spad + EOPdf + ".abc123.download"
+        new = self.spad + EOPdf + ".def456.download"
+        for fn in (old, new):
+            open(fn, 'w').close()
+        t = time.time() - 3600.0
+        os.utime(old, (t, t))
+        with open(self.spad + EOPdf + ".new", 'w') as f:
+            f.write("new")
+        eopfetch.swap_new(self.spad, EOPdf)
+        self.assertEqual(self.downloads(), [new])  # a download may still be in progress
+        with open(self.spad + EOPdf) as f:
+            self.assertEqual(f.read(), "new")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+#   Copyright (C) 2024  Andrew Bauer
+
+#   This program is free software; you can redistribute it and/or modify
+#   it under the terms of the GNU General Public License as published by
+#   the Free Software Foundation; either version 3 of the License, or
+#   (at your option) any later version.
+#
+#   This program is distributed in the hope that it will be useful,
+#   but WITHOUT ANY WARRANTY; without even the implied warranty of
+#   MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#   GNU General Public License for more details.
+#
+#   You should have received a copy of the GNU General Public License along
+#   with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+# This keeps the Time objects of a day (used in alma_skyfield, ld_skyfield, mp_nautical
+#   and mp_eventtables) in place of 'ts.ut1(d.year, d.month, d.day, ...)'.
+#
+# The hourly GHA/Dec grid of a day, midnight, noon, 23:59:30 etc. are requested by
+#   the Sun, Moon, planet and Aries tables and by every latitude of the twilight and
+#   moonrise tables. Skyfield calculates the nutation, the precession-nutation matrix
+#   and the sidereal time of a Time object once and keeps them in that object, so
+#   returning the same object for the same instant calculates these only once.
+# At most config.timeCache Time objects are kept (the least recently used are dropped).
+
+###### Standard library imports ######
+from collections import OrderedDict
+
+###### Third party imports ######
+import numpy as np
+
+###### Local application imports ######
+import config
+
+#---------------------------
+#   Module initialization
+#---------------------------
+
+times = OrderedDict()   # (year, month, day, hour, minute, second) -> Time
+
+#--------------------------
+#   external entry points
+#--------------------------
+
+def ut1(ts, year, month, day, hour = 0, minute = 0, second = 0):
+    # equivalent to ts.ut1(year, month, day, hour, minute, second)
+    t = ts.ut1(year, month, day, hour, minute, second)
+    if isinstance(hour, list):
+        hour = tuple(hour)      # an hourly grid
+    args = (year, month, day, hour, minute, second)
+    if any(isinstance(a, np.ndarray) for a in args):
+        return t                # not kept
+    kept = times.get(args)
+    # the Time object kept is only valid for the same Delta T (the worker processes
+    #   receive a new copy of the Timescale with every task)
+    if kept is not None and np.array_equal(kept.tt, t.tt):
+        times.move_to_end(args)
+        return kept
+    times[args] = t
+    if len(times) > config.timeCache:
+        times.popitem(last=False)
+    return t